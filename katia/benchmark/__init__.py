@@ -0,0 +1 @@
+from .runner import Benchmark
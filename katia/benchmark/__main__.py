@@ -0,0 +1,5 @@
+import sys
+
+from katia.benchmark.runner import main
+
+sys.exit(main())
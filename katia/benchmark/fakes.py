@@ -0,0 +1,470 @@
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from array import array
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Condition, Thread
+from typing import Callable, Iterable
+
+import speech_recognition as sr
+
+from katia.speaker.player import PCM_SAMPLE_WIDTH, audio_file
+from katia.state import SpeakingState
+
+logger = logging.getLogger("Katia")
+
+
+class InMemoryBroker:
+    """
+    Broker that keeps the topics in memory, so the whole pipeline can run in a single
+    process without kafka. Each topic behaves like a topic with one partition, and each
+    group of consumers has its own offset in each topic, starting from the earliest
+    message as the kafka consumers of Katia.
+
+    The broker creates its own clients, so its factories can be given to the components
+    instead of the kafka ones.
+    """
+
+    def __init__(self):
+        self.topics = defaultdict(list)
+        self.offsets = defaultdict(int)
+        self.condition = Condition()
+
+    def produce(self, topic: str, value: bytes):
+        """
+        Add a message to the topic and wake up the consumers waiting for it
+        :param topic:
+        :param value:
+        :return:
+        """
+        with self.condition:
+            self.topics[topic].append(value)
+            self.condition.notify_all()
+
+    def poll(self, group_id: str, topics: list, timeout: float):
+        """
+        Return the topic and the value of the next message of the topics for the group,
+        waiting for it at most the timeout
+        :param group_id:
+        :param topics:
+        :param timeout:
+        :return: None if there was not any message.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                for topic in topics:
+                    offset = self.offsets[(group_id, topic)]
+                    if offset < len(self.topics[topic]):
+                        self.offsets[(group_id, topic)] = offset + 1
+                        return topic, self.topics[topic][offset]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def producer(self, topic: str, group_id: str):
+        """
+        Return a producer of the broker
+        :param topic:
+        :param group_id:
+        :return:
+        """
+        return MemoryProducer(topic=topic, group_id=group_id, broker=self)
+
+    def consumer(self, topic: str, group_id: str):
+        """
+        Return a consumer of the broker
+        :param topic:
+        :param group_id:
+        :return:
+        """
+        return MemoryConsumer(topic=topic, group_id=group_id, broker=self)
+
+
+class MemoryProducer:
+    """
+    Producer of the in memory broker with the interface of the katia producer
+    """
+
+    def __init__(self, topic: str, group_id: str, broker: InMemoryBroker):
+        self.topic = topic
+        self.group_id = group_id
+        self.broker = broker
+
+    def send_message(self, message_data, topic: str = None):
+        """
+        Send the message to the producer topic, or to the topic given
+        :param message_data:
+        :param topic:
+        :return:
+        """
+        self.broker.produce(
+            topic=topic or self.topic, value=json.dumps(message_data).encode("utf-8")
+        )
+
+    def close(self, timeout: float = 1):
+        """
+        The messages are delivered when they are sent, so there is nothing to wait for
+        :param timeout:
+        :return:
+        """
+
+
+class MemoryConsumer:
+    """
+    Consumer of the in memory broker with the interface of the katia consumer
+    """
+
+    def __init__(self, topic: str, group_id: str, broker: InMemoryBroker):
+        self.topic = topic
+        self.topics = [topic]
+        self.group_id = group_id
+        self.broker = broker
+
+    def subscribe_topics(self, topics: list):
+        """
+        Replace the topics of the consumer
+        :param topics:
+        :return:
+        """
+        self.topics = list(topics)
+
+    def unsubscribe(self):
+        """
+        Stop consuming all the topics
+        :return:
+        """
+        self.topics = []
+
+    def get_topic_data(self):
+        """
+        Return the topic and the data of the next message, or None if there was not any
+        :return:
+        """
+        if message := self.broker.poll(
+            group_id=self.group_id, topics=self.topics, timeout=0.5
+        ):
+            topic, value = message
+            return topic, json.loads(value.decode("utf-8"))
+        return None
+
+    def get_message(self):
+        """
+        Return the next message, or None if there was not any
+        :return:
+        """
+        if message := self.broker.poll(
+            group_id=self.group_id, topics=self.topics, timeout=0.5
+        ):
+            return message[1].decode("utf-8")
+        return None
+
+    def get_data(self):
+        """
+        Return the data of the next message, or None if there was not any
+        :return:
+        """
+        if message := self.get_message():
+            return json.loads(message)
+        return None
+
+    def close(self):
+        """
+        The offsets are kept by the broker, so there is nothing to close
+        :return:
+        """
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Handler with the chat completions API of openai. It answers each message after the
+    latency of the server.
+    """
+
+    def do_POST(self):  # pylint: disable=C0103
+        """
+        Answer the chat completion requested, after the latency of the server
+        :return:
+        """
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency_in_seconds)
+        prompt_tokens = sum(
+            len(message["content"].split()) for message in request["messages"]
+        )
+        content = f"It is {len(request['messages']) % 12 + 1} o'clock, have a nice day."
+        body = json.dumps(
+            {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content.split()),
+                    "total_tokens": prompt_tokens + len(content.split()),
+                },
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        logger.debug("Fake LLM request: %s", format % args)
+
+
+class FakeLLMServer(Thread):
+    """
+    Local HTTP server that fakes the openai API, so the interpreter does the same
+    requests as with the real service but with a known latency
+    """
+
+    def __init__(self, latency_in_seconds: float = 0.0):
+        super().__init__(daemon=True)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+        self.server.daemon_threads = True
+        self.server.latency_in_seconds = latency_in_seconds
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def run(self) -> None:
+        self.server.serve_forever()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.deactivate()
+
+    def deactivate(self):
+        """
+        Method to stop the server
+        :return:
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeUser:
+    """
+    User talking to Katia for the benchmarks. It takes the place of the speech
+    recognizer of the recognizer, so it says a phrase each time the recognizer listens,
+    and it hears the answers through the fake player of the speaker.
+
+    It waits for the answer of each phrase before saying the next one, like a person
+    would, and it measures the voice to voice latency: the time since the user stops
+    speaking until the first sample of the answer is reproduced.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        phrase: str,
+        utterances: int,
+        recognition_latency_in_seconds: float = 0.0,
+        pause_in_seconds: float = 0.0,
+        answer_timeout_in_seconds: float = 10.0,
+        warmup_answers: int = 2,
+        sample_rate: int = 16000,
+        speaking_state: SpeakingState = None,
+    ):
+        self.phrase = phrase
+        self.utterances = utterances
+        self.recognition_latency_in_seconds = recognition_latency_in_seconds
+        self.pause_in_seconds = pause_in_seconds
+        self.answer_timeout_in_seconds = answer_timeout_in_seconds
+        # The starter and the ready messages are heard before talking
+        self.warmup_answers = warmup_answers
+        # The recognizer ignores the user while Katia is speaking
+        self.speaking_state = speaking_state or SpeakingState()
+        self.energy_threshold = 300
+        self.audio = sr.AudioData(
+            frame_data=tone(seconds=1, sample_rate=sample_rate),
+            sample_rate=sample_rate,
+            sample_width=PCM_SAMPLE_WIDTH,
+        )
+        self.answers_heard = 0
+        self.said = 0
+        self.spoken_at = None
+        self.speak_at = None
+        self.latencies = []
+        self.failed = 0
+        self.ready = threading.Event()
+        self.finished = threading.Event()
+        self.condition = Condition()
+
+    def listen(self, source, timeout: float = None):  # pylint: disable=W0613
+        """
+        Return the audio of the phrase once it is the turn of the user, or raise a wait
+        timeout error as the speech recognizer if the user did not speak
+        :param source:
+        :param timeout:
+        :return:
+        """
+        deadline = time.monotonic() + (timeout or 1)
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if self.spoken_at is not None and (
+                    now - self.spoken_at > self.answer_timeout_in_seconds
+                ):
+                    logger.warning("Benchmark phrase not answered in time")
+                    self.failed += 1
+                    self.turn(now)
+                speaking = self.speaking_state.speaking
+                if self.speak_at is not None and now >= self.speak_at and not speaking:
+                    self.speak_at = None
+                    self.spoken_at = now
+                    self.said += 1
+                    return self.audio
+                if now >= deadline:
+                    raise sr.WaitTimeoutError()
+                wait_until = deadline
+                if self.speak_at is not None:
+                    # The end of the speaking is not notified, so it is polled
+                    wait_until = max(self.speak_at, now + 0.01 * speaking)
+                self.condition.wait(max(0.0, min(wait_until, deadline) - now))
+
+    def recognize_google(  # pylint: disable=W0613
+        self, audio_data, language: str = None, show_all: bool = False
+    ):
+        """
+        Return the phrase of the user after the latency of the recognition
+        :param audio_data:
+        :param language:
+        :param show_all:
+        :return:
+        """
+        time.sleep(self.recognition_latency_in_seconds)
+        return {"alternative": [{"transcript": self.phrase}], "final": True}
+
+    def start_hearing(self):
+        """
+        Method called when the first sample of an answer is reproduced
+        :return:
+        """
+        with self.condition:
+            if self.spoken_at is not None:
+                self.latencies.append(time.monotonic() - self.spoken_at)
+                self.spoken_at = None
+
+    def stop_hearing(self):
+        """
+        Method called when an answer ends. Then it is the turn of the user again.
+        :return:
+        """
+        with self.condition:
+            self.answers_heard += 1
+            if self.answers_heard == self.warmup_answers:
+                self.ready.set()
+            if self.answers_heard >= self.warmup_answers and self.spoken_at is None:
+                self.turn(time.monotonic())
+
+    def turn(self, now: float):
+        """
+        Give the turn to the user, that will speak after the pause, or finish if it
+        already said all the phrases
+        :param now:
+        :return:
+        """
+        self.spoken_at = None
+        if self.said >= self.utterances:
+            self.finished.set()
+            return
+        self.speak_at = now + self.pause_in_seconds
+        self.condition.notify_all()
+
+
+class FakePlayer:
+    """
+    Player of the speaker for the benchmarks. It does not need an audio device: it
+    waits the duration of the audio, multiplied by the playback speed, and it lets the
+    user know when the answers start and end.
+    """
+
+    def __init__(
+        self, user: FakeUser, sample_rate: int = 16000, playback_speed: float = 0.0
+    ):
+        self.user = user
+        self.sample_rate = sample_rate
+        self.playback_speed = playback_speed
+        self.poll_interval_in_seconds = 0.01
+
+    def play(
+        self,
+        audios: Iterable,
+        stopped: threading.Event,
+        on_start: Callable[[], None] = None,
+    ):
+        """
+        Reproduce the audios in order
+        :param audios:
+        :param stopped:
+        :param on_start:
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        started = False
+        try:
+            for audio in audios:
+                if audio is None:
+                    continue
+                if not started:
+                    started = True
+                    if on_start:
+                        on_start()
+                    self.user.start_hearing()
+                seconds = len(audio_file(audio).read()) / (
+                    self.sample_rate * PCM_SAMPLE_WIDTH
+                )
+                if stopped.wait(seconds * self.playback_speed):
+                    return False
+            return not stopped.is_set()
+        finally:
+            if started:
+                self.user.stop_hearing()
+
+    def stop(self):
+        """
+        The stop event is enough to stop the reproduction
+        :return:
+        """
+
+    def close(self):
+        """
+        There is no channel to release
+        :return:
+        """
+
+
+def tone(seconds: float, sample_rate: int = 16000, frequency: int = 300):
+    """
+    Return a tone as signed 16 bits little endian mono PCM audio, loud enough to be
+    kept by the audio encoder
+    :param seconds:
+    :param sample_rate:
+    :param frequency:
+    :return:
+    """
+    samples = array(
+        "h",
+        (
+            int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+            for i in range(int(seconds * sample_rate))
+        ),
+    )
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
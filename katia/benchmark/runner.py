@@ -0,0 +1,323 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+from katia.benchmark.fakes import (FakeLLMServer, FakePlayer, FakeUser,
+                                   InMemoryBroker)
+from katia.katia import Katia
+from katia.owner import Owner
+from katia.recognizer.batch import BatchTranscriber
+
+logger = logging.getLogger("Katia")
+
+# The metrics where a lower value is better, that fail the benchmark when they are worse
+LOWER_IS_BETTER = ("latency_p50", "latency_p95", "latency_p99", "memory_per_owner")
+# The metrics where a higher value is better. A short run only uses a fraction of a CPU
+# second, so they are too noisy to fail the benchmark and they are only reported.
+HIGHER_IS_BETTER = ("round_trips_per_cpu_second",)
+# The runs are only comparable with the same load
+LOAD = ("owners", "utterances")
+
+
+def get_rss():
+    """
+    Return the resident memory of the process in bytes
+    :return:
+    """
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Without procfs only the peak is available
+        import resource  # pylint: disable=C0415
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Benchmark:
+    """
+    End to end benchmark of the voice to voice round trip. It runs the whole pipeline
+    of Katia for several owners in this process, with the recognizer, the interpreter and
+    the speaker wired through an in memory broker, and with fakes for the voice of the
+    user, the speech recognition, the LLM and the speech synthesis.
+
+    The fakes only add the latencies configured, so the results measure the overhead of
+    Katia itself, and they can be compared between runs to catch the regressions.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        owners: int = 1,
+        utterances: int = 10,
+        recognition_latency_in_seconds: float = 0.1,
+        llm_latency_in_seconds: float = 0.3,
+        tts_latency_in_seconds: float = 0.05,
+        playback_speed: float = 0.0,
+        answer_timeout_in_seconds: float = 10.0,
+    ):
+        self.owners = owners
+        self.utterances = utterances
+        self.recognition_latency_in_seconds = recognition_latency_in_seconds
+        self.llm_latency_in_seconds = llm_latency_in_seconds
+        self.tts_latency_in_seconds = tts_latency_in_seconds
+        self.playback_speed = playback_speed
+        self.answer_timeout_in_seconds = answer_timeout_in_seconds
+
+    def environment(self, audio_source: str, llm_url: str):
+        """
+        Return the configuration of Katia for the benchmark
+        :param audio_source: Audio file that takes the place of the microphone.
+        :param llm_url: URL of the fake LLM server.
+        :return:
+        """
+        return {
+            "OPENAI_KEY": "benchmark",
+            "OPENAI_API_BASE": llm_url,
+            "KATIA_LANGUAGE": "en-US",
+            "KATIA_MAIN_NAME": "Katia",
+            "KATIA_VALID_NAMES": "['katia']",
+            "RECOGNIZER_AUDIO_SOURCE": audio_source,
+            "RECOGNIZER_NOISE_CALIBRATION": "False",
+            "RECOGNIZER_LISTEN_TIMEOUT_IN_SECONDS": "0.5",
+            "SPEAKER_BACKEND": "fake",
+            "SPEAKER_OUTPUT_FORMAT": "pcm",
+            "SPEAKER_FAKE_LATENCY_IN_SECONDS": str(self.tts_latency_in_seconds),
+            "SPEAKER_CACHE": "False",
+            "SPEAKER_FILLER": "False",
+            # The mixer is initialized by the speaker even if the fake player is used
+            "SDL_AUDIODRIVER": "dummy",
+        }
+
+    def run(self):
+        """
+        Run the benchmark and return the report. The configuration of Katia for the
+        benchmark is set in the environment of the process, so the benchmark is meant to
+        run in its own process, as ``python -m katia.benchmark`` does.
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory, FakeLLMServer(
+            latency_in_seconds=self.llm_latency_in_seconds
+        ) as llm_server:
+            audio_source = os.path.join(directory, "silence.wav")
+            with wave.Wave_write(audio_source) as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(16000)
+                wav_file.writeframes(b"\x00\x00" * 16000)
+            os.environ.update(
+                self.environment(audio_source=audio_source, llm_url=llm_server.url)
+            )
+            return self.run_owners(broker=InMemoryBroker())
+
+    def run_owners(self, broker: InMemoryBroker):
+        """
+        Start Katia for each owner, wait until all the users said all their phrases and
+        return the report
+        :param broker: Broker that wires the components instead of kafka.
+        :return:
+        """
+        # The components are imported before, so only the memory of the owners counts
+        for module in ("katia.recognizer", "katia.interpreter", "katia.speaker"):
+            importlib.import_module(module)
+        rss_before = get_rss()
+        users = []
+        instances = []
+        for index in range(self.owners):
+            katia = Katia(
+                owner=Owner(name=f"benchmark-{index}", create_topics=False),
+                start=False,
+                producer_factory=broker.producer,
+                consumer_factory=broker.consumer,
+            )
+            user = FakeUser(
+                phrase="katia what time is it",
+                utterances=self.utterances,
+                recognition_latency_in_seconds=self.recognition_latency_in_seconds,
+                answer_timeout_in_seconds=self.answer_timeout_in_seconds,
+                speaking_state=katia.speaking_state,
+            )
+            user.energy_threshold = katia.recognizer.recognizer.energy_threshold
+            katia.recognizer.recognizer = user
+            katia.speaker.player = FakePlayer(
+                user=user,
+                sample_rate=katia.speaker.sample_rate,
+                playback_speed=self.playback_speed,
+            )
+            katia.start_katia()
+            users.append(user)
+            instances.append(katia)
+        try:
+            for user in users:
+                user.ready.wait(self.answer_timeout_in_seconds)
+            memory_per_owner = (get_rss() - rss_before) / self.owners
+            started_at = time.perf_counter()
+            cpu_started_at = time.process_time()
+            timeout = self.answer_timeout_in_seconds * (self.utterances + 1)
+            for user in users:
+                user.finished.wait(max(0.0, started_at + timeout - time.perf_counter()))
+            elapsed = time.perf_counter() - started_at
+            cpu_seconds = time.process_time() - cpu_started_at
+        finally:
+            for katia in instances:
+                katia.stop(drain=False)
+        return self.report(
+            users=users,
+            elapsed=elapsed,
+            cpu_seconds=cpu_seconds,
+            memory_per_owner=memory_per_owner,
+        )
+
+    def report(
+        self, users: list, elapsed: float, cpu_seconds: float, memory_per_owner: float
+    ):
+        """
+        Build the report of the benchmark
+        :param users:
+        :param elapsed:
+        :param cpu_seconds: CPU time used by the process while the users were talking.
+        :param memory_per_owner: Memory in bytes used by each owner.
+        :return:
+        """
+        latencies = sorted(latency for user in users for latency in user.latencies)
+        round_trips = len(latencies)
+        return {
+            "owners": self.owners,
+            "utterances": self.utterances,
+            "round_trips": round_trips,
+            "failed": self.owners * self.utterances - round_trips,
+            "elapsed": elapsed,
+            "cpu_seconds": cpu_seconds,
+            "round_trips_per_second": round_trips / elapsed if elapsed else 0.0,
+            # The round trips each core can serve, the throughput per core
+            "round_trips_per_cpu_second": (
+                round_trips / cpu_seconds if cpu_seconds else 0.0
+            ),
+            "latency_mean": statistics.mean(latencies) if latencies else 0.0,
+            "latency_p50": BatchTranscriber.percentile(latencies, 50),
+            "latency_p95": BatchTranscriber.percentile(latencies, 95),
+            "latency_p99": BatchTranscriber.percentile(latencies, 99),
+            "memory_per_owner": memory_per_owner,
+        }
+
+
+def compare(
+    report: dict, baseline: dict, tolerance: float, memory_slack_in_bytes: float = 0
+):
+    """
+    Compare the report with the baseline and return the regressions found
+    :param report:
+    :param baseline:
+    :param tolerance: Relative change allowed, for example 0.2 for a 20 %.
+    :param memory_slack_in_bytes: Memory per owner allowed on top of the tolerance, as
+    the resident memory of a short run changes with the allocator and the page cache.
+    :return: The description of each regression.
+    """
+    for key in LOAD:
+        if key in baseline and report[key] != baseline[key]:
+            raise ValueError(
+                f"The baseline was run with {baseline[key]} {key} instead of"
+                f" {report[key]}"
+            )
+    regressions = []
+    if report["failed"] > baseline.get("failed", 0):
+        regressions.append(f"{report['failed']} round trips failed")
+    for key in LOWER_IS_BETTER:
+        slack = memory_slack_in_bytes if key == "memory_per_owner" else 0
+        if key in baseline and report[key] > baseline[key] * (1 + tolerance) + slack:
+            regressions.append(f"{key} {report[key]:.4g} > {baseline[key]:.4g}")
+    return regressions
+
+
+def compare_advisory(report: dict, baseline: dict, tolerance: float):
+    """
+    Compare the noisy metrics of the report with the baseline and return the ones that
+    are worse. They are only reported, they do not fail the benchmark.
+    :param report:
+    :param baseline:
+    :param tolerance: Relative change allowed, for example 0.2 for a 20 %.
+    :return: The description of each metric worse than in the baseline.
+    """
+    return [
+        f"{key} {report[key]:.4g} < {baseline[key]:.4g}"
+        for key in HIGHER_IS_BETTER
+        if key in baseline and report[key] < baseline[key] * (1 - tolerance)
+    ]
+
+
+def main(arguments: list = None):
+    """
+    Entry point to run the benchmark from the command line. The exit code is 1 if there
+    is any regression compared with the baseline.
+    :param arguments:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the voice to voice latency")
+    parser.add_argument("--owners", type=int, default=1)
+    parser.add_argument("--utterances", type=int, default=10)
+    parser.add_argument("--recognition-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--tts-latency", type=float, default=0.05)
+    parser.add_argument(
+        "--playback-speed",
+        type=float,
+        default=0.0,
+        help="1 reproduces the answers in real time, 0 as fast as possible.",
+    )
+    parser.add_argument("--baseline", default=None, help="JSON report to compare with.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.getenv("KATIA_BENCHMARK_TOLERANCE", "0.2")),
+    )
+    parser.add_argument(
+        "--memory-slack",
+        type=float,
+        default=float(os.getenv("KATIA_BENCHMARK_MEMORY_SLACK_IN_MB", "4")),
+        help="Memory in MB per owner allowed on top of the tolerance.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the report as the new baseline instead of comparing with it.",
+    )
+    arguments = parser.parse_args(arguments)
+    report = Benchmark(
+        owners=arguments.owners,
+        utterances=arguments.utterances,
+        recognition_latency_in_seconds=arguments.recognition_latency,
+        llm_latency_in_seconds=arguments.llm_latency,
+        tts_latency_in_seconds=arguments.tts_latency,
+        playback_speed=arguments.playback_speed,
+    ).run()
+    print(json.dumps(report, indent=2))
+    if not arguments.baseline:
+        return 0
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        return 0
+    with open(arguments.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    try:
+        regressions = compare(
+            report=report,
+            baseline=baseline,
+            tolerance=arguments.tolerance,
+            memory_slack_in_bytes=arguments.memory_slack * 1024 * 1024,
+        )
+    except ValueError as ex:
+        parser.error(str(ex))
+    for warning in compare_advisory(
+        report=report, baseline=baseline, tolerance=arguments.tolerance
+    ):
+        print(f"Warning: {warning}", file=sys.stderr)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
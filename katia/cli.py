@@ -0,0 +1,224 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+from ast import literal_eval
+from threading import Event, Thread
+
+from dotenv import load_dotenv
+
+from katia.logger_manager.logger import setup_logger
+from katia.message_manager.recorder import start_recorder
+from katia.metrics import start_metrics_server
+from katia.owner import Owner
+from katia.profiling import start_profiling
+from katia.shutdown import shutdown
+from katia.startup import LazyImport
+
+logger = logging.getLogger("Katia")
+
+# Each process only imports the component it runs. The proxies keep the names of the
+# classes they stand for, so they are not constants.
+# pylint: disable=C0103
+KatiaRecognizer = LazyImport("katia.recognizer", "KatiaRecognizer")
+KatiaInterpreter = LazyImport("katia.interpreter", "KatiaInterpreter")
+KatiaSpeaker = LazyImport("katia.speaker", "KatiaSpeaker")
+KatiaHost = LazyImport("katia.host", "KatiaHost")
+Supervisor = LazyImport("katia.supervisor", "Supervisor")
+SessionReplayer = LazyImport("katia.message_manager.replayer", "SessionReplayer")
+# pylint: enable=C0103
+
+COMPONENTS = ("recognizer", "interpreter", "speaker", "host")
+
+
+def build_component(component: str, owner_uuids: list) -> Thread:
+    """
+    Return the component for the owners, ready to be started. The components only talk
+    through kafka, so each of them can run in its own process or host.
+    :param component: recognizer, interpreter, speaker or host.
+    :param owner_uuids: Only the host can serve more than one owner.
+    :return:
+    """
+    name = os.getenv("KATIA_MAIN_NAME", "Katia")
+    adjectives = literal_eval(os.getenv("KATIA_ADJECTIVES", "[]"))
+    if component == "host":
+        return KatiaHost(
+            owners=[
+                Owner(name=owner_uuid, create_topics=False, owner_uuid=owner_uuid)
+                for owner_uuid in owner_uuids
+            ],
+            start=False,
+        )
+    if len(owner_uuids) != 1:
+        raise ValueError(f"The {component} serves exactly one owner")
+    owner_uuid = owner_uuids[0]
+    if component == "recognizer":
+        return KatiaRecognizer(
+            valid_names=literal_eval(os.getenv("KATIA_VALID_NAMES", "[]")),
+            owner_uuid=owner_uuid,
+        )
+    if component == "interpreter":
+        return KatiaInterpreter(name=name, adjectives=adjectives, owner_uuid=owner_uuid)
+    if component == "speaker":
+        return KatiaSpeaker(owner_uuid=owner_uuid)
+    raise ValueError(f"Unknown component '{component}'")
+
+
+def set_cpu_affinity(cpus: list):
+    """
+    Pin the process to the CPUs, so for example the audio work can have its own core.
+    It is only available in the systems that support it, like Linux.
+    :param cpus:
+    :return:
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("CPU affinity is not supported in this system")
+        return
+    os.sched_setaffinity(0, cpus)
+    logger.info("Process pinned to the CPUs %s", cpus)
+
+
+def run_component(component: Thread):
+    """
+    Run the component until it is stopped with a signal, and return the exit code of the
+    process. If the component stops by itself it is considered a failure, so the
+    supervisor will restart it.
+
+    The first signal drains the component within the shutdown timeout, and a second one
+    deactivates it right away. If the component is still stuck after the shutdown, the
+    process exits anyway, so the supervisor never waits more than expected.
+    :param component:
+    :return:
+    """
+    stopping = Event()
+
+    def stop(signum, _frame):
+        logger.info("Signal '%s' received, stopping", signal.Signals(signum).name)
+        if stopping.is_set():
+            component.deactivate()
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    component.start()
+    # Joining with a timeout lets the main thread handle the signals
+    while component.is_alive() and not stopping.is_set():
+        component.join(0.5)
+    if not stopping.is_set():
+        logger.error("The component stopped unexpectedly")
+        return 1
+    if shutdown(components={"component": component}, drain=True):
+        logging.shutdown()
+        os._exit(1)
+    return 0
+
+
+def parse_cpus(value: str):
+    """
+    Return the list of CPUs of a comma separated value
+    :param value:
+    :return:
+    """
+    return [int(cpu) for cpu in value.split(",") if cpu.strip()]
+
+
+def main(arguments: list = None):
+    """
+    Entry point to run a component of Katia, or the supervisor of all of them, from the
+    command line.
+    :param arguments:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Run the components of Katia")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for component in COMPONENTS:
+        component_parser = subparsers.add_parser(
+            component, help=f"Run the {component} in this process"
+        )
+        component_parser.add_argument(
+            "--owner-uuid",
+            action="append",
+            required=True,
+            dest="owner_uuids",
+            help="Owner served. The host accepts it several times.",
+        )
+        component_parser.add_argument(
+            "--cpus",
+            type=parse_cpus,
+            default=None,
+            help="Comma separated CPUs to pin the process to.",
+        )
+        component_parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=None,
+            help="Port to serve the metrics of the process, instead of the configured.",
+        )
+    supervisor_parser = subparsers.add_parser(
+        "supervisor", help="Run each component in its own process, restarting them"
+    )
+    supervisor_parser.add_argument("--owner-uuid", default=None)
+    supervisor_parser.add_argument("--owner-name", default="Katia User")
+    supervisor_parser.add_argument(
+        "--components",
+        nargs="+",
+        choices=COMPONENTS,
+        default=["recognizer", "interpreter", "speaker"],
+    )
+    replay_parser = subparsers.add_parser(
+        "replay", help="Send again the messages of a recorded session"
+    )
+    replay_parser.add_argument(
+        "path", help="Traffic file, or directory with the traffic files, to replay."
+    )
+    replay_parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="1 replays the session in real time, 2 twice as fast, 0 without waiting.",
+    )
+    replay_parser.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        dest="sources",
+        help="Only replay the messages of this source, like recognizer or interpreter.",
+    )
+    replay_parser.add_argument(
+        "--owner-uuid", default=None, help="Send the messages to this owner instead."
+    )
+    arguments = parser.parse_args(arguments)
+
+    load_dotenv()
+    setup_logger()
+    if arguments.command == "supervisor":
+        owner = Owner(
+            name=arguments.owner_name,
+            create_topics=arguments.owner_uuid is None,
+            owner_uuid=arguments.owner_uuid,
+        )
+        supervisor = Supervisor(components=arguments.components, owner_uuid=owner.uuid)
+        start_metrics_server()
+        return supervisor.run()
+    if arguments.command == "replay":
+        replayer = SessionReplayer(
+            path=arguments.path,
+            speed=arguments.speed,
+            sources=tuple(arguments.sources),
+            owner_uuid=arguments.owner_uuid,
+        )
+        return 0 if replayer.replay() else 1
+    if arguments.cpus:
+        set_cpu_affinity(arguments.cpus)
+    start_metrics_server(port=arguments.metrics_port)
+    # Each component process is profiled on its own, the supervisor is not
+    start_profiling()
+    start_recorder()
+    return run_component(
+        build_component(component=arguments.command, owner_uuids=arguments.owner_uuids)
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import logging
+import os
+from ast import literal_eval
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event, Lock, Thread
+from typing import Callable
+
+from katia.interpreter import KatiaInterpreter
+from katia.message_manager import KatiaProducer
+from katia.message_manager.consumer import KatiaConsumer
+from katia.message_manager.producer import TopicProducer
+from katia.metrics import metrics
+from katia.owner import Owner
+
+logger = logging.getLogger("KatiaHost")
+
+HOSTED_OWNERS = metrics.gauge("katia_host_owners", "Owners served by the host")
+PENDING_TASKS = metrics.gauge(
+    "katia_host_pending_tasks", "Tasks of the owners waiting for a worker"
+)
+
+
+class HostedOwner:
+    """
+    State of an owner served by the host. It only keeps the interpreter with the
+    conversation and the tasks waiting for it, so each owner costs a few kilobytes
+    instead of its own threads and kafka clients.
+    """
+
+    __slots__ = ("uuid", "interpreter", "pending", "scheduled")
+
+    def __init__(self, uuid: str, interpreter: KatiaInterpreter):
+        self.uuid = uuid
+        self.interpreter = interpreter
+        self.pending = deque()
+        self.scheduled = False
+
+
+class KatiaHost(Thread):
+    """
+    Host that serves the interpreters of many owners in a single process. All the owners
+    share one consumer, one producer and a bounded pool of workers, and the registry
+    keeps the state of each owner.
+
+    The messages of each owner are interpreted one at a time and in order, because they
+    are part of the same conversation, while the messages of different owners are
+    interpreted in parallel by the workers.
+
+    The recognizer and the speaker need the audio devices of the owner, so they keep
+    running next to them and they talk with the host through the kafka topics of the
+    owner.
+    """
+
+    def __init__(self, owners: list = (), start: bool = True):
+        super().__init__(daemon=True, name="KatiaHost")
+        logger.info("Starting host")
+        self.katia_name = os.getenv("KATIA_MAIN_NAME", "Katia")
+        self.adjectives = literal_eval(os.getenv("KATIA_ADJECTIVES", "[]"))
+        self.workers = int(os.getenv("KATIA_HOST_WORKERS", "8"))
+        self.group_id = os.getenv("KATIA_HOST_GROUP_ID", "katia-host")
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="KatiaHost"
+        )
+        self.producer = KatiaProducer(topic=None, group_id=self.group_id)
+        # The consumer is created with the first owner, because it needs a topic
+        self.consumer = None
+        self.owners = {}
+        self.lock = Lock()
+        self.registered = Event()
+        self.active = True
+        # The functions are kept to remove them from the gauges when the host is closed
+        self.gauge_functions = {
+            HOSTED_OWNERS: self.owners.__len__,
+            PENDING_TASKS: self.pending_tasks,
+        }
+        for gauge, function in self.gauge_functions.items():
+            gauge.set_function(function)
+        for owner in owners:
+            self.register(owner)
+        if start:
+            self.start()
+
+    def run(self) -> None:
+        try:
+            self.serve()
+        finally:
+            self.close()
+
+    def register(self, owner: Owner):
+        """
+        Add an owner to the host and subscribe to its interpreter topic. The owner will be
+        noticed once its interpreter is ready.
+        :param owner:
+        :return:
+        """
+        topic = f"user-{owner.uuid}-interpreter"
+        hosted_owner = HostedOwner(
+            uuid=owner.uuid,
+            interpreter=KatiaInterpreter(
+                name=self.katia_name,
+                adjectives=self.adjectives,
+                owner_uuid=owner.uuid,
+                producer=TopicProducer(
+                    producer=self.producer, topic=f"user-{owner.uuid}-speaker"
+                ),
+            ),
+        )
+        with self.lock:
+            self.owners[topic] = hosted_owner
+            if self.consumer is None:
+                self.consumer = KatiaConsumer(topic=topic, group_id=self.group_id)
+            else:
+                self.consumer.subscribe_topics(list(self.owners))
+        self.registered.set()
+        self.schedule(
+            hosted_owner=hosted_owner, task=hosted_owner.interpreter.ready_to_interpret
+        )
+        logger.info("Owner '%s' registered in the host", owner.uuid)
+        return hosted_owner
+
+    def unregister(self, owner_uuid: str):
+        """
+        Remove an owner from the host. The tasks of the owner that did not start yet are
+        discarded.
+        :param owner_uuid:
+        :return:
+        """
+        with self.lock:
+            hosted_owner = self.owners.pop(f"user-{owner_uuid}-interpreter", None)
+            if hosted_owner is None:
+                return
+            hosted_owner.pending.clear()
+            if self.owners:
+                self.consumer.subscribe_topics(list(self.owners))
+            else:
+                self.consumer.unsubscribe()
+        logger.info("Owner '%s' unregistered from the host", owner_uuid)
+
+    def serve(self):
+        """
+        Main loop of the host. It will consume the messages of all the owners and give
+        each of them to the interpreter of its owner.
+        :return:
+        """
+        while self.active:
+            if self.consumer is None:
+                self.registered.wait(0.5)
+                continue
+            if topic_data := self.consumer.get_topic_data():
+                self.dispatch(*topic_data)
+
+    def dispatch(self, topic: str, data: dict):
+        """
+        Schedule the interpretation of a message from the recognizer of an owner
+        :param topic:
+        :param data:
+        :return:
+        """
+        if data.get("source", None) != "recognizer" or not (
+            message := data.get("message", None)
+        ):
+            return
+        with self.lock:
+            hosted_owner = self.owners.get(topic, None)
+        if hosted_owner is None:
+            logger.warning("Message received for an owner not registered: '%s'", topic)
+            return
+        self.schedule(
+            hosted_owner=hosted_owner,
+            task=partial(hosted_owner.interpreter.interpret_message, message),
+        )
+
+    def schedule(self, hosted_owner: HostedOwner, task: Callable[[], None]):
+        """
+        Add a task for the owner. Only one worker runs the tasks of each owner, so if
+        there is one already running them the task will just wait its turn.
+        :param hosted_owner:
+        :param task:
+        :return:
+        """
+        with self.lock:
+            hosted_owner.pending.append(task)
+            if hosted_owner.scheduled:
+                return
+            hosted_owner.scheduled = True
+        self.executor.submit(self.run_tasks, hosted_owner)
+
+    def run_tasks(self, hosted_owner: HostedOwner):
+        """
+        Run the tasks of the owner in order until there is not any left
+        :param hosted_owner:
+        :return:
+        """
+        while True:
+            with self.lock:
+                if not hosted_owner.pending:
+                    hosted_owner.scheduled = False
+                    return
+                task = hosted_owner.pending.popleft()
+            try:
+                task()
+            except Exception as ex:
+                logger.error(
+                    "Error while serving owner",
+                    extra={"owner": hosted_owner.uuid, "error": str(ex)},
+                )
+
+    def pending_tasks(self):
+        """
+        Return the number of tasks of all the owners that did not start yet
+        :return:
+        """
+        with self.lock:
+            return sum(len(hosted_owner.pending) for hosted_owner in self.owners.values())
+
+    def deactivate(self):
+        """
+        Method to stop the main loop of the host and its workers. The tasks of the owners
+        that did not start yet are discarded.
+        :return:
+        """
+        self.active = False
+        with self.lock:
+            for hosted_owner in self.owners.values():
+                hosted_owner.pending.clear()
+        self.executor.shutdown(wait=False)
+
+    def drain(self):
+        """
+        Method to stop the host once the tasks already received are done. No new messages
+        are consumed meanwhile.
+        :return:
+        """
+        self.active = False
+
+    def close(self):
+        """
+        Wait for the tasks still scheduled and close the kafka clients, so a new host can
+        take over the topics right away
+        :return:
+        """
+        self.executor.shutdown(wait=True)
+        if self.consumer is not None:
+            self.consumer.close()
+        self.producer.close()
+        for gauge, function in self.gauge_functions.items():
+            gauge.remove_function(function)
@@ -2,15 +2,34 @@ import logging
 import os
 import time
 from threading import Thread
+from typing import Callable
 
 import openai
-from googletrans import Translator
 
 from katia.message_manager import KatiaProducer
 from katia.message_manager.consumer import KatiaConsumer
+from katia.message_manager.producer import TopicProducer
+from katia.metrics import metrics
+from katia.phrases import ERROR_MESSAGE, READY_MESSAGE
+from katia.profiling import span
+from katia.startup import LazyImport, startup_timeline
 
 logger = logging.getLogger("KatiaInterpreter")
 
+# The translator is only needed when the language is not english. The proxy is named as
+# the class it imports
+Translator = LazyImport("googletrans", "Translator")  # pylint: disable=C0103
+
+COMPLETION_SECONDS = metrics.histogram(
+    "katia_interpreter_completion_seconds", "Time spent waiting for the LLM answers"
+)
+COMPLETION_ERRORS = metrics.counter(
+    "katia_interpreter_completion_errors_total", "Calls to the LLM that failed"
+)
+TOKENS = metrics.counter(
+    "katia_interpreter_tokens_total", "Tokens used in the LLM calls", labels=("kind",)
+)
+
 
 class KatiaInterpreter(Thread):
     """
@@ -21,10 +40,22 @@ class KatiaInterpreter(Thread):
 
     It is based on the openai technology, so it is needed to be configured the first
     prompt for it setting its context configured by the client.
+
+    When a producer is given, the interpreter is served by a host: the host gives it the
+    messages to interpret and it answers with the shared producer, so it does not have
+    its own kafka clients.
     """
 
-    def __init__(self, name: str, owner_uuid: str, adjectives: tuple = ()):
-        super().__init__()
+    def __init__(  # pylint: disable=R0913
+        self,
+        name: str,
+        owner_uuid: str,
+        adjectives: tuple = (),
+        producer: TopicProducer = None,
+        producer_factory: Callable[..., KatiaProducer] = None,
+        consumer_factory: Callable[..., KatiaConsumer] = None,
+    ):
+        super().__init__(name="KatiaInterpreter")
         logger.info("Starting interpreter")
         self.language = os.getenv("KATIA_LANGUAGE", "en-US")
         try:
@@ -36,23 +67,30 @@ class KatiaInterpreter(Thread):
             logger.error(error_message)
             raise EnvironmentError(error_message) from ex
         self.model = os.getenv("OPENAI_MODEL", "gpt-4")
+        self.api_base = os.getenv("OPENAI_API_BASE", None)
         self.name = name
         self.adjectives = adjectives
         self.messages = [{"role": "system", "content": self.initial_prompt}]
 
-        self.consumer = KatiaConsumer(
-            topic=f"user-{owner_uuid}-interpreter",
-            group_id=owner_uuid
-        )
-        self.producer = KatiaProducer(
-            topic=f"user-{owner_uuid}-speaker",
-            group_id=owner_uuid
-        )
+        self.consumer = None
+        self.producer = producer
+        if producer is None:
+            self.consumer = (consumer_factory or KatiaConsumer)(
+                topic=f"user-{owner_uuid}-interpreter",
+                group_id=owner_uuid
+            )
+            self.producer = (producer_factory or KatiaProducer)(
+                topic=f"user-{owner_uuid}-speaker",
+                group_id=owner_uuid
+            )
         self.active = True
         logger.info("Interpreter started")
 
     def run(self) -> None:
-        self.interpret()
+        try:
+            self.interpret()
+        finally:
+            self.close()
 
     def interpret_message(self, message: str):
         """
@@ -66,18 +104,31 @@ class KatiaInterpreter(Thread):
         self.messages.append({"role": "user", "content": message})
 
         logger.info("Calling openai, please wait")
+        # The speaker will reproduce a filler if the answer takes too long
+        self.producer.send_message(
+            message_data={
+                "source": "interpreter",
+                "state": "thinking",
+                "created_at": time.time(),
+            }
+        )
         start = time.time()
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model, messages=self.messages
-            )
+            with span("interpreter.completion"):
+                response = openai.ChatCompletion.create(
+                    model=self.model, messages=self.messages, api_base=self.api_base
+                )
             response_text = response["choices"][0]["message"]["content"]
+            seconds = time.time() - start
             logger.info(
-                "Response from openai obtained in '%s' seconds",
-                round(time.time() - start, 2)
+                "Response from openai obtained in '%s' seconds", round(seconds, 2)
             )
+            COMPLETION_SECONDS.observe(seconds)
+            for kind in ("prompt", "completion"):
+                TOKENS.inc(response.get("usage", {}).get(f"{kind}_tokens", 0), kind=kind)
             self.messages.append({"role": "assistant", "content": response_text})
         except Exception as ex:
+            COMPLETION_ERRORS.inc()
             self.messages.pop()
             logger.error(
                 "Something went wrong doing the interpretation of the message",
@@ -88,15 +139,10 @@ class KatiaInterpreter(Thread):
             )
             translator = Translator()
             response_text = translator.translate(
-                text=(
-                    "sorry, something went wrong. It seems that I can not understand "
-                    "what are you saying"
-                ),
+                text=ERROR_MESSAGE,
                 dest=self.language.split("-", maxsplit=1)[0],
             ).text
-        self.producer.send_message(
-            message_data={"source": "interpreter", "message": response_text}
-        )
+        self.send_response(message=response_text, priority="answer")
         logger.info("Katia response: '%s'", {response_text})
 
     def interpret(self):
@@ -174,15 +220,31 @@ class KatiaInterpreter(Thread):
         that the kafka messages are working
         :return:
         """
-        starter_message = "All is ready! I will be your assistant!"
+        starter_message = READY_MESSAGE
         if "en" not in self.language:
             language_to_use = self.language.split("-", maxsplit=1)[0]
             translator = Translator()
             starter_message = translator.translate(
                 text=starter_message, dest=language_to_use
             ).text
+        self.send_response(message=starter_message, priority="notice")
+        startup_timeline.finish("All is ready")
+
+    def send_response(self, message: str, priority: str):
+        """
+        Method to send a message to the speaker. The answers supersede the previous ones
+        that were not reproduced yet, and the notices are reproduced before them.
+        :param message:
+        :param priority: answer or notice
+        :return:
+        """
         self.producer.send_message(
-            message_data={"source": "interpreter", "message": starter_message}
+            message_data={
+                "source": "interpreter",
+                "message": message,
+                "priority": priority,
+                "created_at": time.time(),
+            }
         )
 
     def deactivate(self):
@@ -191,3 +253,22 @@ class KatiaInterpreter(Thread):
         :return:
         """
         self.active = False
+
+    def drain(self):
+        """
+        Method used to stop the interpreter once the message being interpreted is
+        answered. The next messages stay in kafka for the next interpreter.
+        :return:
+        """
+        self.deactivate()
+
+    def close(self):
+        """
+        Close the kafka clients of the interpreter, so the consumed messages are committed
+        and a new interpreter can take over the topic right away. The hosted interpreters
+        do not have their own clients.
+        :return:
+        """
+        if self.consumer is not None:
+            self.consumer.close()
+            self.producer.close()
@@ -1,29 +1,92 @@
+import logging
 import os
 from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
-from katia.interpreter import KatiaInterpreter
 from katia.owner import Owner
-from katia.recognizer import KatiaRecognizer
-from katia.speaker import KatiaSpeaker
+from katia.shutdown import shutdown
+from katia.startup import LazyImport, startup_timeline
+from katia.state import SpeakingState
+
+# The components are imported by the thread that initializes them, so their heavy
+# dependencies are imported in parallel with the setup of the other components. The
+# proxies are named as the classes, not as constants.
+# pylint: disable=C0103
+KatiaRecognizer = LazyImport("katia.recognizer", "KatiaRecognizer")
+KatiaInterpreter = LazyImport("katia.interpreter", "KatiaInterpreter")
+KatiaSpeaker = LazyImport("katia.speaker", "KatiaSpeaker")
+# pylint: enable=C0103
+
+logger = logging.getLogger("Katia")
 
 
 class Katia:
     """
     Main class of the project. This will be the manager for the recognizer the
     interpreter and the speaker. When it is instanced it will start the different threads.
+
+    The components are initialized concurrently, as most of their setup waits for the
+    network, and each step is added to the startup timeline.
+
+    If a component fails to initialize, the ones already initialized are closed before
+    raising the error, so their kafka clients are not leaked.
+
+    The factories of the kafka clients are given to the components, so they can be wired
+    through other broker, like the in memory one of the benchmarks.
     """
 
-    def __init__(self, owner: Owner, start: bool = True):
+    def __init__(
+        self,
+        owner: Owner,
+        start: bool = True,
+        producer_factory: Callable = None,
+        consumer_factory: Callable = None,
+    ):
         self.name = os.getenv("KATIA_MAIN_NAME", "Katia")
         self.adjectives = literal_eval(os.getenv("KATIA_ADJECTIVES", "[]"))
         self.valid_names = literal_eval(os.getenv("KATIA_VALID_NAMES", "[]"))
-        self.recognizer = KatiaRecognizer(
-            valid_names=self.valid_names, owner_uuid=owner.uuid
-        )
-        self.interpreter = KatiaInterpreter(
-            name=self.name, adjectives=self.adjectives, owner_uuid=owner.uuid
-        )
-        self.speaker = KatiaSpeaker(owner_uuid=owner.uuid)
+        # The recognizer and the speaker run in the same process, so they can share the
+        # speaking state directly in memory
+        self.speaking_state = SpeakingState()
+        clients = {
+            "producer_factory": producer_factory,
+            "consumer_factory": consumer_factory,
+        }
+        with ThreadPoolExecutor(
+            max_workers=3, thread_name_prefix="KatiaStartup"
+        ) as executor:
+            recognizer = executor.submit(
+                self.initialize,
+                "Recognizer",
+                KatiaRecognizer,
+                valid_names=self.valid_names,
+                owner_uuid=owner.uuid,
+                speaking_state=self.speaking_state,
+                **clients,
+            )
+            interpreter = executor.submit(
+                self.initialize,
+                "Interpreter",
+                KatiaInterpreter,
+                name=self.name,
+                adjectives=self.adjectives,
+                owner_uuid=owner.uuid,
+                **clients,
+            )
+            speaker = executor.submit(
+                self.initialize,
+                "Speaker",
+                KatiaSpeaker,
+                owner_uuid=owner.uuid,
+                speaking_state=self.speaking_state,
+                **clients,
+            )
+        # The executor waits for all the components, so none is initializing here
+        self.close_if_failed(futures=[recognizer, interpreter, speaker])
+        self.recognizer = recognizer.result()
+        self.interpreter = interpreter.result()
+        self.speaker = speaker.result()
 
         if start:
             self.start_katia()
@@ -37,3 +100,58 @@ class Katia:
         self.recognizer.start()
         self.interpreter.start()
         self.speaker.start()
+        startup_timeline.mark("Threads started")
+
+    def stop(self, drain: bool = True, timeout: float = None):
+        """
+        Stop the recognizer, the interpreter and the speaker, waiting for them at most the
+        timeout.
+        :param drain: If True, the components finish the work in flight before stopping.
+        :param timeout: By default, the one configured.
+        :return: The names of the components that did not stop in time.
+        """
+        return shutdown(
+            components={
+                "recognizer": self.recognizer,
+                "interpreter": self.interpreter,
+                "speaker": self.speaker,
+            },
+            drain=drain,
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def close_if_failed(futures: list):
+        """
+        Close the components initialized if any of the others failed, raising the first
+        error
+        :param futures: Futures of the components initialization, already done.
+        :return:
+        """
+        errors = [future.exception() for future in futures if future.exception()]
+        if not errors:
+            return
+        for future in futures:
+            if future.exception() is None:
+                component = future.result()
+                try:
+                    component.close()
+                except Exception as ex:
+                    logger.error(
+                        "Error closing a component after a failed startup",
+                        extra={"error": str(ex), "component": type(component).__name__},
+                    )
+        raise errors[0]
+
+    @staticmethod
+    def initialize(component_name: str, component_class, **kwargs):
+        """
+        Return the component initialized with the arguments, adding its initialization to
+        the startup timeline
+        :param component_name:
+        :param component_class:
+        :param kwargs:
+        :return:
+        """
+        with startup_timeline.step(f"{component_name} initialization"):
+            return component_class(**kwargs)
@@ -1,16 +1,121 @@
+import atexit
 import logging.config
 import os
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Lock
 
 import yaml
 
 
+class RateLimitFilter(logging.Filter):
+    """
+    Filter that lets through a limited number of records from each line of code in each
+    window of time, so a log in a loop can not flood the handlers. The number of records
+    suppressed is added to the first record let through in the next window.
+
+    The warnings and the errors are always let through, so no problem is hidden by the
+    limit.
+
+    The windows use the creation time of the records, so the filter gives the same
+    result in the thread that logs and in the thread that writes the records.
+    """
+
+    def __init__(self, window_in_seconds: float = 1, burst: int = 5):
+        super().__init__()
+        self.window_in_seconds = window_in_seconds
+        self.burst = burst
+        # For each line of code, the start of its window, the records let through and
+        # the records suppressed in it
+        self.windows = {}
+        self.lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        with self.lock:
+            started_at, count, suppressed = self.windows.get(key, (0.0, 0, 0))
+            if record.created - started_at >= self.window_in_seconds:
+                self.windows[key] = (record.created, 1, 0)
+            elif count < self.burst:
+                self.windows[key] = (started_at, count + 1, suppressed)
+                suppressed = 0
+            else:
+                self.windows[key] = (started_at, count, suppressed + 1)
+                return False
+        if suppressed:
+            message = record.getMessage()
+            record.msg = f"{message} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def get_handlers(logger_names: list):
+    """
+    Return the handlers of the loggers, without repeating them
+    :param logger_names:
+    :return:
+    """
+    handlers = []
+    for name in logger_names:
+        for handler in logging.getLogger(name).handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    return handlers
+
+
+def start_log_listener(logger_names: list, log_filter: logging.Filter = None):
+    """
+    Make the loggers put their records in a queue, and write them in background with
+    the handlers that the loggers had. This way logging only costs the formatting of the
+    message in the thread that logs, and the I/O is done by the listener thread.
+    :param logger_names:
+    :param log_filter: Filter applied before the records are queued.
+    :return: The listener, that is stopped when the process exits.
+    """
+    handlers = get_handlers(logger_names)
+    queue_handler = QueueHandler(SimpleQueue())
+    if log_filter:
+        queue_handler.addFilter(log_filter)
+    for name in logger_names:
+        configured_logger = logging.getLogger(name)
+        for handler in handlers:
+            configured_logger.removeHandler(handler)
+        configured_logger.addHandler(queue_handler)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Stopping the listener writes the records still queued
+    atexit.register(listener.stop)
+    return listener
+
+
 def setup_logger():
     """
     This will be the method in charge of set up the logging configuration for the project.
-    :return:
+    By default, the records are written in background, and the records repeated too
+    often are suppressed.
+    :return: The listener writing the records, or None if they are written right away.
     """
     with open(
         f"{os.path.dirname(__file__)}/log_config.yaml", "r", encoding="utf8"
     ) as config_file:
         config = yaml.safe_load(config_file.read())
         logging.config.dictConfig(config)
+    logger_names = list(config["loggers"])
+    rate_limit_filter = None
+    window_in_seconds = float(os.getenv("KATIA_LOG_RATE_LIMIT_IN_SECONDS", "1"))
+    if window_in_seconds > 0:
+        rate_limit_filter = RateLimitFilter(
+            window_in_seconds=window_in_seconds,
+            burst=int(os.getenv("KATIA_LOG_RATE_LIMIT_BURST", "5")),
+        )
+    if os.getenv("KATIA_LOG_ASYNC", "True").lower() == "true":
+        # The records suppressed are not even queued
+        return start_log_listener(logger_names, log_filter=rate_limit_filter)
+    if rate_limit_filter:
+        # The filter counts the records, so it is added to the loggers instead of their
+        # handlers, or each record would be counted once for each handler
+        for name in logger_names:
+            logging.getLogger(name).addFilter(rate_limit_filter)
+    return None
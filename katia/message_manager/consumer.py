@@ -2,10 +2,22 @@ import json
 import logging
 import os
 
-from confluent_kafka import Consumer, KafkaError
+from confluent_kafka import Consumer, KafkaError, TopicPartition
+
+from katia.message_manager.recorder import SessionRecorder
+from katia.metrics import metrics
 
 logger = logging.getLogger("Katia")
 
+CONSUMED = metrics.counter(
+    "katia_kafka_consumed_messages_total", "Messages consumed by topic", labels=("topic",)
+)
+LAG = metrics.gauge(
+    "katia_kafka_consumer_lag",
+    "Messages waiting in the topic after the last one consumed",
+    labels=("topic",),
+)
+
 
 class KatiaConsumer(Consumer):
     """
@@ -31,10 +43,20 @@ class KatiaConsumer(Consumer):
         self.subscribe([self.topic])
         logger.info("Consumer has been initiated and subscribe to topic '%s'", self.topic)
 
-    def get_message(self):
+    def subscribe_topics(self, topics: list):
         """
-        This method is in charge of consuming the different messages sent to the topic
-        configured for the consumer.
+        Subscribe the consumer to several topics, replacing its current subscription. It
+        is used by the consumers shared by many owners.
+        :param topics:
+        :return:
+        """
+        self.subscribe(list(topics))
+        logger.info("Consumer subscribed to %s topics", len(topics))
+
+    def poll_message(self):
+        """
+        Return the next kafka message of the topics of the consumer, or None if there was
+        not any or it had an error.
 
         If there was an error it will log an error.
         :return:
@@ -48,7 +70,37 @@ class KatiaConsumer(Consumer):
                     "Error while consuming kafka message", extra={"error": str(error)}
                 )
             return None
-        return message.value().decode("utf-8")
+        self.update_lag(message)
+        if (recorder := SessionRecorder.active) is not None:
+            recorder.record(
+                direction="consumed", topic=message.topic(), value=message.value()
+            )
+        return message
+
+    def update_lag(self, message):
+        """
+        Update the metrics of the topic of the message. The lag uses the high watermark
+        of the last fetch, that the consumer has cached, so it does not ask the broker.
+        :param message:
+        :return:
+        """
+        topic = message.topic()
+        CONSUMED.inc(topic=topic)
+        _, high = self.get_watermark_offsets(
+            TopicPartition(topic, message.partition()), cached=True
+        )
+        if high >= 0:
+            LAG.set(max(0, high - message.offset() - 1), topic=topic)
+
+    def get_message(self):
+        """
+        This method is in charge of consuming the different messages sent to the topic
+        configured for the consumer.
+        :return:
+        """
+        if message := self.poll_message():
+            return message.value().decode("utf-8")
+        return None
 
     def get_data(self):
         """
@@ -59,3 +111,13 @@ class KatiaConsumer(Consumer):
         if message := self.get_message():
             return json.loads(message)
         return None
+
+    def get_topic_data(self):
+        """
+        Return the topic and the data of the next message, or None if there was not any.
+        It is used by the consumers subscribed to several topics.
+        :return:
+        """
+        if message := self.poll_message():
+            return message.topic(), json.loads(message.value().decode("utf-8"))
+        return None
@@ -4,8 +4,18 @@ import os
 
 from confluent_kafka import Producer
 
+from katia.message_manager.recorder import SessionRecorder
+from katia.metrics import metrics
+from katia.profiling import span
+
 logger = logging.getLogger("Katia")
 
+PRODUCED = metrics.counter(
+    "katia_kafka_produced_messages_total",
+    "Messages produced by topic and result",
+    labels=("topic", "result"),
+)
+
 
 class KatiaProducer(Producer):
     """
@@ -41,26 +51,65 @@ class KatiaProducer(Producer):
         :param message:
         :return:
         """
-        if err is not None:
-            logger.error(
-                "Error while producing message in katia producer",
-                extra={"err": err, "err_message": message.value().decode("utf-8")},
-            )
-        else:
-            message_to_logger = (
-                f"Produced message on topic {message.topic()} "
-                f"with value of {message.value().decode('utf-8')}"
-            )
-            logger.debug(message_to_logger)
+        with span("kafka.receipt"):
+            if err is not None:
+                PRODUCED.inc(topic=message.topic(), result="error")
+                logger.error(
+                    "Error while producing message in katia producer",
+                    extra={"err": err, "err_message": message.value().decode("utf-8")},
+                )
+            else:
+                PRODUCED.inc(topic=message.topic(), result="delivered")
+                # The value is only decoded if it is going to be logged
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Produced message on topic %s with value of %s",
+                        message.topic(),
+                        message.value().decode("utf-8"),
+                    )
 
-    def send_message(self, message_data):
+    def send_message(self, message_data, topic: str = None):
         """
         This is the method in charge of sending messages to the producer topic.
         :param message_data:
+        :param topic: Topic to use instead of the producer topic, for shared producers.
         :return:
         """
-        message = json.dumps(message_data)
-        self.produce(
-            topic=self.topic, value=message.encode("utf-8"), callback=self.receipt
-        )
-        self.flush()
+        topic = topic or self.topic
+        value = json.dumps(message_data).encode("utf-8")
+        if (recorder := SessionRecorder.active) is not None:
+            recorder.record(direction="produced", topic=topic, value=value)
+        with span("kafka.produce"):
+            self.produce(topic=topic, value=value, callback=self.receipt)
+            self.flush()
+
+    def close(self, timeout: float = 1):
+        """
+        Wait for the delivery of the messages still pending, at most the timeout. It is
+        used when the component using the producer stops.
+        :param timeout:
+        :return:
+        """
+        if pending := self.flush(timeout):
+            logger.error("'%s' messages not delivered closing the producer", pending)
+
+
+class TopicProducer:
+    """
+    View of a shared producer that sends the messages to one topic. This way a single
+    producer, with its connections, can be used by the components of many owners.
+    """
+
+    __slots__ = ("producer", "topic")
+
+    def __init__(self, producer: KatiaProducer, topic: str):
+        self.producer = producer
+        self.topic = topic
+
+    def send_message(self, message_data):
+        """
+        Send a message to the topic with the shared producer
+        :param message_data:
+        :return:
+        """
+        self.producer.send_message(message_data=message_data, topic=self.topic)
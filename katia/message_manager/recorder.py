@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import os
+import re
+import time
+from queue import Empty, SimpleQueue
+from threading import Thread
+
+logger = logging.getLogger("Katia")
+
+OWNER_TOPIC = re.compile(
+    r"^user-(?P<owner>.+)-(speaker|speaker-stopper|interpreter|recognizer-last-speaking)$"
+)
+
+
+def get_topic_owner(topic: str):
+    """
+    Return the uuid of the owner of a topic, or None if it is not a topic of an owner
+    :param topic:
+    :return:
+    """
+    if topic and (match := OWNER_TOPIC.match(topic)):
+        return match.group("owner")
+    return None
+
+
+class SessionRecorder(Thread):
+    """
+    Recorder of the traffic of the pipeline. Every message sent by the producers and
+    received by the consumers of the process is appended to a jsonl file, with the time,
+    the direction, the topic and the owner, so the session can be replayed later against
+    new versions of the interpreter and the speaker.
+
+    If the audio is recorded too, each phrase listened by the recognizer is saved as a
+    WAV file, and it is added to a recorded session that can be used as the audio source
+    of the recognizer.
+
+    The producers, the consumers and the recognizer only put the messages in a queue,
+    and the files are written in the recorder thread, so recording does not add the
+    latency of the disk to the pipeline.
+    """
+
+    # Recorder of the process, the kafka clients record in it while it is set
+    active = None
+
+    def __init__(self, directory: str, audio: bool = False):
+        super().__init__(daemon=True, name="KatiaRecorder")
+        self.directory = directory
+        self.audio = audio
+        self.queue = SimpleQueue()
+        self.started_at = time.time()
+        self.audio_files = 0
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+        self.traffic_path = os.path.join(directory, f"traffic-{os.getpid()}.jsonl")
+        self.session_path = os.path.join(directory, f"audio-{os.getpid()}.jsonl")
+
+    def run(self) -> None:
+        with open(self.traffic_path, "a", encoding="utf-8") as traffic_file:
+            while True:
+                try:
+                    # The file is flushed each time the queue is empty
+                    item = self.queue.get(timeout=0.5)
+                except Empty:
+                    traffic_file.flush()
+                    continue
+                if item is None:
+                    break
+                try:
+                    if item[0] == "audio":
+                        self.write_audio(*item[1:])
+                    else:
+                        traffic_file.write(self.envelope(*item))
+                except Exception as ex:
+                    logger.error(
+                        "Error while recording the session", extra={"error": str(ex)}
+                    )
+
+    def record(self, direction: str, topic: str, value: bytes):
+        """
+        Add a message to the recording
+        :param direction: produced or consumed.
+        :param topic:
+        :param value: Value of the kafka message, a JSON encoded in UTF-8.
+        :return:
+        """
+        self.queue.put((direction, time.time(), topic, value))
+
+    def record_audio(self, audio):
+        """
+        Add the audio of a phrase listened by the recognizer to the recording
+        :param audio: Audio data of the speech recognition library.
+        :return:
+        """
+        self.queue.put(("audio", time.time(), audio))
+
+    @staticmethod
+    def envelope(direction: str, at: float, topic: str, value: bytes):
+        """
+        Return the line of the recording for a message. The value is already a JSON, so
+        it is written as it is.
+        :param direction:
+        :param at:
+        :param topic:
+        :param value:
+        :return:
+        """
+        return (
+            f'{{"at":{at:.6f},"direction":"{direction}","topic":{json.dumps(topic)},'
+            f'"owner":{json.dumps(get_topic_owner(topic))},'
+            f'"data":{value.decode("utf-8")}}}\n'
+        )
+
+    def write_audio(self, at: float, audio):
+        """
+        Save the audio as a WAV file and add it to the recorded session of the audio. The
+        offset is when the phrase started, since the recording started.
+        :param at: Time when the phrase was listened.
+        :param audio:
+        :return:
+        """
+        self.audio_files += 1
+        file_name = f"audio-{os.getpid()}-{self.audio_files:06d}.wav"
+        with open(os.path.join(self.directory, file_name), "wb") as audio_file:
+            audio_file.write(audio.get_wav_data())
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        offset = max(0.0, at - seconds - self.started_at)
+        with open(self.session_path, "a", encoding="utf-8") as session_file:
+            session_file.write(
+                json.dumps({"file": file_name, "offset": round(offset, 3)}) + "\n"
+            )
+
+    def close(self, timeout: float = 5):
+        """
+        Stop recording and wait until the messages already recorded are written
+        :param timeout:
+        :return:
+        """
+        if SessionRecorder.active is self:
+            SessionRecorder.active = None
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        if self.is_alive():
+            self.join(timeout)
+        logger.info("Session recorded in '%s'", self.directory)
+
+
+def start_recorder():
+    """
+    Start recording the traffic of the process if it is enabled in the configuration
+    :return: The recorder, or None if the recording is disabled.
+    """
+    if os.getenv("KATIA_RECORDER", "False").lower() != "true":
+        return None
+    recorder = SessionRecorder(
+        directory=os.path.expanduser(os.getenv("KATIA_RECORDER_DIRECTORY", "recordings")),
+        audio=os.getenv("KATIA_RECORDER_AUDIO", "False").lower() == "true",
+    )
+    recorder.start()
+    SessionRecorder.active = recorder
+    atexit.register(recorder.close)
+    logger.info("Recording the session in '%s'", recorder.directory)
+    return recorder
@@ -0,0 +1,137 @@
+import glob
+import json
+import logging
+import os
+import time
+
+from katia.message_manager.producer import KatiaProducer
+from katia.message_manager.recorder import get_topic_owner
+
+logger = logging.getLogger("Katia")
+
+# Fields with the time when the message was created, that are moved to the time of the
+# replay, so the messages are not discarded as stale
+TIMESTAMP_FIELDS = ("created_at", "requested_at")
+
+
+def read_traffic(path: str, sources: tuple = ()):
+    """
+    Read the messages produced in a recording, sorted by time. The path can be a traffic
+    file or a directory, in which case the traffic files of all the processes in it are
+    merged.
+    :param path:
+    :param sources: Only the messages of these sources, like recognizer or interpreter,
+        are returned. All of them if it is empty.
+    :return:
+    """
+    paths = (
+        sorted(glob.glob(os.path.join(path, "traffic-*.jsonl")))
+        if os.path.isdir(path)
+        else [path]
+    )
+    envelopes = []
+    for traffic_path in paths:
+        with open(traffic_path, encoding="utf-8") as traffic_file:
+            for line in traffic_file:
+                if not line.strip():
+                    continue
+                envelope = json.loads(line)
+                # Each message is also consumed, but it is only replayed once
+                if envelope["direction"] != "produced":
+                    continue
+                if sources and envelope["data"].get("source", None) not in sources:
+                    continue
+                envelopes.append(envelope)
+    return sorted(envelopes, key=lambda envelope: envelope["at"])
+
+
+class SessionReplayer:
+    """
+    Replayer of a recorded session. It sends the messages produced in the session again,
+    keeping the time between them at the speed given, so the interpreter and the speaker
+    can be benchmarked with the traffic of a real session.
+
+    The messages can be filtered by their source, for example replaying only the ones of
+    the recognizer to benchmark the interpreter, and they can be sent to another owner.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: float = 1.0,
+        sources: tuple = (),
+        owner_uuid: str = None,
+        producer: KatiaProducer = None,
+    ):
+        self.envelopes = read_traffic(path=path, sources=sources)
+        self.speed = speed
+        self.owner_uuid = owner_uuid
+        self.producer = producer or KatiaProducer(topic=None, group_id="katia-replayer")
+        self.active = True
+
+    def topic(self, envelope: dict):
+        """
+        Return the topic to send the message, changing its owner if needed
+        :param envelope:
+        :return:
+        """
+        topic = envelope["topic"]
+        if self.owner_uuid and (owner := get_topic_owner(topic)):
+            topic = f"user-{self.owner_uuid}{topic[len('user-') + len(owner):]}"
+        return topic
+
+    @staticmethod
+    def data(envelope: dict, shift: float):
+        """
+        Return the data of the message with its timestamps moved by the shift
+        :param envelope:
+        :param shift: Seconds since the message was recorded.
+        :return:
+        """
+        data = dict(envelope["data"])
+        for field in TIMESTAMP_FIELDS:
+            if isinstance(data.get(field, None), (int, float)):
+                data[field] += shift
+        return data
+
+    def replay(self):
+        """
+        Send the messages of the session, and return how many of them were sent
+        :return:
+        """
+        if not self.envelopes:
+            logger.warning("There are no messages to replay")
+            return 0
+        recorded_at = self.envelopes[0]["at"]
+        started_at = time.monotonic()
+        replayed = 0
+        for envelope in self.envelopes:
+            if not self.active:
+                break
+            if self.speed > 0:
+                delay = (
+                    started_at
+                    + (envelope["at"] - recorded_at) / self.speed
+                    - time.monotonic()
+                )
+                if delay > 0:
+                    time.sleep(delay)
+            self.producer.send_message(
+                message_data=self.data(envelope, shift=time.time() - envelope["at"]),
+                topic=self.topic(envelope),
+            )
+            replayed += 1
+        logger.info(
+            "'%s' messages replayed in '%s' seconds",
+            replayed,
+            round(time.monotonic() - started_at, 2),
+        )
+        self.producer.close()
+        return replayed
+
+    def deactivate(self):
+        """
+        Method to stop the replay
+        :return:
+        """
+        self.active = False
@@ -0,0 +1,61 @@
+import logging
+from threading import Thread
+from typing import Callable
+
+from katia.message_manager.consumer import KatiaConsumer
+from katia.profiling import span
+
+logger = logging.getLogger("Katia")
+
+
+class KatiaSubscriber(Thread):
+    """
+    Background subscriber for a kafka topic. It will run in a separate thread consuming
+    all the messages of the consumer and calling the callback with the data of each of
+    them.
+
+    This way the components can keep their state updated without polling kafka in their
+    main loops.
+    """
+
+    def __init__(self, consumer: KatiaConsumer, callback: Callable[[dict], None]):
+        callback_name = getattr(callback, "__name__", "callback")
+        # The name tells apart the subscribers of a component in the profiles
+        super().__init__(daemon=True, name=f"KatiaSubscriber-{callback_name}")
+        self.consumer = consumer
+        self.callback = callback
+        self.stage = f"kafka.callback.{callback_name}"
+        self.active = True
+
+    def run(self) -> None:
+        self.subscribe()
+
+    def subscribe(self):
+        """
+        Main loop of the subscriber. It will call the callback for every message received
+        until it is deactivated, and then it will close the consumer.
+        :return:
+        """
+        logger.info("Subscriber started for topic '%s'", self.consumer.topic)
+        try:
+            while self.active:
+                data = self.consumer.get_data()
+                if data:
+                    try:
+                        with span(self.stage):
+                            self.callback(data)
+                    except Exception as ex:
+                        logger.error(
+                            "Error while processing subscribed message",
+                            extra={"error": str(ex), "topic": self.consumer.topic},
+                        )
+        finally:
+            # Leaving the group right away lets a new instance take over the topic
+            self.consumer.close()
+
+    def deactivate(self):
+        """
+        Method to stop the main loop of the subscriber
+        :return:
+        """
+        self.active = False
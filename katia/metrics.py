@@ -0,0 +1,412 @@
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Callable
+
+logger = logging.getLogger("Katia")
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def escape(value: str):
+    """
+    Escape a label value for the Prometheus text format
+    :param value:
+    :return:
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float):
+    """
+    Return a value for the Prometheus text format, keeping all its precision
+    :param value:
+    :return:
+    """
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: tuple, values: tuple):
+    """
+    Return the labels of a sample in the Prometheus text format
+    :param names:
+    :param values:
+    :return:
+    """
+    if not names:
+        return ""
+    labels = ",".join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{labels}}}"
+
+
+class Metric:
+    """
+    Base of the metrics of the registry. Each combination of label values has its own
+    value, that is created the first time it is used.
+
+    The values are updated under a lock, so the metrics can be updated from any thread.
+    Updating a value is just a dict lookup and an addition, so the metrics can be used
+    in the hot paths.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = Lock()
+
+    def key(self, labels: dict):
+        """
+        Return the label values in the order of the label names of the metric
+        :param labels:
+        :return:
+        """
+        if len(labels) != len(self.labels):
+            raise ValueError(f"Metric '{self.name}' needs the labels {self.labels}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """
+        Return the samples of the metric as tuples with the name of the sample, the
+        label names, the label values and the value
+        :return:
+        """
+        with self.lock:
+            values = list(self.values.items())
+        return [(self.name, self.labels, key, value) for key, value in values]
+
+    def render(self):
+        """
+        Return the metric in the Prometheus text format
+        :return:
+        """
+        lines = [
+            f"# HELP {self.name} {escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(
+                f"{name}{format_labels(label_names, label_values)} {format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Metric whose value only goes up, like the number of messages dropped
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        Increase the counter
+        :param amount:
+        :param labels:
+        :return:
+        """
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Metric whose value can go up and down, like the depth of a queue. The value can also
+    be a function that is called when the metrics are collected, so the hot paths do not
+    need to update it.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        """
+        Set the value of the gauge
+        :param value:
+        :param labels:
+        :return:
+        """
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """
+        Set a function that returns the value of the gauge when it is collected
+        :param function:
+        :param labels:
+        :return:
+        """
+        self.set(function, **labels)
+
+    def remove_function(self, function: Callable[[], float], **labels):
+        """
+        Remove the function of the gauge, so the object it belongs to can be released.
+        Nothing is removed if the function was replaced by another one meanwhile.
+        :param function:
+        :param labels:
+        :return:
+        """
+        key = self.key(labels)
+        with self.lock:
+            if self.values.get(key, None) is function:
+                del self.values[key]
+
+    def samples(self):
+        samples = []
+        for name, label_names, label_values, value in super().samples():
+            if callable(value):
+                try:
+                    value = value()
+                except Exception as ex:
+                    logger.error(
+                        "Error while collecting metric",
+                        extra={"metric": self.name, "error": str(ex)},
+                    )
+                    continue
+            samples.append((name, label_names, label_values, value))
+        return samples
+
+
+class Histogram(Metric):
+    """
+    Metric that counts the observed values in buckets, like the latency of the calls to
+    a service. It also keeps the sum and the count of the values, so the mean can be
+    calculated too.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name=name, documentation=documentation, labels=labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """
+        Add a value to the histogram
+        :param value:
+        :param labels:
+        :return:
+        """
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            if (data := self.values.get(key, None)) is None:
+                # The counts of each bucket, plus the overflow, the sum and the count
+                data = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager to observe the seconds spent inside it
+        :param labels:
+        :return:
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def samples(self):
+        with self.lock:
+            values = [(key, list(data)) for key, data in self.values.items()]
+        label_names = self.labels + ("le",)
+        samples = []
+        for key, data in values:
+            cumulative = 0
+            for bucket, count in zip(self.buckets + (float("inf"),), data):
+                cumulative += count
+                le = "+Inf" if bucket == float("inf") else f"{bucket:g}"
+                samples.append(
+                    (f"{self.name}_bucket", label_names, key + (le,), cumulative)
+                )
+            samples.append((f"{self.name}_sum", self.labels, key, data[-2]))
+            samples.append((f"{self.name}_count", self.labels, key, data[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Registry with the metrics of the process. The metrics are created by the modules
+    that update them, and asking twice for the same metric returns the same one, so the
+    metrics can be declared where they are used.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = Lock()
+
+    def get_or_create(self, metric_class, name: str, **kwargs):
+        """
+        Return the metric with the name, creating it if it does not exist
+        :param metric_class:
+        :param name:
+        :param kwargs:
+        :return:
+        """
+        with self.lock:
+            if (metric := self.metrics.get(name, None)) is None:
+                metric = self.metrics[name] = metric_class(name=name, **kwargs)
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"Metric '{name}' is already registered as {metric.type}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        """
+        Return the counter with the name
+        :param name:
+        :param documentation:
+        :param labels:
+        :return:
+        """
+        return self.get_or_create(
+            Counter, name=name, documentation=documentation, labels=labels
+        )
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        """
+        Return the gauge with the name
+        :param name:
+        :param documentation:
+        :param labels:
+        :return:
+        """
+        return self.get_or_create(
+            Gauge, name=name, documentation=documentation, labels=labels
+        )
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """
+        Return the histogram with the name
+        :param name:
+        :param documentation:
+        :param labels:
+        :param buckets: Upper bounds of the buckets.
+        :return:
+        """
+        return self.get_or_create(
+            Histogram,
+            name=name,
+            documentation=documentation,
+            labels=labels,
+            buckets=buckets,
+        )
+
+    def render(self):
+        """
+        Return all the metrics in the Prometheus text format
+        :return:
+        """
+        with self.lock:
+            registered = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        return "".join(f"{metric.render()}\n" for metric in registered)
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Handler that returns the metrics of the registry of the server
+    """
+
+    def do_GET(self):  # pylint: disable=C0103
+        """
+        Return the metrics in ``/metrics``, and not found for any other path
+        :return:
+        """
+        if self.path.split("?", maxsplit=1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        logger.debug("Metrics request: %s", format % args)
+
+
+class MetricsServer(Thread):
+    """
+    HTTP server that exposes the metrics in ``/metrics`` in the Prometheus text format,
+    so they can be scraped for the capacity planning and the alerts.
+    """
+
+    def __init__(self, host: str, port: int, registry: MetricsRegistry = metrics):
+        super().__init__(daemon=True)
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = registry
+        self.port = self.server.server_address[1]
+
+    def run(self) -> None:
+        logger.info("Serving metrics in port '%s'", self.port)
+        self.server.serve_forever()
+
+    def deactivate(self):
+        """
+        Method to stop the server
+        :return:
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_metrics_server(port: int = None):
+    """
+    Start the metrics server if the metrics are enabled in the configuration, or if a
+    port is given
+    :param port: Port to use instead of the one configured.
+    :return: The server, or None if the metrics are disabled.
+    """
+    if port is None:
+        if os.getenv("KATIA_METRICS", "False").lower() != "true":
+            return None
+        port = int(os.getenv("KATIA_METRICS_PORT", "9464"))
+    try:
+        server = MetricsServer(
+            host=os.getenv("KATIA_METRICS_HOST", "127.0.0.1"), port=port
+        )
+    except OSError as ex:
+        logger.error(
+            "The metrics server could not be started",
+            extra={"port": port, "error": str(ex)},
+        )
+        return None
+    server.start()
+    return server
@@ -12,10 +12,12 @@ class Owner:
     Basic info about the owner of the assistant
     """
 
-    def __init__(self, name: str, create_topics: bool = True):
+    def __init__(self, name: str, create_topics: bool = True, owner_uuid: str = None):
         logger.info("Initializing owner")
         self.name = name
-        self.uuid = uuid.uuid4().hex
+        # The uuid is given when the owner already exists, for example when each
+        # component runs in its own process
+        self.uuid = owner_uuid or uuid.uuid4().hex
         if create_topics:
             self.create_kafka_topics()
         logger.info("Owner initialized")
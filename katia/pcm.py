@@ -0,0 +1,11 @@
+"""
+Operations on raw PCM audio. ``audioop`` is deprecated and removed in Python 3.13, so it
+is only imported here and it can be replaced in one place.
+"""
+
+# pylint: disable=W4901
+from audioop import bias, byteswap, lin2lin, ratecv, rms, tomono
+
+# pylint: enable=W4901
+
+__all__ = ["bias", "byteswap", "lin2lin", "ratecv", "rms", "tomono"]
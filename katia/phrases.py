@@ -0,0 +1,12 @@
+"""
+Fixed phrases that Katia says. They are known before starting, so the speaker can have
+them ready to be reproduced.
+"""
+
+STARTER_MESSAGE = "Hi! Let me configure some things. Once all is ready I will call you!"
+READY_MESSAGE = "All is ready! I will be your assistant!"
+ERROR_MESSAGE = (
+    "sorry, something went wrong. It seems that I can not understand what are you saying"
+)
+# Short clips reproduced while the interpreter is thinking the answer
+FILLER_MESSAGES = ("Let me think.", "One moment.", "Give me a second.")
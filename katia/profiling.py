@@ -0,0 +1,213 @@
+import atexit
+import logging
+import os
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from threading import Event, Thread
+from threading import enumerate as enumerate_threads
+
+from katia.metrics import metrics
+
+logger = logging.getLogger("Katia")
+
+SPAN_SECONDS = metrics.histogram(
+    "katia_span_seconds",
+    "Seconds spent in each stage of the hot loops, only while profiling",
+    labels=("stage",),
+)
+
+# Set while the spans are enabled, so a disabled span is just a check of the event
+SPANS = Event()
+NO_SPAN = nullcontext()
+
+
+def span(stage: str):
+    """
+    Context manager to time a stage of the hot loops, like a call to an external
+    service. The time is observed in the ``katia_span_seconds`` metric, and only while
+    the spans are enabled, so the spans can be left in the hot loops.
+    :param stage: Name of the stage, like ``interpreter.completion``.
+    :return:
+    """
+    if not SPANS.is_set():
+        return NO_SPAN
+    return SPAN_SECONDS.time(stage=stage)
+
+
+class Profiler(Thread):
+    """
+    Profiler of the process for a window of time. It can enable the spans, sample the
+    stacks of all the threads and take snapshots of the memory allocations.
+
+    The sampler reads the current frame of each thread at every interval, so it does not
+    slow down the threads profiled like a tracing profiler would. The stacks are written
+    in a file per thread, in the collapsed format used by the flame graph tools, so each
+    component thread can be inspected on its own. The threads waiting are sampled too,
+    so the files show where the time goes, not only where the CPU goes.
+
+    The allocations are traced with tracemalloc, that does slow down the process, so it
+    is only enabled during the window. Each snapshot is dumped to a file and the lines
+    that allocated more memory since the previous one are logged.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        spans: bool = True,
+        sampling: bool = True,
+        allocations: bool = False,
+        allocation_frames: int = 10,
+        interval_in_seconds: float = 0.01,
+        snapshot_interval_in_seconds: float = 60,
+        duration_in_seconds: float = 0,
+    ):
+        super().__init__(daemon=True, name="KatiaProfiler")
+        self.directory = directory
+        self.spans = spans
+        self.sampling = sampling
+        self.allocations = allocations
+        self.allocation_frames = allocation_frames
+        self.interval_in_seconds = interval_in_seconds
+        self.snapshot_interval_in_seconds = snapshot_interval_in_seconds
+        self.duration_in_seconds = duration_in_seconds
+        self.stacks = defaultdict(Counter)
+        self.snapshots = 0
+        self.last_snapshot = None
+        self.stopped = Event()
+
+    def run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if self.spans:
+            SPANS.set()
+        if self.allocations:
+            tracemalloc.start(self.allocation_frames)
+        started_at = time.monotonic()
+        next_snapshot_at = started_at + self.snapshot_interval_in_seconds
+        # Without the sampler the loop only needs to check the snapshots and the window
+        interval_in_seconds = self.interval_in_seconds if self.sampling else 1
+        logger.info("Profiling started, writing the profiles in '%s'", self.directory)
+        try:
+            while not self.stopped.wait(interval_in_seconds):
+                if self.sampling:
+                    self.sample()
+                now = time.monotonic()
+                if self.allocations and now >= next_snapshot_at:
+                    self.snapshot()
+                    next_snapshot_at = now + self.snapshot_interval_in_seconds
+                if self.duration_in_seconds and (
+                    now - started_at >= self.duration_in_seconds
+                ):
+                    break
+        finally:
+            SPANS.clear()
+            if self.sampling:
+                self.write_stacks()
+            if self.allocations:
+                self.snapshot()
+                tracemalloc.stop()
+            logger.info("Profiling finished")
+
+    def sample(self):
+        """
+        Add the current stack of each thread, except the profiler one, to the stacks of
+        its thread
+        :return:
+        """
+        names = {thread.ident: thread.name for thread in enumerate_threads()}
+        for ident, frame in sys._current_frames().items():  # pylint: disable=W0212
+            if ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            self.stacks[names.get(ident, str(ident))][";".join(reversed(stack))] += 1
+
+    def write_stacks(self):
+        """
+        Write the stacks sampled of each thread in its own file, with a line for each
+        stack and the number of times it was sampled
+        :return:
+        """
+        for name, stacks in self.stacks.items():
+            path = os.path.join(
+                self.directory,
+                f"{os.getpid()}-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.folded",
+            )
+            with open(path, "w", encoding="utf-8") as profile:
+                for stack, count in stacks.most_common():
+                    profile.write(f"{stack} {count}\n")
+        logger.info("Stacks of %s threads written", len(self.stacks))
+
+    def snapshot(self):
+        """
+        Dump a snapshot of the memory allocations and log the lines that allocated more
+        memory since the previous one
+        :return:
+        """
+        snapshot = tracemalloc.take_snapshot()
+        self.snapshots += 1
+        snapshot.dump(
+            os.path.join(
+                self.directory, f"{os.getpid()}-allocations-{self.snapshots}.snapshot"
+            )
+        )
+        if self.last_snapshot is not None:
+            for statistic in snapshot.compare_to(self.last_snapshot, "lineno")[:5]:
+                logger.info("Allocations: %s", statistic)
+        self.last_snapshot = snapshot
+
+    def deactivate(self):
+        """
+        Method to stop the profiler. The profiles are written before the thread ends.
+        :return:
+        """
+        self.stopped.set()
+
+    def stop(self, timeout: float = 5):
+        """
+        Stop the profiler and wait until the profiles are written. It is called when the
+        process exits.
+        :param timeout:
+        :return:
+        """
+        self.deactivate()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def start_profiling():
+    """
+    Start the profiler if any of the profiling options is enabled in the configuration
+    :return: The profiler, or None if the profiling is disabled.
+    """
+    spans = os.getenv("KATIA_PROFILING_SPANS", "False").lower() == "true"
+    sampling = os.getenv("KATIA_PROFILING_SAMPLER", "False").lower() == "true"
+    allocations = os.getenv("KATIA_PROFILING_ALLOCATIONS", "False").lower() == "true"
+    if not (spans or sampling or allocations):
+        return None
+    profiler = Profiler(
+        directory=os.path.expanduser(os.getenv("KATIA_PROFILING_DIRECTORY", "profiles")),
+        spans=spans,
+        sampling=sampling,
+        allocations=allocations,
+        allocation_frames=int(os.getenv("KATIA_PROFILING_ALLOCATION_FRAMES", "10")),
+        interval_in_seconds=(
+            float(os.getenv("KATIA_PROFILING_SAMPLE_INTERVAL_IN_MS", "10")) / 1000
+        ),
+        snapshot_interval_in_seconds=float(
+            os.getenv("KATIA_PROFILING_SNAPSHOT_INTERVAL_IN_SECONDS", "60")
+        ),
+        duration_in_seconds=float(os.getenv("KATIA_PROFILING_DURATION_IN_SECONDS", "0")),
+    )
+    profiler.start()
+    atexit.register(profiler.stop)
+    return profiler
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import time
+
+import speech_recognition as sr
+
+logger = logging.getLogger("KatiaRecognizer")
+
+AUDIO_FILE_EXTENSIONS = (".wav", ".flac", ".aiff", ".aif")
+SESSION_FILE_EXTENSION = ".jsonl"
+
+
+class ReplayStream:
+    """
+    Stream wrapper for the audio files. It will pace the reads of the wrapped stream so
+    the audio is delivered at real time (speed 1), accelerated (speed > 1) or as fast as
+    possible (speed 0).
+
+    Once the wrapped stream has no more data it will be marked as exhausted.
+    """
+
+    def __init__(self, stream, sample_rate: int, sample_width: int, speed: float = 1.0):
+        self.stream = stream
+        self.bytes_per_second = sample_rate * sample_width
+        self.speed = speed
+        self.exhausted = False
+        self.started_at = None
+        self.audio_seconds = 0.0
+
+    def read(self, size=-1):
+        """
+        Read from the wrapped stream. If the stream is paced it will sleep until the
+        audio read should have been delivered.
+        :param size:
+        :return:
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        buffer = self.stream.read(size)
+        if not buffer:
+            self.exhausted = True
+            return buffer
+        self.audio_seconds += len(buffer) / self.bytes_per_second
+        if self.speed > 0:
+            delay = (
+                self.started_at + self.audio_seconds / self.speed - time.monotonic()
+            )
+            if delay > 0:
+                time.sleep(delay)
+        return buffer
+
+
+class ReplayAudioFile(sr.AudioFile):
+    """
+    Audio source for WAV/AIFF/FLAC files that can be used instead of the microphone. The
+    audio is replayed at the speed configured, and it can wait until a start offset to
+    reproduce recorded sessions.
+    """
+
+    def __init__(self, filename: str, speed: float = 1.0, start_at: float = None):
+        super().__init__(filename)
+        self.speed = speed
+        self.start_at = start_at
+
+    def __enter__(self):
+        super().__enter__()
+        if self.start_at is not None and self.speed > 0:
+            delay = self.start_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        logger.info("Replaying audio file '%s'", self.filename_or_fileobject)
+        self.stream = ReplayStream(
+            stream=self.stream,
+            sample_rate=self.SAMPLE_RATE,
+            sample_width=self.SAMPLE_WIDTH,
+            speed=self.speed,
+        )
+        return self
+
+    @property
+    def exhausted(self):
+        """
+        Return if all the audio of the file has been already read
+        :return:
+        """
+        return self.stream is not None and self.stream.exhausted
+
+
+def list_audio_files(path: str):
+    """
+    Return the list of audio files for the path. It can be a single audio file or a
+    directory, in which case all the audio files in it are returned sorted by name.
+    :param path:
+    :return:
+    """
+    if os.path.isdir(path):
+        return [
+            os.path.join(path, file_name)
+            for file_name in sorted(os.listdir(path))
+            if file_name.lower().endswith(AUDIO_FILE_EXTENSIONS)
+        ]
+    return [path]
+
+
+def read_session(path: str):
+    """
+    Read a recorded session. The session is a jsonl file where each line has the audio
+    file to reproduce and the offset, in seconds, since the session started. The file
+    paths are relative to the session file.
+    :param path:
+    :return:
+    """
+    session_directory = os.path.dirname(path)
+    entries = []
+    with open(path, "r", encoding="utf8") as session_file:
+        for line in session_file:
+            if line.strip():
+                entry = json.loads(line)
+                entries.append(
+                    (
+                        os.path.join(session_directory, entry["file"]),
+                        float(entry.get("offset", 0)),
+                    )
+                )
+    return sorted(entries, key=lambda entry: entry[1])
+
+
+def get_audio_sources(source: str = "microphone", speed: float = 1.0):
+    """
+    Return the audio sources to listen to, in order. By default, it will be the
+    microphone, but it can be also an audio file, a directory with audio files or a
+    recorded session file.
+    :param source:
+    :param speed:
+    :return:
+    """
+    if source == "microphone":
+        return [sr.Microphone()]
+    if source.lower().endswith(SESSION_FILE_EXTENSION):
+        session_start = time.monotonic()
+        return [
+            ReplayAudioFile(
+                filename=file_name,
+                speed=speed,
+                start_at=session_start + offset / speed if speed > 0 else None,
+            )
+            for file_name, offset in read_session(source)
+        ]
+    return [
+        ReplayAudioFile(filename=file_name, speed=speed)
+        for file_name in list_audio_files(source)
+    ]
@@ -0,0 +1,143 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import speech_recognition as sr
+
+from katia.recognizer.audio_source import list_audio_files
+from katia.recognizer.encoding import AudioEncoder
+
+logger = logging.getLogger("KatiaRecognizer")
+
+
+def transcribe_file(file_name: str, language: str = "en-US"):
+    """
+    Transcribe a complete audio file using the Google recognition method. It will return
+    the transcription and the time spent recognizing it, including the preparation of
+    the audio for the upload.
+    :param file_name:
+    :param language:
+    :return:
+    """
+    recognizer = sr.Recognizer()
+    result = {
+        "file": file_name,
+        "transcript": "",
+        "duration": 0.0,
+        "latency": 0.0,
+        "error": None,
+    }
+    try:
+        with sr.AudioFile(file_name) as source:
+            result["duration"] = source.DURATION
+            audio = recognizer.record(source)
+        start = time.perf_counter()
+        recognized = recognizer.recognize_google(
+            AudioEncoder().prepare(
+                audio=audio, energy_threshold=recognizer.energy_threshold
+            ),
+            language=language,
+            show_all=True,
+        )
+        result["latency"] = time.perf_counter() - start
+        if recognized:
+            result["transcript"] = next(
+                iter(recognized.get("alternative", [])), {}
+            ).get("transcript", "")
+    except Exception as ex:
+        result["error"] = str(ex)
+    return result
+
+
+class BatchTranscriber:
+    """
+    Transcriber for a corpus of audio files. The files are transcribed across a process
+    pool, and it will report the throughput and the latency for each file.
+
+    It can be used for regression benchmarks of the recognizer or for offline bulk jobs.
+    """
+
+    def __init__(self, language: str = None, workers: int = None):
+        self.language = language or os.getenv("KATIA_LANGUAGE", "en-US")
+        self.workers = workers or int(
+            os.getenv("RECOGNIZER_BATCH_WORKERS", str(os.cpu_count() or 1))
+        )
+
+    def transcribe(self, path: str):
+        """
+        Transcribe all the audio files in the path and return the report.
+        :param path:
+        :return:
+        """
+        files = list_audio_files(path)
+        logger.info(
+            "Transcribing %s files with %s workers", len(files), self.workers
+        )
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = list(
+                executor.map(transcribe_file, files, [self.language] * len(files))
+            )
+        return self.report(results=results, elapsed=time.perf_counter() - start)
+
+    def report(self, results: list, elapsed: float):
+        """
+        Build the report for the transcriptions done.
+        :param results:
+        :param elapsed:
+        :return:
+        """
+        # The failed files are only counted as errors, their latency is not measured
+        latencies = sorted(
+            result["latency"] for result in results if not result["error"]
+        )
+        audio_seconds = sum(result["duration"] for result in results)
+        return {
+            "files": len(results),
+            "errors": sum(1 for result in results if result["error"]),
+            "workers": self.workers,
+            "elapsed": elapsed,
+            "files_per_second": len(results) / elapsed if elapsed else 0.0,
+            "audio_seconds_per_second": audio_seconds / elapsed if elapsed else 0.0,
+            "latency_mean": statistics.mean(latencies) if latencies else 0.0,
+            "latency_p50": self.percentile(latencies, 50),
+            "latency_p95": self.percentile(latencies, 95),
+            "results": results,
+        }
+
+    @staticmethod
+    def percentile(values: list, percent: float):
+        """
+        Return the percentile of a sorted list of values.
+        :param values:
+        :param percent:
+        :return:
+        """
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+        return values[index]
+
+
+def main():
+    """
+    Entry point to run the batch transcription from the command line.
+    :return:
+    """
+    parser = argparse.ArgumentParser(description="Transcribe a corpus of audio files")
+    parser.add_argument("path", help="Audio file or directory with audio files")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+    report = BatchTranscriber(
+        language=arguments.language, workers=arguments.workers
+    ).transcribe(arguments.path)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import logging
+import os
+import subprocess
+
+import speech_recognition as sr
+
+from katia import pcm
+
+logger = logging.getLogger("KatiaRecognizer")
+
+# Google recognition only accepts 16 bits FLAC audio
+UPLOAD_SAMPLE_WIDTH = 2
+TRIM_WINDOW_IN_SECONDS = 0.01
+
+
+class UploadAudioData(sr.AudioData):
+    """
+    Audio data prepared to be uploaded for the recognition. It encodes the FLAC data with
+    the compression level configured instead of always using the best (and slowest) one.
+    """
+
+    def __init__(
+        self,
+        frame_data: bytes,
+        sample_rate: int,
+        sample_width: int,
+        compression_level: int,
+    ):
+        super().__init__(frame_data, sample_rate, sample_width)
+        self.compression_level = compression_level
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        """
+        Return the FLAC encoded data using the compression level of the audio. If the
+        encoder fails, the data is encoded as speech recognition does.
+        :param convert_rate:
+        :param convert_width:
+        :return:
+        """
+        wav_data = self.get_wav_data(convert_rate, convert_width)
+        process = subprocess.run(
+            [
+                sr.get_flac_converter(),
+                "--stdout",
+                "--totally-silent",
+                f"-{self.compression_level}",
+                "-",
+            ],
+            input=wav_data,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+        )
+        if process.returncode != 0:
+            logger.warning(
+                "Error encoding the FLAC data, using the default encoding",
+                extra={
+                    "returncode": process.returncode,
+                    "error": process.stderr.decode(errors="replace"),
+                },
+            )
+            return super().get_flac_data(convert_rate, convert_width)
+        return process.stdout
+
+
+class AudioEncoder:
+    """
+    Preprocessing for the audio before sending it to recognize. It will resample the audio
+    to the rate preferred by the recognizer, and it will trim the silence at the start and
+    at the end of the phrase. This way the bytes uploaded for each phrase are reduced.
+
+    The audio from the audio sources is always mono, so it does not need to be downmixed.
+    """
+
+    def __init__(self):
+        self.sample_rate = int(os.getenv("RECOGNIZER_UPLOAD_SAMPLE_RATE", "16000"))
+        self.compression_level = int(
+            os.getenv("RECOGNIZER_FLAC_COMPRESSION_LEVEL", "5")
+        )
+        self.trim_padding_in_seconds = float(
+            os.getenv("RECOGNIZER_TRIM_PADDING_IN_SECONDS", "0.1")
+        )
+
+    def prepare(self, audio: sr.AudioData, energy_threshold: float):
+        """
+        Return the audio ready to be uploaded to the recognizer
+        :param audio:
+        :param energy_threshold:
+        :return:
+        """
+        sample_rate = min(audio.sample_rate, self.sample_rate)
+        frame_data = audio.get_raw_data(
+            convert_rate=sample_rate, convert_width=UPLOAD_SAMPLE_WIDTH
+        )
+        frame_data = self.trim(
+            frame_data=frame_data,
+            sample_rate=sample_rate,
+            energy_threshold=energy_threshold,
+        )
+        logger.debug(
+            "Audio prepared for upload from '%s' bytes to '%s' bytes",
+            len(audio.frame_data),
+            len(frame_data),
+        )
+        return UploadAudioData(
+            frame_data=frame_data,
+            sample_rate=sample_rate,
+            sample_width=UPLOAD_SAMPLE_WIDTH,
+            compression_level=self.compression_level,
+        )
+
+    def trim(self, frame_data: bytes, sample_rate: int, energy_threshold: float):
+        """
+        Remove the silence at the start and at the end of the audio, keeping some padding.
+        If there is no audio over the energy threshold it is returned as it is.
+        :param frame_data:
+        :param sample_rate:
+        :param energy_threshold:
+        :return:
+        """
+        window = max(1, int(sample_rate * TRIM_WINDOW_IN_SECONDS)) * UPLOAD_SAMPLE_WIDTH
+        voiced = [
+            start
+            for start in range(0, len(frame_data), window)
+            if pcm.rms(frame_data[start:start + window], UPLOAD_SAMPLE_WIDTH)
+            > energy_threshold
+        ]
+        if not voiced:
+            return frame_data
+        padding = int(sample_rate * self.trim_padding_in_seconds) * UPLOAD_SAMPLE_WIDTH
+        start = max(0, voiced[0] - padding)
+        end = min(len(frame_data), voiced[-1] + window + padding)
+        return frame_data[start:end]
@@ -0,0 +1,110 @@
+import logging
+import os
+from collections import deque
+from threading import Event, Thread
+
+import speech_recognition as sr
+
+from katia import pcm
+
+logger = logging.getLogger("KatiaRecognizer")
+
+
+class CalibrationStream:
+    """
+    Stream wrapper that gives to the noise calibrator every frame read from the audio
+    source. It only keeps a reference to the frame, so it does not add work to the
+    listen loop.
+    """
+
+    def __init__(self, stream, frames: deque):
+        self.stream = stream
+        self.frames = frames
+
+    def read(self, size=-1):
+        """
+        Read from the wrapped stream and store the frame for the calibration
+        :param size:
+        :return:
+        """
+        buffer = self.stream.read(size)
+        if buffer:
+            self.frames.append(buffer)
+        return buffer
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class NoiseCalibrator(Thread):
+    """
+    Adaptive noise floor estimator. It will run in a separate thread, and it will
+    periodically compute the energy of the last frames captured by the recognizer in a
+    ring buffer.
+
+    The noise floor is a low percentile of those energies, so the user speech does not
+    move it, and the energy threshold of the recognizer is updated from it without
+    blocking the listen loop.
+    """
+
+    def __init__(self, recognizer: sr.Recognizer):
+        super().__init__(daemon=True)
+        self.recognizer = recognizer
+        self.window_in_seconds = float(
+            os.getenv("RECOGNIZER_NOISE_WINDOW_IN_SECONDS", "5")
+        )
+        self.interval_in_seconds = float(
+            os.getenv("RECOGNIZER_NOISE_CALIBRATION_INTERVAL_IN_SECONDS", "0.5")
+        )
+        self.percentile = float(os.getenv("RECOGNIZER_NOISE_PERCENTILE", "20"))
+        self.ratio = float(os.getenv("RECOGNIZER_NOISE_THRESHOLD_RATIO", "1.5"))
+        self.minimum_threshold = recognizer.energy_threshold
+        self.sample_width = 2
+        self.frames = deque()
+        self.stopped = Event()
+
+    def attach(self, source: sr.AudioSource):
+        """
+        Start calibrating with the frames of the audio source. The ring buffer is sized
+        to keep the configured window of audio for this source.
+        :param source:
+        :return:
+        """
+        frames_in_window = max(
+            1, int(self.window_in_seconds * source.SAMPLE_RATE / source.CHUNK)
+        )
+        self.sample_width = source.SAMPLE_WIDTH
+        self.frames = deque(maxlen=frames_in_window)
+        source.stream = CalibrationStream(stream=source.stream, frames=self.frames)
+
+    def run(self) -> None:
+        logger.info("Noise calibrator started")
+        while not self.stopped.wait(self.interval_in_seconds):
+            self.calibrate()
+
+    def calibrate(self):
+        """
+        Compute the noise floor with the frames in the ring buffer and update the energy
+        threshold of the recognizer.
+        :return:
+        """
+        frames = list(self.frames)
+        if not frames:
+            return None
+        energies = sorted(pcm.rms(frame, self.sample_width) for frame in frames)
+        noise_floor = energies[
+            min(len(energies) - 1, int(len(energies) * self.percentile / 100))
+        ]
+        threshold = max(self.minimum_threshold, noise_floor * self.ratio)
+        logger.debug(
+            "Noise floor '%s', energy threshold updated to '%s'", noise_floor, threshold
+        )
+        self.recognizer.energy_threshold = threshold
+        return threshold
+
+    def deactivate(self):
+        """
+        Method to stop the calibration
+        :return:
+        """
+        self.stopped.set()
@@ -1,18 +1,39 @@
-import datetime
 import logging
 import os
 import re
+import time
 from ast import literal_eval
 from threading import Thread
+from typing import Callable
 
 import speech_recognition as sr
-from pygame import mixer
 
+from katia import pcm
 from katia.message_manager import KatiaProducer
 from katia.message_manager.consumer import KatiaConsumer
+from katia.message_manager.recorder import SessionRecorder
+from katia.message_manager.subscriber import KatiaSubscriber
+from katia.metrics import metrics
+from katia.profiling import span
+from katia.recognizer.audio_source import ReplayAudioFile, get_audio_sources
+from katia.recognizer.encoding import AudioEncoder
+from katia.recognizer.noise import NoiseCalibrator
+from katia.state import SpeakingState
 
 logger = logging.getLogger("KatiaRecognizer")
 
+RECOGNITIONS = metrics.counter(
+    "katia_recognizer_recognitions_total",
+    "Calls to the recognition service by result",
+    labels=("result",),
+)
+RECOGNITION_SECONDS = metrics.histogram(
+    "katia_recognizer_recognition_seconds", "Time spent recognizing each phrase"
+)
+WAKE_WORDS = metrics.counter(
+    "katia_recognizer_wake_words_total", "Phrases that called the assistant by its name"
+)
+
 
 class KatiaRecognizer(Thread):
     """
@@ -26,11 +47,22 @@ class KatiaRecognizer(Thread):
     speaking to the assistant.
     """
 
-    def __init__(self, valid_names: list, owner_uuid: str):
-        super().__init__()
+    def __init__(
+        self,
+        valid_names: list,
+        owner_uuid: str,
+        speaking_state: SpeakingState = None,
+        producer_factory: Callable[..., KatiaProducer] = None,
+        consumer_factory: Callable[..., KatiaConsumer] = None,
+    ):
+        super().__init__(name="KatiaRecognizer")
         logger.info("Starting recognizer")
         self.recognizer = sr.Recognizer()
         self.configure_recognizer()
+        self.audio_encoder = AudioEncoder()
+        self.noise_calibrator = None
+        if os.getenv("RECOGNIZER_NOISE_CALIBRATION", "False").lower() == "true":
+            self.noise_calibrator = NoiseCalibrator(recognizer=self.recognizer)
 
         self.language = os.getenv("KATIA_LANGUAGE", "en-US")
         self.stopper_extra_words = literal_eval(
@@ -45,56 +77,134 @@ class KatiaRecognizer(Thread):
         self.gap_continue_conversation_in_seconds = int(
             os.getenv("RECOGNIZER_GAP_CONTINUE_CONVERSATION_IN_SECONDS", "3")
         )
+        self.audio_source = os.getenv("RECOGNIZER_AUDIO_SOURCE", "microphone")
+        self.audio_source_speed = float(os.getenv("RECOGNIZER_AUDIO_SOURCE_SPEED", "1"))
+        self.listen_timeout_in_seconds = float(
+            os.getenv("RECOGNIZER_LISTEN_TIMEOUT_IN_SECONDS", "1")
+        )
         self.valid_names = valid_names
-        self.producer = KatiaProducer(
+        producer_factory = producer_factory or KatiaProducer
+        consumer_factory = consumer_factory or KatiaConsumer
+        self.producer = producer_factory(
             topic=f"user-{owner_uuid}-interpreter",
             group_id=owner_uuid
         )
-        self.producer_stopper = KatiaProducer(
+        self.producer_stopper = producer_factory(
             topic=f"user-{owner_uuid}-speaker-stopper", group_id=owner_uuid
         )
-        self.consumer_last_speaking = KatiaConsumer(
-            topic=f"user-{owner_uuid}-recognizer-last-speaking", group_id=owner_uuid
-        )
-        self.last_speaking = datetime.datetime.now()
+        self.subscriber_last_speaking = None
+        if speaking_state is None:
+            # The speaker is not in the same process, so the state is rebuilt from the
+            # events it publishes
+            speaking_state = SpeakingState()
+            self.subscriber_last_speaking = KatiaSubscriber(
+                consumer=consumer_factory(
+                    topic=f"user-{owner_uuid}-recognizer-last-speaking",
+                    group_id=owner_uuid,
+                ),
+                callback=speaking_state.update,
+            )
+        self.speaking_state = speaking_state
         self.active = True
         logger.info("Recognizer started")
 
     def run(self) -> None:
-        self.listen()
+        if self.subscriber_last_speaking:
+            self.subscriber_last_speaking.start()
+        try:
+            self.listen()
+        finally:
+            self.close()
 
     def listen(self):
         """
         This method is the main method for the recognizer. It will continuously be
         listening to the user voice, and once it detects that the user is talking to the
-        assistant it will send the recognized message to kafka
+        assistant it will send the recognized message to kafka.
+
+        By default, the voice comes from the microphone, but it can also be replayed from
+        audio files or recorded sessions configured in the audio source.
+
+        The noise is calibrated in background with the audio captured, so it does not need
+        to wait for the ambient noise adjustment to start listening.
         :return:
         """
-        with sr.Microphone() as source:
-            logger.info("Waiting for adjustment of ambient noise")
-            self.recognizer.adjust_for_ambient_noise(source)
-            logger.info("Ambient noise adjustment done")
-            while self.active:
-                audio = self.recognizer.listen(source=source)
-                try:
+        if self.noise_calibrator:
+            self.noise_calibrator.start()
+        for audio_source in get_audio_sources(
+            source=self.audio_source, speed=self.audio_source_speed
+        ):
+            if not self.active:
+                break
+            with audio_source as source:
+                if self.noise_calibrator:
+                    self.noise_calibrator.attach(source)
+                elif not isinstance(source, ReplayAudioFile):
+                    logger.info("Waiting for adjustment of ambient noise")
+                    self.recognizer.adjust_for_ambient_noise(source)
+                    logger.info("Ambient noise adjustment done")
+                self.listen_source(source=source)
+
+    def listen_source(self, source):
+        """
+        Listen to the audio source until the recognizer is deactivated or until there is
+        no more audio in the source.
+        :param source:
+        :return:
+        """
+        while self.active and not self.is_exhausted(source):
+            try:
+                # The timeout lets the loop check if the recognizer was deactivated
+                with span("recognizer.listen"):
+                    audio = self.recognizer.listen(
+                        source=source, timeout=self.listen_timeout_in_seconds
+                    )
+            except sr.WaitTimeoutError:
+                continue
+            if (recorder := SessionRecorder.active) is not None and recorder.audio:
+                recorder.record_audio(audio)
+            if self.is_exhausted(source) and (
+                pcm.rms(audio.frame_data, audio.sample_width)
+                <= self.recognizer.energy_threshold
+            ):
+                # Only the remaining silence of the source was listened
+                break
+            try:
+                with span("recognizer.encoding"):
+                    audio = self.audio_encoder.prepare(
+                        audio=audio, energy_threshold=self.recognizer.energy_threshold
+                    )
+                with RECOGNITION_SECONDS.time(), span("recognizer.recognition"):
                     recognized = self.recognizer.recognize_google(
                         audio, language=self.language, show_all=True
                     )
-                    logger.debug("recognizer catch: '%s'", recognized)
-                    self.get_last_speaking()
-                    if self.called_me(recognized=recognized):
-                        self.produce_messages(
-                            next(iter(recognized.get("alternative", [])), {})
-                            .get("transcript", "")
-                            .lower()
-                        )
-                except sr.UnknownValueError:
-                    continue
-                except Exception as ex:
-                    logger.error(
-                        "Something unexpected happened during the listen",
-                        extra={"error": ex},
+                RECOGNITIONS.inc(result="recognized" if recognized else "empty")
+                logger.debug("recognizer catch: '%s'", recognized)
+                if self.called_me(recognized=recognized):
+                    self.produce_messages(
+                        next(iter(recognized.get("alternative", [])), {})
+                        .get("transcript", "")
+                        .lower()
                     )
+            except sr.UnknownValueError:
+                RECOGNITIONS.inc(result="unknown")
+                continue
+            except Exception as ex:
+                RECOGNITIONS.inc(result="error")
+                logger.error(
+                    "Something unexpected happened during the listen",
+                    extra={"error": ex},
+                )
+
+    @staticmethod
+    def is_exhausted(source):
+        """
+        Check if the audio source has no more audio to listen. The microphone will never
+        be exhausted.
+        :param source:
+        :return:
+        """
+        return isinstance(source, ReplayAudioFile) and source.exhausted
 
     def produce_messages(self, recognized):
         """
@@ -104,11 +214,15 @@ class KatiaRecognizer(Thread):
         :param recognized:
         :return:
         """
-        is_speaking = mixer.music.get_busy()
+        is_speaking = self.speaking_state.speaking
         if is_speaking and self.should_assistant_stop_talking(recognized):
             # Stop the speaker if the user directly asks to do so while Katia is speaking
             self.producer_stopper.send_message(
-                message_data={"source": "recognizer", "message": "Stop speaking"}
+                message_data={
+                    "source": "recognizer",
+                    "message": "Stop speaking",
+                    "requested_at": time.time(),
+                }
             )
         if not is_speaking and not self.should_assistant_stop_talking(recognized):
             # Send the recognized message to the interpreter if Katia is not speaking
@@ -165,9 +279,8 @@ class KatiaRecognizer(Thread):
         if (
             recognized and
             self.continue_conversation_delay_in_seconds >
-            (
-                datetime.datetime.now() - self.last_speaking
-            ).total_seconds() > self.gap_continue_conversation_in_seconds
+            self.speaking_state.last_speaking.seconds_since() >
+            self.gap_continue_conversation_in_seconds
         ):
             return True
         if recognized:
@@ -181,6 +294,7 @@ class KatiaRecognizer(Thread):
                     valid_name in alternatives.get("transcript", "").lower()
                     for valid_name in self.valid_names
                 ):
+                    WAKE_WORDS.inc()
                     return True
         return False
 
@@ -214,18 +328,26 @@ class KatiaRecognizer(Thread):
         :return:
         """
         self.active = False
+        if self.subscriber_last_speaking:
+            self.subscriber_last_speaking.deactivate()
+        if self.noise_calibrator:
+            self.noise_calibrator.deactivate()
 
-    def get_last_speaking(self):
+    def drain(self):
         """
-        Get the latest speaking from the speaker and save it.
+        Method to stop the recognizer once the phrase being recognized is sent
+        :return:
         """
-        data = self.consumer_last_speaking.get_data()
-        if data and (source := data.get("source", None)):
-            if source == "speaker":
-                logger.info(
-                    "Received when katia stopped talking"
-                )
-                self.last_speaking = datetime.datetime.strptime(
-                    data['message'],
-                    "%Y-%m-%dT%H:%M:%S.%f"
-                )
+        self.deactivate()
+
+    def close(self):
+        """
+        Wait for the subscriber to close its consumer and deliver the messages pending
+        :return:
+        """
+        if self.subscriber_last_speaking:
+            self.subscriber_last_speaking.deactivate()
+            if self.subscriber_last_speaking.is_alive():
+                self.subscriber_last_speaking.join()
+        self.producer.close()
+        self.producer_stopper.close()
@@ -0,0 +1,59 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger("Katia")
+
+
+def shutdown(components: dict, drain: bool = True, timeout: float = None):
+    """
+    Stop the components at the same time, waiting for them until the deadline. All of
+    them share the same deadline, so the shutdown takes at most the timeout plus the
+    grace period, whatever the number of components.
+
+    When draining, the components stop taking new work but they finish the work in
+    flight, like the message being interpreted or the answers waiting to be reproduced.
+    The ones that do not finish before the deadline are deactivated, so they stop as
+    soon as possible, and they get a grace period to close their kafka clients.
+    :param components: Components to stop by name.
+    :param drain:
+    :param timeout: Time for the components to stop. By default, the one configured.
+    :return: The names of the components that are still running.
+    """
+    if timeout is None:
+        timeout = float(os.getenv("KATIA_SHUTDOWN_TIMEOUT_IN_SECONDS", "5"))
+    grace_in_seconds = float(os.getenv("KATIA_SHUTDOWN_GRACE_IN_SECONDS", "1"))
+    started_at = time.monotonic()
+    for component in components.values():
+        if drain:
+            component.drain()
+        else:
+            component.deactivate()
+    running = wait(components=components, deadline=started_at + timeout)
+    if drain and running:
+        logger.warning("Components %s did not drain in time, deactivating them", running)
+        for name in running:
+            components[name].deactivate()
+        running = wait(
+            components={name: components[name] for name in running},
+            deadline=time.monotonic() + grace_in_seconds,
+        )
+    if running:
+        logger.error("Components %s did not stop in time", running)
+    logger.info(
+        "Shutdown finished in %.0f ms", (time.monotonic() - started_at) * 1000
+    )
+    return running
+
+
+def wait(components: dict, deadline: float):
+    """
+    Wait for the components until the deadline
+    :param components:
+    :param deadline: Monotonic time to stop waiting.
+    :return: The names of the components that are still running.
+    """
+    for component in components.values():
+        if component.is_alive():
+            component.join(max(0.0, deadline - time.monotonic()))
+    return [name for name, component in components.items() if component.is_alive()]
@@ -0,0 +1,301 @@
+import io
+import logging
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+import wave
+from abc import ABC, abstractmethod
+from array import array
+from threading import Lock
+from typing import Callable
+
+from katia import pcm
+from katia.metrics import metrics
+from katia.startup import LazyImport
+
+logger = logging.getLogger("KatiaSpeaker")
+
+SYNTHESIS_SECONDS = metrics.histogram(
+    "katia_speaker_synthesis_seconds",
+    "Time spent synthesizing each text by backend",
+    labels=("backend",),
+)
+SYNTHESIZED_BYTES = metrics.counter(
+    "katia_speaker_synthesized_bytes_total",
+    "Bytes of audio synthesized by backend",
+    labels=("backend",),
+)
+
+# AWS is only needed by the polly backend. The proxies are named as the classes of boto,
+# not as constants.
+# pylint: disable=C0103
+Session = LazyImport("boto3", "Session")
+Config = LazyImport("botocore.config", "Config")
+# pylint: enable=C0103
+
+# The PCM audio of every backend is signed 16 bits little endian mono, as in Polly
+PCM_SAMPLE_WIDTH = 2
+
+
+class TTSError(Exception):
+    """
+    Error raised by the TTS backends when the speech can not be synthesized
+    """
+
+
+class MeasuredStream:
+    """
+    Stream wrapper that counts the bytes read, and reports them once it is closed
+    """
+
+    def __init__(self, stream, on_close: Callable[[int], None]):
+        self.stream = stream
+        self.on_close = on_close
+        self.size = 0
+        self.closed = False
+
+    def read(self, *args):
+        """
+        Read from the wrapped stream counting the bytes
+        :param args:
+        :return:
+        """
+        data = self.stream.read(*args)
+        self.size += len(data)
+        return data
+
+    def close(self):
+        """
+        Close the wrapped stream and report the bytes read
+        :return:
+        """
+        if not self.closed:
+            self.closed = True
+            self.stream.close()
+            self.on_close(self.size)
+
+
+class TTSBackend(ABC):
+    """
+    Base for the text to speech backends used by the speaker. Each backend returns the
+    audio synthesized as a stream, and it keeps the synthesis time and the bytes
+    produced by all its requests.
+
+    The voice and the engine identify the audio that the backend produces for a text, so
+    they are used for the cache.
+    """
+
+    name = "base"
+    output_formats = ()
+
+    def __init__(self, voice: str, engine: str):
+        self.voice = voice
+        self.engine = engine
+        self.requests = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.lock = Lock()
+
+    def synthesize(self, text: str, output_format: str, sample_rate: int):
+        """
+        Return the stream with the audio for the text, or None if the backend did not
+        return any audio. The synthesis is reported once the stream is closed.
+        :param text:
+        :param output_format:
+        :param sample_rate:
+        :return:
+        """
+        started_at = time.monotonic()
+        stream = self.synthesize_stream(
+            text=text, output_format=output_format, sample_rate=sample_rate
+        )
+        if stream is None:
+            return None
+        return MeasuredStream(
+            stream=stream, on_close=lambda size: self.report(started_at, size)
+        )
+
+    @abstractmethod
+    def synthesize_stream(self, text: str, output_format: str, sample_rate: int):
+        """
+        Method to implement by each backend to synthesize the text
+        :param text:
+        :param output_format:
+        :param sample_rate:
+        :return:
+        """
+
+    def report(self, started_at: float, size: int):
+        """
+        Save the time and the bytes of a synthesis
+        :param started_at:
+        :param size:
+        :return:
+        """
+        seconds = time.monotonic() - started_at
+        with self.lock:
+            self.requests += 1
+            self.seconds += seconds
+            self.bytes += size
+        SYNTHESIS_SECONDS.observe(seconds, backend=self.name)
+        SYNTHESIZED_BYTES.inc(size, backend=self.name)
+        logger.debug(
+            "Backend '%s' synthesized %s bytes in %.0f ms",
+            self.name,
+            size,
+            seconds * 1000,
+        )
+
+
+class PollyBackend(TTSBackend):
+    """
+    Backend for AWS polly. You will need to be logged in AWS and have a user with the
+    right permissions.
+    """
+
+    name = "polly"
+    output_formats = ("mp3", "ogg_vorbis", "pcm")
+
+    def __init__(
+        self, profile_name: str, voice: str, engine: str, max_pool_connections: int = 10
+    ):
+        super().__init__(voice=voice, engine=engine)
+        self.session = Session(profile_name=profile_name)
+        # The client is thread-safe, and it keeps the connections alive to be reused
+        self.polly = self.session.client(
+            "polly",
+            config=Config(max_pool_connections=max_pool_connections, tcp_keepalive=True),
+        )
+
+    def synthesize_stream(self, text: str, output_format: str, sample_rate: int):
+        parameters = {}
+        if output_format == "pcm":
+            parameters["SampleRate"] = str(sample_rate)
+        response = self.polly.synthesize_speech(
+            Text=text,
+            OutputFormat=output_format,
+            VoiceId=self.voice,
+            Engine=self.engine,
+            **parameters,
+        )
+        return response.get("AudioStream", None)
+
+
+class LocalBackend(TTSBackend):
+    """
+    Offline backend that synthesizes the speech in the host with espeak-ng (or espeak),
+    so the speaker can run without AWS credentials nor network access.
+    """
+
+    name = "local"
+    output_formats = ("pcm",)
+
+    def __init__(self, language: str):
+        super().__init__(
+            voice=os.getenv("SPEAKER_LOCAL_VOICE", language.split("-", maxsplit=1)[0]),
+            engine="espeak",
+        )
+        self.command = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.command:
+            raise TTSError("The local backend needs espeak-ng or espeak installed")
+
+    def synthesize_stream(self, text: str, output_format: str, sample_rate: int):
+        try:
+            process = subprocess.run(
+                [self.command, "--stdout", "-v", self.voice, text],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
+            with wave.open(io.BytesIO(process.stdout), "rb") as wav_file:
+                channels = wav_file.getnchannels()
+                sample_width = wav_file.getsampwidth()
+                frame_rate = wav_file.getframerate()
+                frames = wav_file.readframes(wav_file.getnframes())
+        except (OSError, subprocess.CalledProcessError, wave.Error, EOFError) as ex:
+            raise TTSError(f"Error synthesizing with {self.command}: {ex}") from ex
+        if sample_width == 1:
+            # 8 bits WAV audio is unsigned
+            frames = pcm.bias(frames, 1, -128)
+        if sample_width != PCM_SAMPLE_WIDTH:
+            frames = pcm.lin2lin(frames, sample_width, PCM_SAMPLE_WIDTH)
+        if channels != 1:
+            frames = pcm.tomono(frames, PCM_SAMPLE_WIDTH, 0.5, 0.5)
+        if frame_rate != sample_rate:
+            frames, _ = pcm.ratecv(
+                frames, PCM_SAMPLE_WIDTH, 1, frame_rate, sample_rate, None
+            )
+        if sys.byteorder == "big":
+            frames = pcm.byteswap(frames, PCM_SAMPLE_WIDTH)
+        return io.BytesIO(frames)
+
+
+class FakeBackend(TTSBackend):
+    """
+    Deterministic backend for the benchmarks. It returns a tone whose duration is
+    proportional to the length of the text, after a configurable latency.
+    """
+
+    name = "fake"
+    output_formats = ("pcm",)
+    tone_frequency = 400
+
+    def __init__(self):
+        super().__init__(voice="fake", engine="fake")
+        self.latency_in_seconds = float(os.getenv("SPEAKER_FAKE_LATENCY_IN_SECONDS", "0"))
+        self.seconds_per_character = float(
+            os.getenv("SPEAKER_FAKE_SECONDS_PER_CHARACTER", "0.06")
+        )
+
+    def synthesize_stream(self, text: str, output_format: str, sample_rate: int):
+        if self.latency_in_seconds:
+            time.sleep(self.latency_in_seconds)
+        # The tone is built repeating a period of 10 ms
+        period_samples = sample_rate // 100
+        period = array(
+            "h",
+            (
+                int(8000 * math.sin(2 * math.pi * self.tone_frequency * i / sample_rate))
+                for i in range(period_samples)
+            ),
+        )
+        if sys.byteorder == "big":
+            period.byteswap()
+        samples = int(len(text) * self.seconds_per_character * sample_rate)
+        periods = samples // period_samples + 1
+        return io.BytesIO((period.tobytes() * periods)[:samples * PCM_SAMPLE_WIDTH])
+
+
+def get_backend(
+    name: str,
+    profile_name: str,
+    voice: str,
+    engine: str,
+    language: str,
+    max_pool_connections: int = 10,
+) -> TTSBackend:
+    """
+    Return the TTS backend for the name
+    :param name: polly, local or fake
+    :param profile_name:
+    :param voice:
+    :param engine:
+    :param language:
+    :param max_pool_connections: Connections kept by the backends with a connection pool.
+    :return:
+    """
+    if name == "polly":
+        return PollyBackend(
+            profile_name=profile_name,
+            voice=voice,
+            engine=engine,
+            max_pool_connections=max_pool_connections,
+        )
+    if name == "local":
+        return LocalBackend(language=language)
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown TTS backend '{name}'")
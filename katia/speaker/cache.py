@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger("KatiaSpeaker")
+
+
+class TTSCache:
+    """
+    Cache for the audio synthesized by the speaker. The audio is addressed by the hash of
+    everything that changes the audio: the text, the voice, the engine and the output
+    format.
+
+    It has an in-memory LRU in front of a store in disk capped by size, where the least
+    recently used files are removed first. The size in disk is tracked in memory, so the
+    directory is only scanned the first time and when the cache is full.
+    """
+
+    def __init__(self):
+        self.directory = os.path.expanduser(
+            os.getenv("SPEAKER_CACHE_DIRECTORY", "~/.cache/katia/tts")
+        )
+        self.memory_items = int(os.getenv("SPEAKER_CACHE_MEMORY_ITEMS", "64"))
+        self.disk_size = int(os.getenv("SPEAKER_CACHE_DISK_SIZE_IN_MB", "50")) * 2**20
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        # Bytes of the audios in disk, unknown until the directory is scanned
+        self.disk_usage = None
+        self.disk_lock = Lock()
+
+    @staticmethod
+    def key(text: str, voice: str, engine: str, output_format: str):
+        """
+        Return the key of the audio for the synthesis parameters
+        :param text:
+        :param voice:
+        :param engine:
+        :param output_format:
+        :return:
+        """
+        return hashlib.sha256(
+            "\0".join((text, voice, engine, output_format)).encode("utf-8")
+        ).hexdigest()
+
+    def path(self, key: str):
+        """
+        Return the path in disk for the key
+        :param key:
+        :return:
+        """
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str):
+        """
+        Return the audio cached for the key, or None if it is not cached. Audio found in
+        disk is promoted to the memory cache.
+        :param key:
+        :return:
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        try:
+            with open(self.path(key), "rb") as file:
+                audio = file.read()
+            os.utime(self.path(key))
+        except OSError:
+            return None
+        self.set_memory(key=key, audio=audio)
+        return audio
+
+    def set(self, key: str, audio: bytes):
+        """
+        Save the audio for the key in memory and in disk
+        :param key:
+        :param audio:
+        :return:
+        """
+        self.set_memory(key=key, audio=audio)
+        temporary_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Each write has its own temporary file, so the threads and the processes
+            # saving the same key do not write the same file
+            with tempfile.NamedTemporaryFile(
+                dir=self.directory, suffix=".tmp", delete=False
+            ) as file:
+                temporary_path = file.name
+                file.write(audio)
+            try:
+                replaced_size = os.path.getsize(self.path(key))
+            except OSError:
+                replaced_size = 0
+            os.replace(temporary_path, self.path(key))
+            temporary_path = None
+            self.add_disk_usage(len(audio) - replaced_size)
+        except OSError as ex:
+            logger.error("Error saving audio in cache", extra={"error": str(ex)})
+            if temporary_path is not None:
+                try:
+                    os.remove(temporary_path)
+                except OSError:
+                    pass
+
+    def add_disk_usage(self, size: int):
+        """
+        Add the bytes written to the size in disk, evicting the least recently used files
+        if the cache does not fit its size
+        :param size:
+        :return:
+        """
+        with self.disk_lock:
+            if self.disk_usage is not None:
+                self.disk_usage += size
+            if self.disk_usage is None or self.disk_usage > self.disk_size:
+                self.disk_usage = self.evict()
+
+    def set_memory(self, key: str, audio: bytes):
+        """
+        Save the audio in memory, removing the least recently used if it is full
+        :param key:
+        :param audio:
+        :return:
+        """
+        with self.lock:
+            self.memory[key] = audio
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+    def evict(self):
+        """
+        Remove the least recently used files in disk until the cache fits its size
+        :return: The bytes of the files left.
+        """
+        entries = []
+        with os.scandir(self.directory) as directory_entries:
+            for entry in directory_entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.disk_size:
+                break
+            os.remove(path)
+            total_size -= size
+        return total_size
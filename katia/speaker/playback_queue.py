@@ -0,0 +1,130 @@
+import logging
+import os
+import time
+from collections import Counter
+from threading import Condition
+
+from katia.metrics import metrics
+
+logger = logging.getLogger("KatiaSpeaker")
+
+DROPPED = metrics.counter(
+    "katia_speaker_dropped_messages_total",
+    "Messages dropped instead of being reproduced by reason",
+    labels=("reason",),
+)
+
+
+class PlaybackQueue:
+    """
+    Queue of the messages waiting to be reproduced by the speaker. The system notices are
+    reproduced before the answers, and the messages older than the staleness deadline are
+    dropped instead of being reproduced.
+
+    A new answer supersedes the answers and the fillers that are still waiting, so the
+    user hears the newest one without waiting behind old audio. Repeated notices and
+    fillers are coalesced. All the messages dropped are counted by reason.
+    """
+
+    NOTICE = "notice"
+    ANSWER = "answer"
+    FILLER = "filler"
+    PRIORITIES = {NOTICE: 0, ANSWER: 1, FILLER: 2}
+
+    def __init__(self):
+        self.stale_in_seconds = float(
+            os.getenv("SPEAKER_STALE_MESSAGE_IN_SECONDS", "30")
+        )
+        self.messages = []
+        self.dropped = Counter()
+        self.condition = Condition()
+
+    def put(self, data: dict):
+        """
+        Add a message to the queue, dropping the messages it supersedes
+        :param data:
+        :return:
+        """
+        priority = data.get("priority", self.ANSWER)
+        message = {
+            **data,
+            "priority": priority if priority in self.PRIORITIES else self.ANSWER,
+            "created_at": data.get("created_at", None) or time.time(),
+        }
+        with self.condition:
+            if message["priority"] == self.ANSWER:
+                self.drop(reason="superseded", priority=self.ANSWER)
+                self.drop(reason="superseded", priority=self.FILLER)
+            elif any(self.coalesces(waiting, message) for waiting in self.messages):
+                self.count_dropped(reason="coalesced", dropped=1)
+                return
+            self.messages.append(message)
+            self.condition.notify()
+
+    def coalesces(self, waiting: dict, message: dict):
+        """
+        Return if the message is already represented by the waiting one. Only one filler
+        can be waiting, and the same notice is not repeated.
+        :param waiting:
+        :param message:
+        :return:
+        """
+        if waiting["priority"] != message["priority"]:
+            return False
+        if message["priority"] == self.FILLER:
+            return True
+        return waiting.get("message") == message.get("message")
+
+    def get(self, timeout: float = None):
+        """
+        Return the next message to reproduce, or None if there was not any before the
+        timeout. The stale messages are dropped.
+        :param timeout:
+        :return:
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.messages, timeout=timeout)
+            now = time.time()
+            for message in list(self.messages):
+                if now - message["created_at"] > self.stale_in_seconds:
+                    self.messages.remove(message)
+                    self.count_dropped(reason="stale", dropped=1)
+                    logger.debug("Stale message dropped: '%s'", message.get("message"))
+            if not self.messages:
+                return None
+            message = min(
+                self.messages, key=lambda waiting: self.PRIORITIES[waiting["priority"]]
+            )
+            self.messages.remove(message)
+            return message
+
+    def drop(self, reason: str, priority: str = None):
+        """
+        Drop the messages waiting, or only the ones with the priority if it is set
+        :param reason:
+        :param priority:
+        :return:
+        """
+        with self.condition:
+            kept = [
+                message
+                for message in self.messages
+                if priority is not None and message["priority"] != priority
+            ]
+            if dropped := len(self.messages) - len(kept):
+                self.count_dropped(reason=reason, dropped=dropped)
+                logger.debug("%s messages dropped because they were %s", dropped, reason)
+            self.messages = kept
+
+    def count_dropped(self, reason: str, dropped: int):
+        """
+        Count the messages dropped by the reason
+        :param reason:
+        :param dropped:
+        :return:
+        """
+        self.dropped[reason] += dropped
+        DROPPED.inc(dropped, reason=reason)
+
+    def __len__(self):
+        return len(self.messages)
@@ -0,0 +1,283 @@
+import io
+import logging
+import os
+from threading import Event, Lock
+from typing import Callable, Iterable
+
+from pygame import mixer
+
+logger = logging.getLogger("KatiaSpeaker")
+
+# Name used by pygame to know the format of the audio for each polly output format
+NAMEHINTS = {"ogg_vorbis": "ogg"}
+# Polly PCM audio is signed 16 bits little endian mono
+PCM_SAMPLE_WIDTH = 2
+
+
+def audio_file(audio):
+    """
+    Return the audio as a file-like object for the mixer
+    :param audio:
+    :return:
+    """
+    return io.BytesIO(audio) if isinstance(audio, bytes) else audio
+
+
+class ChannelPool:
+    """
+    Pool of the channels of the mixer. Each player reserves its own channel, so the
+    speakers of several owners in the same process can reproduce at the same time, and
+    stopping one of them does not stop the others.
+
+    The channels given are reserved, so the sounds played without a channel do not use
+    them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.free = []
+        self.lock = Lock()
+
+    def acquire(self):
+        """
+        Return the index of a channel only for the caller, adding a channel to the mixer
+        if all of them are in use
+        :return:
+        """
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            index = self.count
+            self.count += 1
+            mixer.set_num_channels(max(mixer.get_num_channels(), self.count))
+            mixer.set_reserved(self.count)
+            return index
+
+    def release(self, index: int):
+        """
+        Give back a channel, so other player can use it
+        :param index:
+        :return:
+        """
+        with self.lock:
+            self.free.append(index)
+
+
+channel_pool = ChannelPool()
+
+
+class GaplessPlayer:
+    """
+    Player for a sequence of audios. While an audio is being reproduced the next one is
+    queued in the pygame music mixer, so it starts as soon as the current one ends
+    without waiting for the speaker loop.
+
+    There is only one music mixer in the process, so when several speakers share it
+    their players take turns: a player waits until the other one ends, and it only
+    stops its own reproduction. Use the ``pcm`` output for several speakers reproducing
+    at the same time.
+    """
+
+    # Lock held by the player reproducing in the music mixer, that is the playing one
+    music_lock = Lock()
+    playing = None
+
+    def __init__(self, output_format: str = "mp3"):
+        self.output_format = output_format
+        self.namehint = NAMEHINTS.get(output_format, output_format)
+        self.poll_interval_in_seconds = float(
+            os.getenv("SPEAKER_PLAYBACK_POLL_INTERVAL_IN_SECONDS", "0.05")
+        )
+
+    def play(
+        self,
+        audios: Iterable,
+        stopped: Event,
+        on_start: Callable[[], None] = None,
+    ):
+        """
+        Reproduce the audios in order. The audios can be a generator, so the next audio
+        can be still synthesizing while the previous is being reproduced. Each audio can
+        be bytes or a file-like object that is still being downloaded.
+        :param audios:
+        :param stopped: Event that will be set if the reproduction must stop.
+        :param on_start: Callable that will be called just before the first audio starts.
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        # The lock is polled to notice the stop event, and it is released below
+        lock_timeout = self.poll_interval_in_seconds
+        while not self.music_lock.acquire(timeout=lock_timeout):  # pylint: disable=R1732
+            if stopped.is_set():
+                return False
+        GaplessPlayer.playing = self
+        try:
+            return self.play_audios(audios=audios, stopped=stopped, on_start=on_start)
+        finally:
+            GaplessPlayer.playing = None
+            self.music_lock.release()
+
+    def play_audios(
+        self,
+        audios: Iterable,
+        stopped: Event,
+        on_start: Callable[[], None] = None,
+    ):
+        """
+        Reproduce the audios in order in the music mixer, that must be free
+        :param audios:
+        :param stopped:
+        :param on_start:
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        started = False
+        for audio in audios:
+            if audio is None:
+                continue
+            if stopped.is_set():
+                return False
+            if mixer.music.get_busy():
+                mixer.music.queue(audio_file(audio), self.namehint)
+                if not self.wait(stopped=stopped, until_next=True):
+                    return False
+                continue
+            mixer.music.load(audio_file(audio), self.namehint)
+            if not started and on_start:
+                on_start()
+            started = True
+            mixer.music.play()
+        return self.wait(stopped=stopped)
+
+    def stop(self):
+        """
+        Stop the reproduction right away, only if the music mixer is reproducing the
+        audios of this player
+        :return:
+        """
+        if GaplessPlayer.playing is self:
+            mixer.music.stop()
+
+    def close(self):
+        """
+        The music mixer is shared, so there is nothing to release
+        :return:
+        """
+
+    def wait(self, stopped: Event, until_next: bool = False):
+        """
+        Wait until the mixer ends reproducing or the stop event is set. The stop event
+        wakes up the wait immediately, and the end of the audio is noticed in the next
+        poll. If until_next is True it will also return when the queued audio starts,
+        that is when the position of the music is reset.
+        :param stopped:
+        :param until_next:
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        position = mixer.music.get_pos()
+        while mixer.music.get_busy():
+            if stopped.wait(self.poll_interval_in_seconds):
+                mixer.music.stop()
+                return False
+            if until_next:
+                current_position = mixer.music.get_pos()
+                if current_position < position:
+                    logger.debug("Queued audio started")
+                    return True
+                position = current_position
+        return not stopped.is_set()
+
+
+class PCMPlayer:
+    """
+    Low latency player for raw PCM audio. The audio is cut in small chunks of samples
+    that are queued in a mixer channel, so there is no decoder and the first chunk is
+    reproduced as soon as it is downloaded.
+
+    The mixer must be initialized with the sample rate of the audio, 16 bits and mono.
+    Each player reproduces in its own channel of the pool.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        chunk_in_ms = float(os.getenv("SPEAKER_PCM_CHUNK_IN_MS", "200"))
+        self.chunk_size = int(sample_rate * chunk_in_ms / 1000) * PCM_SAMPLE_WIDTH
+        self.poll_interval_in_seconds = float(
+            os.getenv("SPEAKER_PLAYBACK_POLL_INTERVAL_IN_SECONDS", "0.05")
+        )
+        self.channel_index = None
+        self.channel = None
+
+    def play(
+        self,
+        audios: Iterable,
+        stopped: Event,
+        on_start: Callable[[], None] = None,
+    ):
+        """
+        Reproduce the audios in order, chunk by chunk. The next chunk is queued in the
+        channel while the current one is being reproduced.
+        :param audios:
+        :param stopped: Event that will be set if the reproduction must stop.
+        :param on_start: Callable that will be called just before the first chunk starts.
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        if self.channel is None:
+            self.channel_index = channel_pool.acquire()
+            self.channel = mixer.Channel(self.channel_index)
+        started = False
+        for audio in audios:
+            if audio is None:
+                continue
+            file = audio_file(audio)
+            while chunk := file.read(self.chunk_size):
+                if stopped.is_set():
+                    return False
+                # A broken download could end in the middle of a sample
+                chunk = chunk[:len(chunk) - len(chunk) % PCM_SAMPLE_WIDTH]
+                if not chunk:
+                    continue
+                sound = mixer.Sound(buffer=chunk)
+                if not self.channel.get_busy():
+                    if not started and on_start:
+                        on_start()
+                    started = True
+                    self.channel.play(sound)
+                    continue
+                if not self.wait(stopped=stopped, until_queue_is_free=True):
+                    return False
+                self.channel.queue(sound)
+        return self.wait(stopped=stopped)
+
+    def stop(self):
+        """
+        Stop the reproduction of the channel of the player right away
+        :return:
+        """
+        if self.channel is not None:
+            self.channel.stop()
+
+    def close(self):
+        """
+        Stop the reproduction and give back the channel of the player
+        :return:
+        """
+        if self.channel is not None:
+            self.channel.stop()
+            channel_pool.release(self.channel_index)
+            self.channel = None
+            self.channel_index = None
+
+    def wait(self, stopped: Event, until_queue_is_free: bool = False):
+        """
+        Wait until the channel ends reproducing or the stop event is set. If
+        until_queue_is_free is True it will also return when there is no chunk queued.
+        :param stopped:
+        :param until_queue_is_free:
+        :return: False if the reproduction was stopped, True if it ended.
+        """
+        while self.channel.get_busy() and (
+            not until_queue_is_free or self.channel.get_queue() is not None
+        ):
+            if stopped.wait(self.poll_interval_in_seconds):
+                self.channel.stop()
+                return False
+        return not stopped.is_set()
@@ -2,118 +2,423 @@ import datetime
 import logging
 import os
 import time
+from ast import literal_eval
 from contextlib import closing
-from threading import Thread
+from threading import Event, Lock, Thread, Timer
+from typing import Callable
 
-from boto3 import Session
 from botocore.exceptions import BotoCoreError, ClientError
-from googletrans import Translator
 from pygame import mixer
 
 from katia.message_manager import KatiaProducer
 from katia.message_manager.consumer import KatiaConsumer
+from katia.message_manager.subscriber import KatiaSubscriber
+from katia.metrics import metrics
+from katia.phrases import (ERROR_MESSAGE, FILLER_MESSAGES, READY_MESSAGE,
+                           STARTER_MESSAGE)
+from katia.profiling import span
+from katia.speaker.backends import TTSError
+from katia.speaker.cache import TTSCache
+from katia.speaker.playback_queue import PlaybackQueue
+from katia.speaker.player import GaplessPlayer, PCMPlayer
+from katia.speaker.stream import StreamingAudio
+from katia.speaker.synthesis import SynthesisService
+from katia.speaker.text import split_text
+from katia.startup import LazyImport
+from katia.state import SpeakingState
 
 logger = logging.getLogger("KatiaSpeaker")
 
+# The translator is only needed when the language is not english. The proxy is named as
+# the class it imports
+Translator = LazyImport("googletrans", "Translator")  # pylint: disable=C0103
+
+QUEUE_TIMEOUT_IN_SECONDS = 0.5
+
+QUEUE_DEPTH = metrics.gauge(
+    "katia_speaker_queue_depth", "Messages waiting to be reproduced", labels=("owner",)
+)
+TIME_TO_FIRST_SAMPLE = metrics.histogram(
+    "katia_speaker_time_to_first_sample_seconds",
+    "Time since a message is received until its first sample is reproduced",
+)
+
 
 class KatiaSpeaker(Thread):
     """
     This is the main speaker. It will run in a separate thread, and it will continuously
     be listening kafka topic to check if the interpreter sent something to reproduce.
 
-    It is based on AWS polly service, so you will need to be logged in AWS and have a user
-    with the right permissions if you want this to work.
+    By default, it is based on AWS polly service, so you will need to be logged in AWS and
+    have a user with the right permissions if you want this to work. It can also use an
+    offline local synthesizer, or a fake one for the benchmarks.
     """
 
-    def __init__(self, owner_uuid: str):
-        super().__init__()
+    def __init__(
+        self,
+        owner_uuid: str,
+        speaking_state: SpeakingState = None,
+        synthesis_service: SynthesisService = None,
+        producer_factory: Callable[..., KatiaProducer] = None,
+        consumer_factory: Callable[..., KatiaConsumer] = None,
+    ):
+        super().__init__(name="KatiaSpeaker")
         logger.info("Starting speaker")
         self.profile_name = os.getenv("AWS_PROFILE_NAME", "adminuser")
         self.voice = os.getenv("AWS_VOICE_NAME", "Lucia")
         self.engine = os.getenv("AWS_ENGINE", "neural")
-        self.session = Session(profile_name=self.profile_name)
-        self.polly = self.session.client("polly")
         self.language = os.getenv("KATIA_LANGUAGE", "en-US")
-        mixer.init()
-        mixer.set_num_channels(1)
+        self.synthesis_service = synthesis_service or SynthesisService.shared()
+        self.backend = self.synthesis_service.backend(
+            name=os.getenv("SPEAKER_BACKEND", "polly"),
+            profile_name=self.profile_name,
+            voice=self.voice,
+            engine=self.engine,
+            language=self.language,
+        )
+        self.output_format = os.getenv("SPEAKER_OUTPUT_FORMAT", "ogg_vorbis")
+        if self.output_format not in self.backend.output_formats:
+            logger.warning(
+                "Backend '%s' does not support '%s' output, using '%s'",
+                self.backend.name,
+                self.output_format,
+                self.backend.output_formats[0],
+            )
+            self.output_format = self.backend.output_formats[0]
+        self.sample_rate = int(os.getenv("SPEAKER_PCM_SAMPLE_RATE", "16000"))
+        # The mp3 decoder needs the whole file, so only ogg and pcm can be played while
+        # they are being downloaded
+        self.streaming = (
+            os.getenv("SPEAKER_STREAMING", "True").lower() == "true"
+            and self.output_format in ("ogg_vorbis", "pcm")
+        )
+        # Polly does not accept requests with more than 3000 characters
+        self.max_chunk_length = int(os.getenv("SPEAKER_MAX_CHUNK_LENGTH", "3000"))
+        self.audio_buffer_size = int(os.getenv("SPEAKER_AUDIO_BUFFER_SIZE", "512"))
+        self.time_to_first_sample = None
+        self.cache = None
+        if os.getenv("SPEAKER_CACHE", "True").lower() == "true":
+            self.cache = TTSCache()
+        self.prewarm_phrases = literal_eval(
+            os.getenv("SPEAKER_CACHE_PREWARM_PHRASES", "[]")
+        )
+        if self.output_format == "pcm":
+            # The raw PCM is reproduced as it is, so the device can not use other format
+            mixer.init(
+                frequency=self.sample_rate,
+                size=-16,
+                channels=1,
+                buffer=self.audio_buffer_size,
+                allowedchanges=0,
+            )
+            if (mixer_format := mixer.get_init()) != (self.sample_rate, -16, 1):
+                raise ValueError(
+                    f"The mixer was already initialized with the format {mixer_format}"
+                    f" instead of the PCM format ({self.sample_rate}, -16, 1)"
+                )
+            self.player = PCMPlayer(sample_rate=self.sample_rate)
+        else:
+            mixer.init(buffer=self.audio_buffer_size)
+            self.player = GaplessPlayer(output_format=self.output_format)
 
-        self.consumer = KatiaConsumer(
+        producer_factory = producer_factory or KatiaProducer
+        consumer_factory = consumer_factory or KatiaConsumer
+        self.consumer = consumer_factory(
             topic=f"user-{owner_uuid}-speaker",
             group_id=owner_uuid
         )
-        self.consumer_stopper = KatiaConsumer(
-            topic=f"user-{owner_uuid}-speaker-stopper",
-            group_id=owner_uuid
+        self.playback_queue = PlaybackQueue()
+        # The function is kept to remove it from the gauge when the speaker is closed,
+        # otherwise the gauge would keep the speaker alive
+        self.owner_uuid = owner_uuid
+        self.queue_depth = self.playback_queue.__len__
+        QUEUE_DEPTH.set_function(self.queue_depth, owner=owner_uuid)
+        self.playing_priority = None
+        self.playing_lock = Lock()
+        self.filler = os.getenv("SPEAKER_FILLER", "True").lower() == "true"
+        self.filler_delay_in_seconds = float(
+            os.getenv("SPEAKER_FILLER_DELAY_IN_SECONDS", "1.5")
+        )
+        self.filler_phrases = None
+        self.filler_count = 0
+        self.filler_timer = None
+        # Incremented each time the filler scheduled is cancelled, so a timer that already
+        # fired knows that the answer arrived
+        self.filler_generation = 0
+        self.filler_lock = Lock()
+        self.subscriber = KatiaSubscriber(consumer=self.consumer, callback=self.enqueue)
+        self.stopped = Event()
+        self.stop_latency = None
+        self.subscriber_stopper = KatiaSubscriber(
+            consumer=consumer_factory(
+                topic=f"user-{owner_uuid}-speaker-stopper",
+                group_id=owner_uuid
+            ),
+            callback=self.stop,
         )
-        self.producer_last_speaking = KatiaProducer(
+        self.producer_last_speaking = producer_factory(
             topic=f"user-{owner_uuid}-recognizer-last-speaking",
             group_id=owner_uuid
         )
+        self.speaking_state = speaking_state or SpeakingState()
         self.active = True
+        self.draining = False
         logger.info("Speaker started")
 
     def run(self) -> None:
-        self.speak()
+        self.subscriber.start()
+        self.subscriber_stopper.start()
+        if self.cache:
+            Thread(target=self.prewarm_cache, daemon=True).start()
+        try:
+            self.speak()
+        finally:
+            self.close()
+
+    def synthesize(self, message: str):
+        """
+        Return the audio for the message. If it is in the cache it will be returned
+        without calling the backend, if not it will be synthesized and saved in the
+        cache.
+
+        If the speaker is streaming the audio is returned while it is being downloaded,
+        and it is saved in the cache once the download ends.
+        :param message:
+        :return:
+        """
+        key = TTSCache.key(
+            text=message,
+            voice=self.backend.voice,
+            engine=self.backend.engine,
+            output_format=(
+                f"pcm-{self.sample_rate}"
+                if self.output_format == "pcm"
+                else self.output_format
+            ),
+        )
+        if self.cache:
+            with span("speaker.cache"):
+                audio = self.cache.get(key)
+            if audio is not None:
+                logger.debug("Audio for the message found in cache")
+                return audio
+        with span("speaker.synthesis"):
+            stream = self.backend.synthesize(
+                text=message,
+                output_format=self.output_format,
+                sample_rate=self.sample_rate,
+            )
+        if stream is None:
+            return None
+        if self.streaming:
+            return StreamingAudio(
+                stream=stream,
+                on_complete=(
+                    (lambda audio: self.cache.set(key=key, audio=audio))
+                    if self.cache
+                    else None
+                ),
+            )
+        with closing(stream):
+            audio = stream.read()
+        if self.cache:
+            self.cache.set(key=key, audio=audio)
+        return audio
 
     def speak_message(self, message: str):
         """
         This is the method that the speaker has to reproduce the interpreter messages.
-        First it will create a response.mp3 file using the polly client from AWS.
-        Then it will reproduce it using the mixer reproducer from pygame.
+        The message is split in sentences, and the long ones at clauses, that are
+        synthesized in parallel in the background by the synthesis service, so the next
+        sentences are synthesized while the previous one is being reproduced.
+        The audios are reproduced from memory in a gapless player using the mixer
+        reproducer from pygame.
 
         Even if there is multiple messages needed to be reproduced, it will wait until the
         previous one was completed.
         :param message:
         :return:
         """
-        response = self.polly.synthesize_speech(
-            Text=message,
-            OutputFormat="mp3",
-            VoiceId=self.voice,
-            Engine=self.engine,
-        )
-        if "AudioStream" in response:
-            with closing(response["AudioStream"]) as stream:
-                output = os.path.join("./", "response.mp3")
-                with open(output, "wb") as file:
-                    file.write(stream.read())
-            mixer.music.load("./response.mp3")
-            mixer.music.play()
-            while mixer.music.get_busy() and self.can_speak:
-                logger.debug("Waiting to end sentence")
-                time.sleep(1)
-        self.send_last_speak()
+        started_at = time.monotonic()
+        futures = [
+            self.synthesis_service.submit(self.synthesize, sentence)
+            for sentence in split_text(message, self.max_chunk_length)
+        ]
+        try:
+            with span("speaker.playback"):
+                self.player.play(
+                    audios=self.synthesized(futures),
+                    stopped=self.stopped,
+                    on_start=lambda: self.start_speaking(started_at=started_at),
+                )
+        finally:
+            for future in futures:
+                future.cancel()
+            self.send_speaking_state(speaking=False)
+
+    def synthesized(self, futures: list):
+        """
+        Yield the audio of each sentence once it is synthesized, in order. It will stop
+        waiting for the synthesis if the speaker is stopped meanwhile.
+        :param futures:
+        :return:
+        """
+        for future in futures:
+            while not future.done():
+                if self.stopped.wait(self.player.poll_interval_in_seconds):
+                    return
+            yield future.result()
 
     @property
     def can_speak(self):
         """
         Katia will always be able to speak new things. But if recognizer sent something
-        new she will stop speaking until process the new.
+        new she will stop speaking, and the rest of the message will be discarded, until
+        process the new.
         :return:
         """
-        data = self.consumer_stopper.get_data()
-        if data and (source := data.get("source", None)):
-            if source == "recognizer":
-                logger.debug(
-                    "Stop speaking because the recognizer recognized something new"
-                )
-                mixer.music.stop()
-        return True
+        return not self.stopped.is_set()
+
+    def stop(self, data: dict):
+        """
+        Callback for the stopper subscriber. If the recognizer recognized something new
+        the reproduction is stopped right away, without waiting for the player loop.
+        :param data:
+        :return:
+        """
+        if data.get("source", None) != "recognizer":
+            return
+        logger.debug("Stop speaking because the recognizer recognized something new")
+        self.stopped.set()
+        self.player.stop()
+        self.playback_queue.drop(reason="interrupted", priority=PlaybackQueue.ANSWER)
+        if requested_at := data.get("requested_at", None):
+            self.stop_latency = time.time() - requested_at
+            logger.info(
+                "Speaker stopped %.0f ms after the request", self.stop_latency * 1000
+            )
+
+    def enqueue(self, data: dict):
+        """
+        Callback for the speaker subscriber. The messages from the interpreter are added
+        to the playback queue.
+        :param data:
+        :return:
+        """
+        if data.get("source", None) != "interpreter":
+            return
+        if data.get("state", None) == "thinking":
+            self.schedule_filler()
+            return
+        self.cancel_filler()
+        self.playback_queue.put(data)
+        with self.playing_lock:
+            if self.playing_priority == PlaybackQueue.FILLER:
+                logger.debug("Filler cut because the interpreter sent a message")
+                self.stopped.set()
+                self.player.stop()
+
+    def schedule_filler(self):
+        """
+        Schedule a filler to be reproduced if the interpreter does not send the answer
+        before the filler delay
+        :return:
+        """
+        if not self.filler:
+            return
+        self.cancel_filler()
+        self.filler_timer = Timer(
+            self.filler_delay_in_seconds,
+            self.enqueue_filler,
+            args=(self.filler_generation,),
+        )
+        self.filler_timer.daemon = True
+        self.filler_timer.start()
+
+    def cancel_filler(self):
+        """
+        Cancel the filler scheduled, if any. The timer can not be cancelled once it fired,
+        so the generation is incremented too and the filler is dropped when it is checked.
+        :return:
+        """
+        with self.filler_lock:
+            self.filler_generation += 1
+        if self.filler_timer:
+            self.filler_timer.cancel()
+            self.filler_timer = None
+
+    def enqueue_filler(self, generation: int):
+        """
+        Add the next filler to the playback queue, unless the filler was cancelled after
+        it was scheduled
+        :param generation: The filler generation when it was scheduled.
+        :return:
+        """
+        phrases = self.get_filler_phrases()
+        with self.filler_lock:
+            if generation != self.filler_generation:
+                logger.debug("Filler dropped because the interpreter already answered")
+                return
+            message = phrases[self.filler_count % len(phrases)]
+            self.filler_count += 1
+            logger.debug("The interpreter is taking long, reproducing filler")
+            self.playback_queue.put(
+                {
+                    "source": "speaker",
+                    "message": message,
+                    "priority": PlaybackQueue.FILLER,
+                }
+            )
+
+    def get_filler_phrases(self):
+        """
+        Return the filler phrases in the language of Katia, translating them the first
+        time
+        :return:
+        """
+        if self.filler_phrases is None:
+            phrases = list(FILLER_MESSAGES)
+            if "en" not in self.language:
+                translator = Translator()
+                language_to_use = self.language.split("-", maxsplit=1)[0]
+                phrases = [
+                    translator.translate(text=phrase, dest=language_to_use).text
+                    for phrase in phrases
+                ]
+            self.filler_phrases = phrases
+        return self.filler_phrases
 
     def speak(self):
         """
-        This is the main method for the speaker. It will continuously be listening to a
-        kafka topic to check if the interpreter sent something that needs to be said.
+        This is the main method for the speaker. It will continuously be taking from the
+        playback queue the messages that the interpreter sent and need to be said.
         :return:
         """
         self.wait_until_interpreter()
         while self.active:
-            data = self.consumer.get_data()
-            if data and (source := data.get("source", None)) and source == "interpreter":
+            if self.draining and not self.playback_queue:
+                break
+            data = self.playback_queue.get(timeout=QUEUE_TIMEOUT_IN_SECONDS)
+            if data:
+                priority = data.get("priority", None)
+                with self.playing_lock:
+                    if priority == PlaybackQueue.FILLER and self.playback_queue:
+                        # Something arrived meanwhile, so the filler is not needed
+                        continue
+                    self.stopped.clear()
+                    self.playing_priority = priority
                 try:
                     self.speak_message(data.get("message", ""))
-                except (BotoCoreError, ClientError) as error:
+                except (BotoCoreError, ClientError, TTSError) as error:
                     logger.error("Error trying to speak", extra={"error": error})
+                finally:
+                    with self.playing_lock:
+                        self.playing_priority = None
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Messages dropped from the playback queue: %s",
+                        dict(self.playback_queue.dropped),
+                    )
 
     def wait_until_interpreter(self):
         """
@@ -121,9 +426,7 @@ class KatiaSpeaker(Thread):
         :return:
         """
         logger.info("Waiting for interpreter to be ready")
-        starter_message = (
-            "Hi! Let me configure some things. Once all is ready I will call you!"
-        )
+        starter_message = STARTER_MESSAGE
         if "en" not in self.language:
             translator = Translator()
             language_to_use = self.language.split("-", maxsplit=1)[0]
@@ -133,23 +436,111 @@ class KatiaSpeaker(Thread):
             ).text
         self.speak_message(message=starter_message)
 
+    def prewarm_cache(self):
+        """
+        Synthesize the phrases known before starting, so they will be in the cache once
+        they need to be reproduced.
+        :return:
+        """
+        language_to_use = self.language.split("-", maxsplit=1)[0]
+        phrases = []
+        translator = None
+        for phrase in (ERROR_MESSAGE, READY_MESSAGE):
+            if "en" not in self.language:
+                # Each phrase is translated on its own, so a failure only skips it
+                try:
+                    translator = translator or Translator()
+                    phrase = translator.translate(text=phrase, dest=language_to_use).text
+                except Exception as ex:
+                    logger.error(
+                        "Error translating a phrase to prewarm the cache",
+                        extra={"error": str(ex), "phrase": phrase},
+                    )
+                    continue
+            phrases.append(phrase)
+        if self.filler:
+            try:
+                phrases.extend(self.get_filler_phrases())
+            except Exception as ex:
+                logger.error(
+                    "Error translating the fillers to prewarm the cache",
+                    extra={"error": str(ex)},
+                )
+        phrases.extend(self.prewarm_phrases)
+        for phrase in phrases:
+            try:
+                self.synthesize(phrase)
+            except (BotoCoreError, ClientError, TTSError) as error:
+                logger.error("Error prewarming the cache", extra={"error": error})
+        logger.info("Speaker cache prewarmed with %s phrases", len(phrases))
+
     def deactivate(self):
         """
-        Method to deactivate the speaker
+        Method to deactivate the speaker. The message being reproduced is cut.
         :return:
         """
         self.active = False
+        self.subscriber.deactivate()
+        self.cancel_filler()
+        self.subscriber_stopper.deactivate()
+        self.stopped.set()
 
-    def send_last_speak(self):
+    def drain(self):
         """
-        Method to sent to kafka when the speaker stop speaking
+        Method to stop the speaker once it reproduces the messages already received. No
+        new messages are received meanwhile, but the user can still stop it.
+        :return:
+        """
+        self.draining = True
+        self.subscriber.deactivate()
+        self.cancel_filler()
+
+    def close(self):
+        """
+        Wait for the subscribers to close their consumers and deliver the last speaking
+        state
+        :return:
         """
-        logger.debug(
-            "Sending the message to the recognizer about when Katia stop speaking"
+        for subscriber in (self.subscriber, self.subscriber_stopper):
+            subscriber.deactivate()
+            if subscriber.is_alive():
+                subscriber.join()
+        self.producer_last_speaking.close()
+        self.player.close()
+        QUEUE_DEPTH.remove_function(self.queue_depth, owner=self.owner_uuid)
+
+    def start_speaking(self, started_at: float):
+        """
+        Method called just before the first sample of a message is reproduced. It will
+        measure the time to first sample, so the output format can be chosen for each
+        deployment, and it will send that Katia started speaking.
+        :param started_at: Monotonic time when the message was received.
+        :return:
+        """
+        self.time_to_first_sample = time.monotonic() - started_at
+        TIME_TO_FIRST_SAMPLE.observe(self.time_to_first_sample)
+        logger.info(
+            "Time to first sample %.0f ms with '%s' output",
+            self.time_to_first_sample * 1000,
+            self.output_format,
         )
+        self.send_speaking_state(speaking=True)
+
+    def send_speaking_state(self, speaking: bool):
+        """
+        Method to update the speaking state and sent to kafka when the speaker starts or
+        stops speaking, so the recognizer can know it even if it is in another process.
+        :param speaking:
+        :return:
+        """
+        now = datetime.datetime.now()
+        self.speaking_state.set_speaking(speaking=speaking, at=now.timestamp())
+        state = SpeakingState.STARTED if speaking else SpeakingState.STOPPED
+        logger.debug("Sending to the recognizer that Katia %s speaking", state)
         self.producer_last_speaking.send_message(
             message_data={
                 "source": "speaker",
-                "message": datetime.datetime.now().isoformat()
+                "state": state,
+                "message": now.isoformat()
             }
         )
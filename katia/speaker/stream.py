@@ -0,0 +1,116 @@
+import logging
+import os
+from contextlib import closing
+from threading import Condition, Thread
+from typing import Callable
+
+from botocore.exceptions import BotoCoreError
+
+logger = logging.getLogger("KatiaSpeaker")
+
+CHUNK_SIZE = 4096
+
+
+class StreamingAudio:
+    """
+    File-like audio that is read by the player while it is still being downloaded. The
+    download runs in a separate thread, and the reads wait until the bytes requested
+    arrive, so the decoder can start as soon as the first chunks are received.
+
+    The first read waits for a small jitter buffer, so short delays in the download do not
+    cut the audio. The size of the audio is not known until the download ends, so seeking
+    from the end fails meanwhile and the decoder reads it as a stream.
+    """
+
+    def __init__(self, stream, on_complete: Callable[[bytes], None] = None):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.jitter_buffer_size = int(
+            float(os.getenv("SPEAKER_JITTER_BUFFER_IN_KB", "8")) * 1024
+        )
+        self.buffer = bytearray()
+        self.position = 0
+        self.complete = False
+        self.error = None
+        self.condition = Condition()
+        self.downloader = Thread(target=self.download, daemon=True)
+        self.downloader.start()
+
+    def download(self):
+        """
+        Read the stream by chunks until it ends, notifying the readers waiting for them.
+        If the audio is completely downloaded it is given to the on_complete callback.
+        :return:
+        """
+        try:
+            with closing(self.stream):
+                while chunk := self.stream.read(CHUNK_SIZE):
+                    with self.condition:
+                        self.buffer.extend(chunk)
+                        self.condition.notify_all()
+        except (BotoCoreError, OSError) as error:
+            logger.error("Error downloading the audio", extra={"error": error})
+            self.error = error
+        with self.condition:
+            self.complete = True
+            self.condition.notify_all()
+        if self.on_complete and not self.error:
+            self.on_complete(bytes(self.buffer))
+
+    def wait_for(self, size: int):
+        """
+        Wait until the buffer has the size requested or the download ends
+        :param size:
+        :return:
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.complete or len(self.buffer) >= size)
+
+    def read(self, size: int = -1):
+        """
+        Read from the current position, waiting for the bytes if they were not downloaded
+        yet
+        :param size:
+        :return:
+        """
+        if size is None or size < 0:
+            self.wait_for(float("inf"))
+            end = len(self.buffer)
+        else:
+            end = self.position + size
+            self.wait_for(max(end, self.jitter_buffer_size))
+        data = bytes(self.buffer[self.position:end])
+        self.position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET):
+        """
+        Move the current position. Seeking from the end is only possible once the audio
+        is completely downloaded, if not it returns -1.
+        :param offset:
+        :param whence:
+        :return:
+        """
+        if whence == os.SEEK_END:
+            if not self.complete:
+                return -1
+            offset += len(self.buffer)
+        elif whence == os.SEEK_CUR:
+            offset += self.position
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        """
+        Return the current position
+        :return:
+        """
+        return self.position
+
+    def getvalue(self):
+        """
+        Wait until the download ends and return the whole audio
+        :return:
+        """
+        self.downloader.join()
+        return bytes(self.buffer)
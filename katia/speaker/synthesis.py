@@ -0,0 +1,84 @@
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable
+
+from katia.speaker.backends import TTSBackend, get_backend
+
+logger = logging.getLogger("KatiaSpeaker")
+
+
+class SynthesisService:
+    """
+    Thread-safe synthesis service shared by all the speakers of the process. It has a
+    bounded pool of workers, and it reuses one backend (with its connection pool) for
+    each configuration, instead of each speaker creating its own cold client.
+
+    The workers start the requests in the order they were submitted, and each speaker
+    reproduces the results in that order, so the order of each owner is preserved.
+    """
+
+    shared_service = None
+    shared_lock = Lock()
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or int(os.getenv("SPEAKER_SYNTHESIS_WORKERS", "4"))
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="KatiaSynthesis"
+        )
+        self.backends = {}
+        self.lock = Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Return the synthesis service shared by the process, creating it the first time
+        :return:
+        """
+        with cls.shared_lock:
+            if cls.shared_service is None:
+                cls.shared_service = cls()
+            return cls.shared_service
+
+    def backend(
+        self, name: str, profile_name: str, voice: str, engine: str, language: str
+    ) -> TTSBackend:
+        """
+        Return the backend for the configuration, creating it the first time
+        :param name:
+        :param profile_name:
+        :param voice:
+        :param engine:
+        :param language:
+        :return:
+        """
+        key = (name, profile_name, voice, engine, language)
+        with self.lock:
+            if key not in self.backends:
+                logger.info("Creating '%s' synthesis backend", name)
+                self.backends[key] = get_backend(
+                    name=name,
+                    profile_name=profile_name,
+                    voice=voice,
+                    engine=engine,
+                    language=language,
+                    max_pool_connections=self.workers,
+                )
+            return self.backends[key]
+
+    def submit(self, function: Callable, *args) -> Future:
+        """
+        Submit a synthesis to the pool of workers
+        :param function:
+        :param args:
+        :return:
+        """
+        return self.executor.submit(function, *args)
+
+    def shutdown(self):
+        """
+        Stop the workers, cancelling the synthesis not started
+        :return:
+        """
+        self.executor.shutdown(wait=False)
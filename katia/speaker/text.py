@@ -0,0 +1,62 @@
+import re
+
+# A sentence ends with a final punctuation followed by spaces, or with a new line
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+# Boundaries used to split the sentences that are too long, from the best to the worst
+CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+WORD_END = re.compile(r"\s+")
+
+
+def split_sentences(text: str):
+    """
+    Split the text in sentences, so they can be synthesized and reproduced one by one
+    :param text:
+    :return:
+    """
+    return [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+
+
+def split_text(text: str, max_length: int):
+    """
+    Split the text in sentences, splitting also the sentences longer than the max length
+    at clause boundaries, or at words if it is not enough
+    :param text:
+    :param max_length:
+    :return:
+    """
+    chunks = []
+    for sentence in split_sentences(text):
+        chunks.extend(split_long_text(sentence, max_length))
+    return chunks
+
+
+def split_long_text(text: str, max_length: int, boundaries=(CLAUSE_END, WORD_END)):
+    """
+    Split the text in chunks up to the max length. The text is split at the first
+    boundary, and the parts are joined again while they fit in the max length. If a part
+    does not fit it is split with the next boundary, and without boundaries it is cut.
+    :param text:
+    :param max_length:
+    :param boundaries:
+    :return:
+    """
+    if len(text) <= max_length:
+        return [text]
+    if not boundaries:
+        return [
+            text[start:start + max_length] for start in range(0, len(text), max_length)
+        ]
+    chunks = []
+    current = ""
+    for part in boundaries[0].split(text):
+        for piece in split_long_text(part, max_length, boundaries[1:]):
+            candidate = f"{current} {piece}" if current else piece
+            if len(candidate) <= max_length:
+                current = candidate
+                continue
+            if current:
+                chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
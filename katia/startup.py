@@ -0,0 +1,133 @@
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+logger = logging.getLogger("Katia")
+
+
+class StartupTimeline:
+    """
+    Timeline of the startup of Katia. Each step keeps when it started, counted from the
+    start of the timeline, and how long it took, so the report shows which steps are
+    slowing down the cold start and which ones run in parallel.
+
+    The steps can be added from any thread.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.steps = []
+        self.finished = False
+        self.lock = Lock()
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Context manager to add a step to the timeline with the time spent inside it
+        :param name:
+        :return:
+        """
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name=name, started_at=started_at, finished_at=time.monotonic())
+
+    def add(self, name: str, started_at: float, finished_at: float):
+        """
+        Add a step to the timeline
+        :param name:
+        :param started_at: Monotonic time when the step started.
+        :param finished_at: Monotonic time when the step finished.
+        :return:
+        """
+        with self.lock:
+            self.steps.append(
+                (started_at - self.started_at, finished_at - started_at, name)
+            )
+
+    def mark(self, name: str):
+        """
+        Add an instant step to the timeline, for the events without duration
+        :param name:
+        :return:
+        """
+        now = time.monotonic()
+        self.add(name=name, started_at=now, finished_at=now)
+
+    def finish(self, name: str):
+        """
+        Add the last step of the startup and log the report. Only the first call logs
+        the report, so it can be called by every component that can finish the startup.
+        :param name:
+        :return:
+        """
+        self.mark(name)
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        logger.info("Startup timeline:\n%s", self.report())
+
+    def report(self):
+        """
+        Return the steps of the timeline sorted by their start, with their start and their
+        duration in milliseconds
+        :return:
+        """
+        with self.lock:
+            steps = sorted(self.steps)
+        return "\n".join(
+            f"{start * 1000:>8.0f} ms  +{duration * 1000:>7.0f} ms  {name}"
+            for start, duration, name in steps
+        )
+
+
+# The timeline starts when Katia is imported, as close as possible to the process start
+startup_timeline = StartupTimeline()
+
+
+class LazyImport:
+    """
+    Proxy of a module, or of an attribute of a module, that is imported the first time it
+    is used. This way the heavy dependencies are only imported by the components that
+    need them, in the thread that initializes them, and the time of the import is added
+    to the startup timeline.
+
+    It can not be used for classes that are subclassed or checked with isinstance.
+    """
+
+    __slots__ = ("_module", "_attribute", "_target")
+
+    def __init__(self, module: str, attribute: str = None):
+        object.__setattr__(self, "_module", module)
+        object.__setattr__(self, "_attribute", attribute)
+        object.__setattr__(self, "_target", None)
+
+    def _load(self):
+        """
+        Return the module or the attribute proxied, importing it the first time
+        :return:
+        """
+        if self._target is None:
+            with startup_timeline.step(f"Import {self._module}"):
+                target = importlib.import_module(self._module)
+            if self._attribute:
+                target = getattr(target, self._attribute)
+            object.__setattr__(self, "_target", target)
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<LazyImport {name}>"
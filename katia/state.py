@@ -0,0 +1,89 @@
+import datetime
+import time
+
+
+class SharedTimestamp:
+    """
+    Timestamp shared between threads without locks. The value is a float that is only
+    rebound on updates, and rebinding an attribute is atomic, so readers will always get
+    a complete value just reading memory.
+
+    It is meant to have only one writer, for example a background subscriber.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: float = None):
+        self.value = time.time() if value is None else value
+
+    def set(self, value: float):
+        """
+        Update the timestamp, older values are ignored
+        :param value:
+        :return:
+        """
+        if value > self.value:
+            self.value = value
+
+    def set_datetime(self, value: datetime.datetime):
+        """
+        Update the timestamp from a datetime
+        :param value:
+        :return:
+        """
+        self.set(value.timestamp())
+
+    def seconds_since(self):
+        """
+        Seconds elapsed since the timestamp
+        :return:
+        """
+        return time.time() - self.value
+
+
+class SpeakingState:
+    """
+    State of the speaker that the recognizer needs to know: if it is speaking right now
+    and when it stopped speaking for the last time.
+
+    The speaker publishes its start and stop events, so the state can be rebuilt in
+    another process or host. When the speaker and the recognizer run in the same process
+    they can share directly the same state object. Reading it is just reading memory.
+    """
+
+    STARTED = "started"
+    STOPPED = "stopped"
+
+    def __init__(self):
+        self.speaking = False
+        self.changed_at = 0.0
+        self.last_speaking = SharedTimestamp()
+
+    def set_speaking(self, speaking: bool, at: float = None):
+        """
+        Update the state. Changes older than the current state are ignored, so events
+        received late will not override newer ones.
+        :param speaking:
+        :param at:
+        :return:
+        """
+        at = time.time() if at is None else at
+        if at < self.changed_at:
+            return
+        self.changed_at = at
+        self.speaking = speaking
+        if not speaking:
+            self.last_speaking.set(at)
+
+    def update(self, data: dict):
+        """
+        Update the state with an event published by the speaker. Events without state
+        are considered stop events.
+        :param data:
+        :return:
+        """
+        if data.get("source", None) == "speaker" and (message := data.get("message")):
+            self.set_speaking(
+                speaking=data.get("state", self.STOPPED) == self.STARTED,
+                at=datetime.datetime.fromisoformat(message).timestamp(),
+            )
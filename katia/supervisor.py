@@ -0,0 +1,239 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from ast import literal_eval
+from threading import Event
+
+from katia.metrics import metrics
+
+logger = logging.getLogger("Katia")
+
+RESTARTS = metrics.counter(
+    "katia_supervisor_restarts_total",
+    "Components restarted after stopping unexpectedly",
+    labels=("component",),
+)
+
+
+class SupervisedProcess:
+    """
+    Process of a component run by the supervisor, with the state needed to restart it
+    with an increasing delay when it keeps failing.
+    """
+
+    def __init__(self, component: str, command: list):
+        self.component = component
+        self.command = command
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    """
+    Supervisor that runs each component of Katia in its own process, wired only through
+    kafka, and restarts them when they stop. This way the audio capture, the parsing and
+    the logging of each component do not compete for the same GIL, and each process can
+    be pinned to its own CPUs.
+
+    The delay before a restart doubles each time a component fails shortly after being
+    started, up to a maximum, so a broken component does not restart in a busy loop.
+
+    With SIGHUP the components are restarted one after the other, for example to load a
+    new configuration, so the rest of them keep working meanwhile.
+    """
+
+    def __init__(self, components: list, owner_uuid: str):
+        self.poll_interval_in_seconds = float(
+            os.getenv("KATIA_SUPERVISOR_POLL_INTERVAL_IN_SECONDS", "1")
+        )
+        self.restart_delay_in_seconds = float(
+            os.getenv("KATIA_SUPERVISOR_RESTART_DELAY_IN_SECONDS", "1")
+        )
+        self.max_restart_delay_in_seconds = float(
+            os.getenv("KATIA_SUPERVISOR_MAX_RESTART_DELAY_IN_SECONDS", "30")
+        )
+        self.stable_in_seconds = float(
+            os.getenv("KATIA_SUPERVISOR_STABLE_IN_SECONDS", "60")
+        )
+        self.stop_timeout_in_seconds = float(
+            os.getenv("KATIA_SUPERVISOR_STOP_TIMEOUT_IN_SECONDS", "10")
+        )
+        cpus = literal_eval(os.getenv("KATIA_SUPERVISOR_CPUS", "{}"))
+        # Each process serves its metrics in the next port to the configured one
+        metrics_port = (
+            int(os.getenv("KATIA_METRICS_PORT", "9464"))
+            if os.getenv("KATIA_METRICS", "False").lower() == "true"
+            else None
+        )
+        self.processes = [
+            SupervisedProcess(
+                component=component,
+                command=self.get_command(
+                    component=component,
+                    owner_uuid=owner_uuid,
+                    cpus=cpus.get(component),
+                    metrics_port=metrics_port and metrics_port + index + 1,
+                ),
+            )
+            for index, component in enumerate(components)
+        ]
+        self.stopped = Event()
+        self.restarting = Event()
+
+    @staticmethod
+    def get_command(
+        component: str, owner_uuid: str, cpus: list = None, metrics_port: int = None
+    ):
+        """
+        Return the command to run the component in its own process
+        :param component:
+        :param owner_uuid:
+        :param cpus: CPUs to pin the process to, if any.
+        :param metrics_port: Port to serve the metrics of the process, if any.
+        :return:
+        """
+        command = [sys.executable, "-m", "katia.cli", component]
+        command += ["--owner-uuid", owner_uuid]
+        if cpus:
+            command += ["--cpus", ",".join(str(cpu) for cpu in cpus)]
+        if metrics_port:
+            command += ["--metrics-port", str(metrics_port)]
+        return command
+
+    def run(self):
+        """
+        Start the components and supervise them until the supervisor is stopped with a
+        signal. Then the components are stopped too.
+        :return: The exit code of the supervisor.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        # SIGHUP does not exist in all the systems
+        if sighup := getattr(signal, "SIGHUP", None):
+            signal.signal(sighup, self.restart)
+        for supervised_process in self.processes:
+            self.start(supervised_process)
+        while not self.stopped.wait(self.poll_interval_in_seconds):
+            if self.restarting.is_set():
+                self.restarting.clear()
+                self.rolling_restart()
+            self.check()
+        self.terminate()
+        return 0
+
+    def start(self, supervised_process: SupervisedProcess):
+        """
+        Start the process of a component
+        :param supervised_process:
+        :return:
+        """
+        # The process outlives this method, it is reaped when it stops, with the poll of
+        # the check or the wait of stop_processes
+        supervised_process.process = subprocess.Popen(  # pylint: disable=R1732
+            supervised_process.command
+        )
+        supervised_process.started_at = time.monotonic()
+        logger.info(
+            "Component '%s' started with pid '%s'",
+            supervised_process.component,
+            supervised_process.process.pid,
+        )
+
+    def check(self):
+        """
+        Check the processes of the components, scheduling the restart of the ones that
+        stopped and restarting the ones whose delay is over
+        :return:
+        """
+        now = time.monotonic()
+        for supervised_process in self.processes:
+            if supervised_process.process is None:
+                if now >= supervised_process.restart_at:
+                    self.start(supervised_process)
+                continue
+            return_code = supervised_process.process.poll()
+            if return_code is None:
+                continue
+            if now - supervised_process.started_at >= self.stable_in_seconds:
+                supervised_process.restarts = 0
+            delay = min(
+                self.restart_delay_in_seconds * 2**supervised_process.restarts,
+                self.max_restart_delay_in_seconds,
+            )
+            supervised_process.restarts += 1
+            RESTARTS.inc(component=supervised_process.component)
+            supervised_process.restart_at = now + delay
+            supervised_process.process = None
+            logger.error(
+                "Component '%s' stopped with code '%s', restarting in %.1f seconds",
+                supervised_process.component,
+                return_code,
+                delay,
+            )
+
+    def stop(self, *_):
+        """
+        Method to stop the supervisor. It can be used as signal handler.
+        :return:
+        """
+        self.stopped.set()
+
+    def restart(self, *_):
+        """
+        Method to restart the components one by one. It can be used as signal handler.
+        :return:
+        """
+        self.restarting.set()
+
+    def rolling_restart(self):
+        """
+        Restart the processes of the components one after the other, waiting for each of
+        them to stop before starting it again
+        :return:
+        """
+        for supervised_process in self.processes:
+            if self.stopped.is_set():
+                return
+            if supervised_process.process is not None:
+                self.stop_processes([supervised_process.process])
+                supervised_process.process = None
+            supervised_process.restarts = 0
+            self.start(supervised_process)
+        logger.info("Rolling restart finished")
+
+    def terminate(self):
+        """
+        Stop the processes of all the components
+        :return:
+        """
+        self.stop_processes(
+            [
+                supervised_process.process
+                for supervised_process in self.processes
+                if supervised_process.process is not None
+            ]
+        )
+
+    def stop_processes(self, processes: list):
+        """
+        Stop the processes, killing the ones that do not stop before the timeout. All of
+        them are waited, so none is left as a zombie.
+        :param processes:
+        :return:
+        """
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + self.stop_timeout_in_seconds
+        for process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("Process '%s' did not stop in time, killed", process.pid)
+                process.kill()
+                # Reap the killed process
+                process.wait()
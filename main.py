@@ -2,11 +2,17 @@ from dotenv import load_dotenv
 
 from katia.katia import Katia
 from katia.logger_manager.logger import setup_logger
+from katia.message_manager.recorder import start_recorder
+from katia.metrics import start_metrics_server
 from katia.owner import Owner
+from katia.profiling import start_profiling
 
 if __name__ == "__main__":
     load_dotenv()
     setup_logger()
+    start_metrics_server()
+    start_profiling()
+    start_recorder()
 
     owner = Owner(name="Katia User")
     Katia(owner=owner)
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from unittest import TestCase
+
+import speech_recognition as sr
+
+from katia.benchmark.fakes import (FakePlayer, FakeUser, InMemoryBroker,
+                                   MemoryConsumer, MemoryProducer, tone)
+
+
+class InMemoryBrokerTestCase(TestCase):
+    def test_poll(self):
+        broker = InMemoryBroker()
+        broker.produce(topic="a", value=b"1")
+        broker.produce(topic="a", value=b"2")
+        self.assertEqual(broker.poll(group_id="x", topics=["a"], timeout=0), ("a", b"1"))
+        self.assertEqual(broker.poll(group_id="y", topics=["a"], timeout=0), ("a", b"1"))
+        self.assertEqual(broker.poll(group_id="x", topics=["a"], timeout=0), ("a", b"2"))
+        self.assertIsNone(broker.poll(group_id="x", topics=["a"], timeout=0))
+
+    def test_poll_waits_for_messages(self):
+        broker = InMemoryBroker()
+        timer = threading.Timer(
+            0.05, broker.produce, kwargs={"topic": "a", "value": b"1"}
+        )
+        timer.start()
+        self.assertEqual(broker.poll(group_id="x", topics=["a"], timeout=2), ("a", b"1"))
+
+    def test_clients(self):
+        broker = InMemoryBroker()
+        producer = broker.producer(topic="a", group_id="x")
+        consumer = broker.consumer(topic="a", group_id="x")
+        self.assertIsInstance(producer, MemoryProducer)
+        self.assertIsInstance(consumer, MemoryConsumer)
+        self.assertIs(producer.broker, broker)
+        self.assertIs(consumer.broker, broker)
+        self.assertEqual((consumer.topics, consumer.group_id), (["a"], "x"))
+
+
+class MemoryClientsTestCase(TestCase):
+    def test_send_and_get(self):
+        broker = InMemoryBroker()
+        producer = MemoryProducer(topic="a", group_id="x", broker=broker)
+        consumer = MemoryConsumer(topic="a", group_id="x", broker=broker)
+        producer.send_message({"message": "hi"})
+        producer.send_message({"message": "bye"}, topic="b")
+        self.assertEqual(consumer.get_data(), {"message": "hi"})
+        consumer.subscribe_topics(["b"])
+        self.assertEqual(consumer.get_topic_data(), ("b", {"message": "bye"}))
+        consumer.unsubscribe()
+        broker.produce(topic="b", value=json.dumps({}).encode("utf-8"))
+        self.assertIsNone(consumer.get_message())
+
+
+class FakeUserTestCase(TestCase):
+    def test_conversation(self):
+        user = FakeUser(phrase="katia hi", utterances=2, warmup_answers=1)
+        player = FakePlayer(user=user)
+        stopped = threading.Event()
+        with self.assertRaises(sr.WaitTimeoutError):
+            user.listen(source=None, timeout=0.01)
+        self.assertTrue(player.play([None, tone(seconds=0.1)], stopped=stopped))
+        self.assertTrue(user.ready.is_set())
+        for _ in range(2):
+            self.assertIs(user.listen(source=None, timeout=1), user.audio)
+            self.assertEqual(
+                user.recognize_google(user.audio)["alternative"][0]["transcript"],
+                "katia hi",
+            )
+            time.sleep(0.01)
+            player.play([tone(seconds=0.1)], stopped=stopped)
+        self.assertTrue(user.finished.is_set())
+        self.assertEqual(len(user.latencies), 2)
+        self.assertGreaterEqual(min(user.latencies), 0.01)
+
+    def test_phrase_not_answered(self):
+        user = FakeUser(
+            phrase="katia hi", utterances=2, warmup_answers=0, answer_timeout_in_seconds=0
+        )
+        with user.condition:
+            user.turn(time.monotonic())
+        self.assertIs(user.listen(source=None, timeout=1), user.audio)
+        time.sleep(0.01)
+        self.assertIs(user.listen(source=None, timeout=1), user.audio)
+        self.assertEqual(user.failed, 1)
+
+    def test_player_stopped(self):
+        user = FakeUser(phrase="katia hi", utterances=1)
+        player = FakePlayer(user=user, playback_speed=1)
+        stopped = threading.Event()
+        stopped.set()
+        self.assertFalse(player.play([tone(seconds=1)], stopped=stopped))
+        self.assertEqual(user.answers_heard, 1)
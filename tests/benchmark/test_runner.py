@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from katia.benchmark.runner import Benchmark, compare, compare_advisory, main
+
+REPORT = {
+    "owners": 2,
+    "utterances": 10,
+    "failed": 0,
+    "latency_p50": 0.5,
+    "latency_p95": 0.6,
+    "latency_p99": 0.7,
+    "memory_per_owner": 1000,
+    "round_trips_per_cpu_second": 100,
+}
+
+
+class BenchmarkTestCase(TestCase):
+    def test_run(self):
+        # The benchmark configures the environment of the process
+        with mock.patch.dict(os.environ):
+            report = Benchmark(
+                owners=1,
+                utterances=2,
+                recognition_latency_in_seconds=0,
+                llm_latency_in_seconds=0,
+                tts_latency_in_seconds=0,
+            ).run()
+        self.assertEqual(report["round_trips"], 2)
+        self.assertEqual(report["failed"], 0)
+        self.assertGreater(report["latency_p50"], 0)
+
+    def test_compare(self):
+        test_data_list = [
+            ({}, []),
+            ({"latency_p95": 0.73}, ["latency_p95 0.73 > 0.6"]),
+            ({"latency_p95": 0.7}, []),
+            # The throughput per CPU second is too noisy to fail the benchmark
+            ({"round_trips_per_cpu_second": 70}, []),
+            ({"failed": 1}, ["1 round trips failed"]),
+            # The memory is allowed to grow the slack on top of the tolerance
+            ({"memory_per_owner": 1700}, []),
+            ({"memory_per_owner": 1800}, ["memory_per_owner 1800 > 1000"]),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                changes, expected_regressions = test_data
+                self.assertEqual(
+                    compare(
+                        report=REPORT | changes,
+                        baseline=REPORT,
+                        tolerance=0.2,
+                        memory_slack_in_bytes=500,
+                    ),
+                    expected_regressions,
+                )
+
+    def test_compare_advisory(self):
+        test_data_list = [
+            ({}, []),
+            ({"round_trips_per_cpu_second": 90}, []),
+            ({"round_trips_per_cpu_second": 70}, ["round_trips_per_cpu_second 70 < 100"]),
+            ({"latency_p95": 1}, []),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                changes, expected_warnings = test_data
+                self.assertEqual(
+                    compare_advisory(
+                        report=REPORT | changes, baseline=REPORT, tolerance=0.2
+                    ),
+                    expected_warnings,
+                )
+
+    def test_compare_different_load(self):
+        test_data_list = [{"owners": 1}, {"utterances": 5}]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), self.assertRaises(ValueError):
+                compare(report=REPORT | test_data, baseline=REPORT, tolerance=0.2)
+
+    def test_main(self):
+        test_data_list = [
+            (REPORT, [], 0),
+            (REPORT | {"latency_p50": 1}, [], 1),
+            (REPORT | {"latency_p50": 1}, ["--save-baseline"], 0),
+            (REPORT | {"round_trips_per_cpu_second": 1}, [], 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                Benchmark, "run", return_value=test_data[0]
+            ), tempfile.TemporaryDirectory() as directory:
+                report, arguments, expected_exit_code = test_data
+                baseline = os.path.join(directory, "baseline.json")
+                with open(baseline, "w", encoding="utf-8") as baseline_file:
+                    json.dump(REPORT, baseline_file)
+                with mock.patch("builtins.print"):
+                    exit_code = main(["--baseline", baseline] + arguments)
+                self.assertEqual(exit_code, expected_exit_code)
+                with open(baseline, encoding="utf-8") as baseline_file:
+                    self.assertEqual(
+                        json.load(baseline_file),
+                        report if "--save-baseline" in arguments else REPORT,
+                    )
+
+    def test_main_different_load(self):
+        with mock.patch.object(
+            Benchmark, "run", return_value=REPORT | {"owners": 1}
+        ), tempfile.TemporaryDirectory() as directory, mock.patch(
+            "builtins.print"
+        ), mock.patch(
+            "sys.stderr"
+        ):
+            baseline = os.path.join(directory, "baseline.json")
+            with open(baseline, "w", encoding="utf-8") as baseline_file:
+                json.dump(REPORT, baseline_file)
+            with self.assertRaises(SystemExit) as context:
+                main(["--baseline", baseline])
+            self.assertEqual(context.exception.code, 2)
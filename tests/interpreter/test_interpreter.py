@@ -51,6 +51,45 @@ class KatiaInterpreterTestCase(TestCase):
                 interpreter.messages, [{"role": "system", "content": "test-prompt"}]
             )
 
+    def test_init_hosted(self):
+        with mock.patch.dict(os.environ, {"OPENAI_KEY": "test-key"}), mock.patch(
+            "katia.interpreter.interpreter.KatiaConsumer"
+        ) as mock_consumer, mock.patch(
+            "katia.interpreter.interpreter.KatiaProducer"
+        ) as mock_producer, mock.patch.object(
+            KatiaInterpreter, "initial_prompt", new_callable=mock.PropertyMock
+        ):
+            producer = mock.MagicMock()
+            interpreter = KatiaInterpreter(
+                name="test-name", owner_uuid="test-uuid", producer=producer
+            )
+            self.assertEqual(interpreter.producer, producer)
+            self.assertIsNone(interpreter.consumer)
+            self.assertEqual(mock_consumer.call_count, 0)
+            self.assertEqual(mock_producer.call_count, 0)
+
+    def test_close(self):
+        test_data_list = [(None, 1), (mock.MagicMock(), 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.dict(
+                os.environ, {"OPENAI_KEY": "test-key"}
+            ), mock.patch(
+                "katia.interpreter.interpreter.KatiaConsumer"
+            ) as mock_consumer, mock.patch(
+                "katia.interpreter.interpreter.KatiaProducer"
+            ) as mock_producer, mock.patch.object(
+                KatiaInterpreter, "initial_prompt", new_callable=mock.PropertyMock
+            ):
+                producer, close_call_count = test_data
+                interpreter = KatiaInterpreter(
+                    name="test-name", owner_uuid="test-uuid", producer=producer
+                )
+                interpreter.drain()
+                self.assertFalse(interpreter.active)
+                interpreter.close()
+                self.assertEqual(mock_consumer().close.call_count, close_call_count)
+                self.assertEqual(mock_producer().close.call_count, close_call_count)
+
     def test_init_without_openai_key(self):
         with self.assertRaises(EnvironmentError) as expected_error, mock.patch.object(
             Logger, "error"
@@ -103,13 +142,19 @@ class KatiaInterpreterTestCase(TestCase):
             os.environ,
             {
                 "OPENAI_MODEL": "test-model",
+                "OPENAI_API_BASE": "http://test-api/v1",
             },
         ), mock.patch.object(
             KatiaInterpreter, "initial_prompt", new_callable=mock.PropertyMock
-        ) as mock_initial_prompt:
+        ) as mock_initial_prompt, mock.patch(
+            "katia.interpreter.interpreter.TOKENS"
+        ) as mock_tokens, mock.patch(
+            "katia.interpreter.interpreter.COMPLETION_SECONDS"
+        ) as mock_completion_seconds:
             mock_initial_prompt.return_value = "test-prompt"
             mock_openai.ChatCompletion.create.return_value = {
-                "choices": [{"message": {"content": "test-response"}}]
+                "choices": [{"message": {"content": "test-response"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5},
             }
 
             interpreter = KatiaInterpreter(
@@ -127,11 +172,35 @@ class KatiaInterpreterTestCase(TestCase):
                 ],
             )
             self.assertEqual(mock_openai.ChatCompletion.create.call_count, 1)
-            self.assertEqual(mock_producer().send_message.call_count, 1)
+            self.assertEqual(
+                mock_openai.ChatCompletion.create.call_args.kwargs["api_base"],
+                "http://test-api/v1",
+            )
+            self.assertEqual(mock_producer().send_message.call_count, 2)
+            self.assertEqual(mock_completion_seconds.observe.call_count, 1)
+            self.assertEqual(
+                mock_tokens.inc.call_args_list,
+                [mock.call(10, kind="prompt"), mock.call(5, kind="completion")],
+            )
+            self.assertEqual(
+                mock_producer().send_message.call_args_list[0],
+                mock.call(
+                    message_data={
+                        "source": "interpreter",
+                        "state": "thinking",
+                        "created_at": mock.ANY,
+                    }
+                ),
+            )
             self.assertEqual(
                 mock_producer().send_message.call_args,
                 mock.call(
-                    message_data={"source": "interpreter", "message": "test-response"}
+                    message_data={
+                        "source": "interpreter",
+                        "message": "test-response",
+                        "priority": "answer",
+                        "created_at": mock.ANY,
+                    }
                 ),
             )
 
@@ -176,11 +245,26 @@ class KatiaInterpreterTestCase(TestCase):
                 ],
             )
             self.assertEqual(mock_openai.ChatCompletion.create.call_count, 1)
-            self.assertEqual(mock_producer().send_message.call_count, 1)
+            self.assertEqual(mock_producer().send_message.call_count, 2)
+            self.assertEqual(
+                mock_producer().send_message.call_args_list[0],
+                mock.call(
+                    message_data={
+                        "source": "interpreter",
+                        "state": "thinking",
+                        "created_at": mock.ANY,
+                    }
+                ),
+            )
             self.assertEqual(
                 mock_producer().send_message.call_args,
                 mock.call(
-                    message_data={"source": "interpreter", "message": "sorry-message"}
+                    message_data={
+                        "source": "interpreter",
+                        "message": "sorry-message",
+                        "priority": "answer",
+                        "created_at": mock.ANY,
+                    }
                 ),
             )
             self.assertEqual(mock_translator().translate.call_count, 1)
@@ -351,7 +435,9 @@ class KatiaInterpreterTestCase(TestCase):
                 "katia.interpreter.interpreter.Translator"
             ) as mock_translator, mock.patch.object(
                 KatiaInterpreter, "translate_initial_prompt"
-            ):
+            ), mock.patch(
+                "katia.interpreter.interpreter.startup_timeline"
+            ) as mock_startup_timeline:
                 (
                     language,
                     mock_translator_call_count,
@@ -376,6 +462,11 @@ class KatiaInterpreterTestCase(TestCase):
                         message_data={
                             "source": "interpreter",
                             "message": expected_starter_message,
+                            "priority": "notice",
+                            "created_at": mock.ANY,
                         }
                     ),
                 )
+                self.assertEqual(
+                    mock_startup_timeline.finish.call_args, mock.call("All is ready")
+                )
@@ -0,0 +1,159 @@
+import logging
+import os
+from unittest import TestCase, mock
+
+from katia.logger_manager.logger import (RateLimitFilter, get_handlers,
+                                         setup_logger, start_log_listener)
+
+
+class CollectHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def make_record(created: float, lineno: int = 1, level: int = logging.INFO):
+    record = logging.LogRecord(
+        name="test",
+        level=level,
+        pathname="test.py",
+        lineno=lineno,
+        msg="test %s",
+        args=("message",),
+        exc_info=None,
+    )
+    record.created = created
+    return record
+
+
+class RateLimitFilterTestCase(TestCase):
+    def test_filter(self):
+        rate_limit_filter = RateLimitFilter(window_in_seconds=1, burst=2)
+        test_data_list = [
+            (make_record(100.0), True, "test message"),
+            (make_record(100.1), True, "test message"),
+            (make_record(100.2), False, None),
+            (make_record(100.3, lineno=2), True, "test message"),
+            (make_record(100.4), False, None),
+            # The warnings and the errors are never suppressed nor counted
+            (make_record(100.5, level=logging.WARNING), True, "test message"),
+            (make_record(100.6, level=logging.ERROR), True, "test message"),
+            (
+                make_record(101.0),
+                True,
+                "test message (2 similar messages suppressed)",
+            ),
+            (make_record(101.1), True, "test message"),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                record, expected_result, expected_message = test_data
+                self.assertEqual(rate_limit_filter.filter(record), expected_result)
+                if expected_result:
+                    self.assertEqual(record.getMessage(), expected_message)
+
+
+class LoggerTestCase(TestCase):
+    def test_start_log_listener(self):
+        test_logger = logging.getLogger("KatiaTestListener")
+        test_logger.setLevel(logging.INFO)
+        handler = CollectHandler()
+        test_logger.addHandler(handler)
+        with mock.patch("katia.logger_manager.logger.atexit") as mock_atexit:
+            listener = start_log_listener(
+                ["KatiaTestListener"], log_filter=RateLimitFilter(burst=1)
+            )
+        try:
+            self.assertEqual(mock_atexit.register.call_args, mock.call(listener.stop))
+            self.assertNotIn(handler, test_logger.handlers)
+            for _ in range(3):
+                test_logger.info("test %s", "message")
+        finally:
+            listener.stop()
+            test_logger.handlers.clear()
+        self.assertEqual(handler.messages, ["test message"])
+
+    def test_setup_logger(self):
+        test_data_list = [
+            ({"KATIA_LOG_ASYNC": "True", "KATIA_LOG_RATE_LIMIT_IN_SECONDS": "1"}, 1, 0),
+            ({"KATIA_LOG_ASYNC": "False", "KATIA_LOG_RATE_LIMIT_IN_SECONDS": "1"}, 0, 2),
+            ({"KATIA_LOG_ASYNC": "False", "KATIA_LOG_RATE_LIMIT_IN_SECONDS": "0"}, 0, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.logger_manager.logger.logging.config.dictConfig"
+            ), mock.patch(
+                "katia.logger_manager.logger.yaml.safe_load"
+            ) as mock_safe_load, mock.patch(
+                "katia.logger_manager.logger.start_log_listener"
+            ) as mock_start_log_listener:
+                environ, mock_start_call_count, filters_count = test_data
+                mock_safe_load.return_value = {
+                    "loggers": {"KatiaTestSetupA": {}, "KatiaTestSetupB": {}}
+                }
+                loggers = [
+                    logging.getLogger("KatiaTestSetupA"),
+                    logging.getLogger("KatiaTestSetupB"),
+                ]
+                with mock.patch.dict(os.environ, environ):
+                    listener = setup_logger()
+                self.assertEqual(
+                    mock_start_log_listener.call_count, mock_start_call_count
+                )
+                if mock_start_call_count:
+                    self.assertEqual(listener, mock_start_log_listener.return_value)
+                    self.assertIsInstance(
+                        mock_start_log_listener.call_args.kwargs["log_filter"],
+                        RateLimitFilter,
+                    )
+                else:
+                    self.assertIsNone(listener)
+                self.assertEqual(
+                    sum(len(test_logger.filters) for test_logger in loggers),
+                    filters_count,
+                )
+                for test_logger in loggers:
+                    test_logger.filters.clear()
+
+    def test_setup_logger_sync_rate_limit(self):
+        test_logger = logging.getLogger("KatiaTestSync")
+        test_logger.setLevel(logging.INFO)
+        handlers = [CollectHandler(), CollectHandler()]
+        for handler in handlers:
+            test_logger.addHandler(handler)
+        try:
+            with mock.patch(
+                "katia.logger_manager.logger.logging.config.dictConfig"
+            ), mock.patch(
+                "katia.logger_manager.logger.yaml.safe_load",
+                return_value={"loggers": {"KatiaTestSync": {}}},
+            ), mock.patch.dict(
+                os.environ,
+                {
+                    "KATIA_LOG_ASYNC": "False",
+                    "KATIA_LOG_RATE_LIMIT_IN_SECONDS": "60",
+                    "KATIA_LOG_RATE_LIMIT_BURST": "5",
+                },
+            ):
+                setup_logger()
+            for _ in range(8):
+                test_logger.info("test %s", "message")
+        finally:
+            test_logger.handlers.clear()
+            test_logger.filters.clear()
+        # Each handler writes all the records let through, not a share of them
+        for handler in handlers:
+            self.assertEqual(handler.messages, ["test message"] * 5)
+
+    def test_get_handlers(self):
+        handler = logging.Handler()
+        for name in ("KatiaTestA", "KatiaTestB"):
+            logging.getLogger(name).addHandler(handler)
+        try:
+            self.assertEqual(get_handlers(["KatiaTestA", "KatiaTestB"]), [handler])
+        finally:
+            for name in ("KatiaTestA", "KatiaTestB"):
+                logging.getLogger(name).removeHandler(handler)
@@ -4,6 +4,7 @@ from unittest import TestCase, mock
 
 from confluent_kafka import KafkaError
 
+from katia.message_manager import consumer as consumer_module
 from katia.message_manager.consumer import KatiaConsumer
 
 
@@ -46,17 +47,68 @@ class KatiaConsumerTestCase(TestCase):
         for test_data in test_data_list:
             with mock.patch.object(KatiaConsumer, "subscribe"), mock.patch.object(
                 KatiaConsumer, "poll"
-            ) as mock_poll, mock.patch.object(Logger, "error") as mock_logger_error:
+            ) as mock_poll, mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error, mock.patch.object(
+                KatiaConsumer, "update_lag"
+            ) as mock_update_lag:
                 message, mock_logger_error_call_count, expected_response = test_data
                 mock_poll.return_value = message
 
                 consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
                 self.assertEqual(consumer.get_message(), expected_response)
                 self.assertEqual(mock_poll.call_count, 1)
+                self.assertEqual(
+                    mock_update_lag.call_count, int(expected_response is not None)
+                )
                 self.assertEqual(
                     mock_logger_error.call_count, mock_logger_error_call_count
                 )
 
+    def test_get_message_recorded(self):
+        message = mock.MagicMock()
+        message.error.return_value = False
+        message.topic.return_value = "test-topic"
+        message.value.return_value = b"{}"
+        with mock.patch.object(KatiaConsumer, "subscribe"), mock.patch.object(
+            KatiaConsumer, "poll", return_value=message
+        ), mock.patch.object(KatiaConsumer, "update_lag"), mock.patch(
+            "katia.message_manager.consumer.SessionRecorder.active"
+        ) as mock_recorder:
+            consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
+            self.assertEqual(consumer.get_data(), {})
+            self.assertEqual(
+                mock_recorder.record.call_args,
+                mock.call(direction="consumed", topic="test-topic", value=b"{}"),
+            )
+
+    def test_update_lag(self):
+        message = mock.MagicMock()
+        message.topic.return_value = "test-lag-topic"
+        message.partition.return_value = 0
+        message.offset.return_value = 3
+        test_data_list = [((0, 10), 6), ((-1001, -1001), None)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                KatiaConsumer, "subscribe"
+            ), mock.patch.object(
+                KatiaConsumer, "get_watermark_offsets"
+            ) as mock_get_watermark_offsets, mock.patch.object(
+                consumer_module, "LAG"
+            ) as mock_lag:
+                watermark_offsets, expected_lag = test_data
+                mock_get_watermark_offsets.return_value = watermark_offsets
+                consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
+                consumer.update_lag(message)
+                self.assertTrue(mock_get_watermark_offsets.call_args.kwargs["cached"])
+                if expected_lag is None:
+                    self.assertEqual(mock_lag.set.call_count, 0)
+                else:
+                    self.assertEqual(
+                        mock_lag.set.call_args,
+                        mock.call(expected_lag, topic="test-lag-topic"),
+                    )
+
     def test_get_data(self):
         test_data_list = [
             ('{"test": "test"}', {"test": "test"}),
@@ -70,3 +122,28 @@ class KatiaConsumerTestCase(TestCase):
                 mock_get_message.return_value = message
                 consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
                 self.assertEqual(consumer.get_data(), expected)
+
+    def test_subscribe_topics(self):
+        with mock.patch.object(KatiaConsumer, "subscribe") as mock_subscribe:
+            consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
+            consumer.subscribe_topics(("test-topic", "test-other-topic"))
+            self.assertEqual(
+                mock_subscribe.call_args, mock.call(["test-topic", "test-other-topic"])
+            )
+
+    def test_get_topic_data(self):
+        message = mock.MagicMock()
+        message.topic.return_value = "test-topic"
+        message.value.return_value = b'{"test": "test"}'
+        test_data_list = [
+            (message, ("test-topic", {"test": "test"})),
+            (None, None),
+        ]
+        for test_data in test_data_list:
+            with mock.patch.object(KatiaConsumer, "subscribe"), mock.patch.object(
+                KatiaConsumer, "poll_message"
+            ) as mock_poll_message:
+                poll_message, expected = test_data
+                mock_poll_message.return_value = poll_message
+                consumer = KatiaConsumer(topic="test-topic", group_id="test-uuid")
+                self.assertEqual(consumer.get_topic_data(), expected)
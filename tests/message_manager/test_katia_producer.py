@@ -3,6 +3,7 @@ from logging import Logger
 from unittest import TestCase, mock
 
 from katia.message_manager import KatiaProducer
+from katia.message_manager.producer import TopicProducer
 
 
 class ProducerTestCase(TestCase):
@@ -33,20 +34,81 @@ class ProducerTestCase(TestCase):
                     mock_logger_error.call_count, mock_logger_error_call_count
                 )
 
+    def test_receipt_debug(self):
+        test_data_list = [(False, 0, 0), (True, 1, 1)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                Logger, "isEnabledFor"
+            ) as mock_is_enabled_for, mock.patch.object(
+                Logger, "debug"
+            ) as mock_logger_debug:
+                enabled, mock_decode_call_count, mock_logger_debug_call_count = test_data
+                mock_is_enabled_for.return_value = enabled
+                message = mock.MagicMock()
+                KatiaProducer.receipt(err=None, message=message)
+                self.assertEqual(
+                    message.value.return_value.decode.call_count, mock_decode_call_count
+                )
+                self.assertEqual(
+                    mock_logger_debug.call_count, mock_logger_debug_call_count
+                )
+
     def test_send_message(self):
-        with mock.patch.object(
-            KatiaProducer, "produce"
-        ) as mock_produce, mock.patch.object(KatiaProducer, "flush") as mock_flush:
+        test_data_list = [(None, "test-topic"), ("test-other-topic", "test-other-topic")]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                KatiaProducer, "produce"
+            ) as mock_produce, mock.patch.object(KatiaProducer, "flush") as mock_flush:
+                topic, expected_topic = test_data
+                producer = KatiaProducer(topic="test-topic", group_id="test-uuid")
+                message_data = {"test": "test"}
+                producer.send_message(message_data=message_data, topic=topic)
+                self.assertEqual(mock_produce.call_count, 1)
+                self.assertEqual(
+                    mock_produce.call_args,
+                    mock.call(
+                        topic=expected_topic,
+                        value=b'{"test": "test"}',
+                        callback=producer.receipt,
+                    ),
+                )
+                self.assertEqual(mock_flush.call_count, 1)
+
+    def test_send_message_recorded(self):
+        with mock.patch.object(KatiaProducer, "produce"), mock.patch.object(
+            KatiaProducer, "flush"
+        ), mock.patch(
+            "katia.message_manager.producer.SessionRecorder.active"
+        ) as mock_recorder:
             producer = KatiaProducer(topic="test-topic", group_id="test-uuid")
-            message_data = {"test": "test"}
-            producer.send_message(message_data=message_data)
-            self.assertEqual(mock_produce.call_count, 1)
+            producer.send_message(message_data={"test": "test"})
             self.assertEqual(
-                mock_produce.call_args,
+                mock_recorder.record.call_args,
                 mock.call(
-                    topic="test-topic",
-                    value=b'{"test": "test"}',
-                    callback=producer.receipt,
+                    direction="produced", topic="test-topic", value=b'{"test": "test"}'
                 ),
             )
-            self.assertEqual(mock_flush.call_count, 1)
+
+    def test_close(self):
+        test_data_list = [(0, 0), (2, 1)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                KatiaProducer, "flush"
+            ) as mock_flush, mock.patch.object(Logger, "error") as mock_logger_error:
+                pending, mock_logger_error_call_count = test_data
+                mock_flush.return_value = pending
+                producer = KatiaProducer(topic="test-topic", group_id="test-uuid")
+                producer.close(timeout=0.5)
+                self.assertEqual(mock_flush.call_args, mock.call(0.5))
+                self.assertEqual(
+                    mock_logger_error.call_count, mock_logger_error_call_count
+                )
+
+    def test_topic_producer(self):
+        producer = mock.MagicMock()
+        topic_producer = TopicProducer(producer=producer, topic="test-topic")
+        topic_producer.send_message(message_data={"test": "test"})
+        self.assertEqual(
+            producer.send_message.call_args,
+            mock.call(message_data={"test": "test"}, topic="test-topic"),
+        )
@@ -0,0 +1,61 @@
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia.message_manager.subscriber import KatiaSubscriber
+
+
+class KatiaSubscriberTestCase(TestCase):
+    def test_init(self):
+        consumer = mock.MagicMock()
+        callback = mock.MagicMock()
+        subscriber = KatiaSubscriber(consumer=consumer, callback=callback)
+        self.assertEqual(subscriber.consumer, consumer)
+        self.assertEqual(subscriber.callback, callback)
+        self.assertTrue(subscriber.daemon)
+        self.assertTrue(subscriber.active)
+
+    def test_run(self):
+        with mock.patch.object(KatiaSubscriber, "subscribe") as mock_subscribe:
+            subscriber = KatiaSubscriber(
+                consumer=mock.MagicMock(), callback=mock.MagicMock()
+            )
+            subscriber.start()
+            subscriber.join()
+        self.assertEqual(mock_subscribe.call_count, 1)
+
+    def test_subscribe(self):
+        test_data_list = [
+            ([None], None, 0, 0),
+            ([{"test": "test"}], None, 1, 0),
+            ([{"test": "test"}, {"test": "test"}], None, 2, 0),
+            ([{"test": "test"}], Exception("test-error"), 1, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error:
+                (
+                    data_list,
+                    callback_side_effect,
+                    callback_call_count,
+                    mock_logger_error_call_count,
+                ) = test_data
+                consumer = mock.MagicMock()
+                callback = mock.MagicMock(side_effect=callback_side_effect)
+                subscriber = KatiaSubscriber(consumer=consumer, callback=callback)
+                remaining_data = list(data_list)
+
+                def get_data():
+                    data = remaining_data.pop(0)
+                    if not remaining_data:
+                        subscriber.deactivate()
+                    return data
+
+                consumer.get_data.side_effect = get_data
+                subscriber.subscribe()
+                self.assertEqual(consumer.get_data.call_count, len(data_list))
+                self.assertEqual(callback.call_count, callback_call_count)
+                self.assertEqual(consumer.close.call_count, 1)
+                self.assertEqual(
+                    mock_logger_error.call_count, mock_logger_error_call_count
+                )
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import speech_recognition as sr
+
+from katia.message_manager.recorder import (SessionRecorder, get_topic_owner,
+                                            start_recorder)
+
+
+class RecorderTestCase(TestCase):
+    def test_get_topic_owner(self):
+        test_data_list = [
+            ("user-1234-abcd-speaker", "1234-abcd"),
+            ("user-1234-abcd-speaker-stopper", "1234-abcd"),
+            ("user-1234-interpreter", "1234"),
+            ("user-1234-recognizer-last-speaking", "1234"),
+            ("other-topic", None),
+            (None, None),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                topic, expected_owner = test_data
+                self.assertEqual(get_topic_owner(topic), expected_owner)
+
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = SessionRecorder(directory=directory, audio=True)
+            recorder.started_at -= 10
+            recorder.start()
+            recorder.record(
+                direction="produced",
+                topic="user-1234-interpreter",
+                value=b'{"source": "recognizer", "message": "katia hi"}',
+            )
+            recorder.record(direction="consumed", topic="other-topic", value=b"{}")
+            recorder.record_audio(
+                sr.AudioData(
+                    frame_data=b"\x00\x00" * 16000, sample_rate=16000, sample_width=2
+                )
+            )
+            recorder.close()
+            recorder.close()
+            with open(recorder.traffic_path, encoding="utf-8") as traffic_file:
+                envelopes = [json.loads(line) for line in traffic_file]
+            self.assertEqual(
+                [
+                    (envelope["direction"], envelope["owner"], envelope["data"])
+                    for envelope in envelopes
+                ],
+                [
+                    (
+                        "produced",
+                        "1234",
+                        {"source": "recognizer", "message": "katia hi"},
+                    ),
+                    ("consumed", None, {}),
+                ],
+            )
+            with open(recorder.session_path, encoding="utf-8") as session_file:
+                session = json.loads(session_file.read())
+            self.assertEqual(session["file"], f"audio-{os.getpid()}-000001.wav")
+            self.assertAlmostEqual(session["offset"], 9, delta=0.5)
+            self.assertTrue(os.path.exists(os.path.join(directory, session["file"])))
+
+    def test_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = SessionRecorder(directory=directory)
+            recorder.start()
+            SessionRecorder.active = recorder
+            recorder.close()
+            self.assertIsNone(SessionRecorder.active)
+            self.assertFalse(recorder.is_alive())
+
+    def test_start_recorder(self):
+        test_data_list = [
+            ({"KATIA_RECORDER": "False"}, 0),
+            ({"KATIA_RECORDER": "True"}, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.message_manager.recorder.SessionRecorder"
+            ) as mock_session_recorder, mock.patch(
+                "katia.message_manager.recorder.atexit"
+            ) as mock_atexit:
+                environ, mock_start_call_count = test_data
+                with mock.patch.dict(os.environ, environ):
+                    recorder = start_recorder()
+                self.assertEqual(
+                    mock_session_recorder.return_value.start.call_count,
+                    mock_start_call_count,
+                )
+                self.assertEqual(mock_atexit.register.call_count, mock_start_call_count)
+                if mock_start_call_count:
+                    self.assertEqual(recorder, mock_session_recorder.return_value)
+                    self.assertEqual(mock_session_recorder.active, recorder)
+                else:
+                    self.assertIsNone(recorder)
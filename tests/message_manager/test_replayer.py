@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+from katia.message_manager.replayer import SessionReplayer, read_traffic
+
+ENVELOPES = [
+    {
+        "at": 100.0,
+        "direction": "produced",
+        "topic": "user-1234-interpreter",
+        "owner": "1234",
+        "data": {"source": "recognizer", "message": "katia hi"},
+    },
+    {
+        "at": 100.1,
+        "direction": "consumed",
+        "topic": "user-1234-interpreter",
+        "owner": "1234",
+        "data": {"source": "recognizer", "message": "katia hi"},
+    },
+    {
+        "at": 100.05,
+        "direction": "produced",
+        "topic": "user-1234-speaker",
+        "owner": "1234",
+        "data": {"source": "interpreter", "message": "hello", "created_at": 100.05},
+    },
+]
+
+
+def write_traffic(directory: str):
+    for index, envelopes in enumerate((ENVELOPES[:2], ENVELOPES[2:])):
+        path = os.path.join(directory, f"traffic-{index}.jsonl")
+        with open(path, "w", encoding="utf-8") as traffic_file:
+            for envelope in envelopes:
+                traffic_file.write(json.dumps(envelope) + "\n")
+            traffic_file.write("\n")
+
+
+class ReplayerTestCase(TestCase):
+    def test_read_traffic(self):
+        test_data_list = [
+            ((), [100.0, 100.05]),
+            (("interpreter",), [100.05]),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            write_traffic(directory)
+            for test_data in test_data_list:
+                with self.subTest(test_data=test_data):
+                    sources, expected_times = test_data
+                    self.assertEqual(
+                        [
+                            envelope["at"]
+                            for envelope in read_traffic(directory, sources=sources)
+                        ],
+                        expected_times,
+                    )
+            self.assertEqual(
+                len(read_traffic(os.path.join(directory, "traffic-0.jsonl"))), 1
+            )
+
+    def test_replay(self):
+        test_data_list = [
+            (None, 0, ["user-1234-interpreter", "user-1234-speaker"]),
+            ("5678-abc", 1, ["user-5678-abc-interpreter", "user-5678-abc-speaker"]),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            write_traffic(directory)
+            for test_data in test_data_list:
+                with self.subTest(test_data=test_data):
+                    owner_uuid, speed, expected_topics = test_data
+                    producer = mock.MagicMock()
+                    replayer = SessionReplayer(
+                        path=directory,
+                        speed=speed,
+                        owner_uuid=owner_uuid,
+                        producer=producer,
+                    )
+                    started_at = time.monotonic()
+                    self.assertEqual(replayer.replay(), 2)
+                    self.assertGreaterEqual(time.monotonic() - started_at, 0.05 * speed)
+                    self.assertEqual(
+                        [
+                            call.kwargs["topic"]
+                            for call in producer.send_message.call_args_list
+                        ],
+                        expected_topics,
+                    )
+                    data = producer.send_message.call_args.kwargs["message_data"]
+                    self.assertAlmostEqual(data["created_at"], time.time(), delta=1)
+                    self.assertEqual(producer.close.call_count, 1)
+
+    def test_replay_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            replayer = SessionReplayer(path=directory, producer=mock.MagicMock())
+            self.assertEqual(replayer.replay(), 0)
+
+    def test_deactivate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_traffic(directory)
+            producer = mock.MagicMock()
+            replayer = SessionReplayer(path=directory, speed=0, producer=producer)
+            producer.send_message.side_effect = lambda **_: replayer.deactivate()
+            self.assertEqual(replayer.replay(), 1)
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import wave
+from unittest import TestCase, mock
+
+from katia.recognizer.audio_source import (ReplayAudioFile, ReplayStream,
+                                           get_audio_sources, list_audio_files,
+                                           read_session)
+
+
+def write_wav(file_name: str, seconds: float = 0.1, sample_rate: int = 16000):
+    with wave.open(file_name, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+
+
+class ReplayStreamTestCase(TestCase):
+    def test_read(self):
+        test_data_list = [
+            (0, 0),
+            (1, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.recognizer.audio_source.time.sleep"
+            ) as mock_sleep, mock.patch(
+                "katia.recognizer.audio_source.time.monotonic"
+            ) as mock_monotonic:
+                speed, mock_sleep_call_count = test_data
+                mock_monotonic.return_value = 10
+                stream = mock.MagicMock()
+                stream.read.return_value = b"\x00" * 100
+                replay_stream = ReplayStream(
+                    stream=stream, sample_rate=100, sample_width=1, speed=speed
+                )
+                self.assertEqual(replay_stream.read(100), b"\x00" * 100)
+                self.assertEqual(replay_stream.audio_seconds, 1)
+                self.assertFalse(replay_stream.exhausted)
+                self.assertEqual(mock_sleep.call_count, mock_sleep_call_count)
+
+    def test_read_exhausted(self):
+        stream = mock.MagicMock()
+        stream.read.return_value = b""
+        replay_stream = ReplayStream(stream=stream, sample_rate=100, sample_width=1)
+        self.assertEqual(replay_stream.read(100), b"")
+        self.assertTrue(replay_stream.exhausted)
+
+
+class ReplayAudioFileTestCase(TestCase):
+    def test_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "test.wav")
+            write_wav(file_name)
+            with ReplayAudioFile(filename=file_name, speed=0) as source:
+                self.assertIsInstance(source.stream, ReplayStream)
+                self.assertFalse(source.exhausted)
+                while source.stream.read(source.CHUNK):
+                    pass
+                self.assertTrue(source.exhausted)
+
+
+class AudioSourceFunctionsTestCase(TestCase):
+    def test_list_audio_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in ["b.wav", "a.flac", "c.txt"]:
+                with open(os.path.join(directory, file_name), "wb"):
+                    pass
+            self.assertEqual(
+                list_audio_files(directory),
+                [os.path.join(directory, "a.flac"), os.path.join(directory, "b.wav")],
+            )
+            self.assertEqual(list_audio_files("test.wav"), ["test.wav"])
+
+    def test_read_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            session_file_name = os.path.join(directory, "session.jsonl")
+            with open(session_file_name, "w", encoding="utf8") as session_file:
+                session_file.write(json.dumps({"file": "b.wav", "offset": 5}) + "\n\n")
+                session_file.write(json.dumps({"file": "a.wav", "offset": 1}) + "\n")
+            self.assertEqual(
+                read_session(session_file_name),
+                [
+                    (os.path.join(directory, "a.wav"), 1.0),
+                    (os.path.join(directory, "b.wav"), 5.0),
+                ],
+            )
+
+    def test_get_audio_sources(self):
+        with mock.patch("speech_recognition.Microphone") as mock_microphone:
+            self.assertEqual(get_audio_sources(), [mock_microphone()])
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_wav(os.path.join(directory, "a.wav"))
+            sources = get_audio_sources(source=directory, speed=2)
+            self.assertEqual(len(sources), 1)
+            self.assertEqual(sources[0].speed, 2)
+            self.assertIsNone(sources[0].start_at)
+
+            session_file_name = os.path.join(directory, "session.jsonl")
+            with open(session_file_name, "w", encoding="utf8") as session_file:
+                session_file.write(json.dumps({"file": "a.wav", "offset": 4}) + "\n")
+            with mock.patch(
+                "katia.recognizer.audio_source.time.monotonic"
+            ) as mock_monotonic:
+                mock_monotonic.return_value = 10
+                sources = get_audio_sources(source=session_file_name, speed=2)
+            self.assertEqual(len(sources), 1)
+            self.assertEqual(sources[0].start_at, 12)
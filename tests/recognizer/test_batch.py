@@ -0,0 +1,100 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from katia.recognizer.batch import BatchTranscriber, transcribe_file
+from tests.recognizer.test_audio_source import write_wav
+
+
+class TranscribeFileTestCase(TestCase):
+    def test_transcribe_file(self):
+        test_data_list = [
+            ({"alternative": [{"transcript": "test-transcript"}]}, "test-transcript"),
+            ([], ""),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), tempfile.TemporaryDirectory(
+            ) as directory, mock.patch(
+                "speech_recognition.Recognizer.recognize_google"
+            ) as mock_recognize_google:
+                recognized, expected_transcript = test_data
+                mock_recognize_google.return_value = recognized
+                file_name = os.path.join(directory, "test.wav")
+                write_wav(file_name, seconds=0.5)
+                result = transcribe_file(file_name=file_name, language="es-ES")
+                self.assertEqual(result["transcript"], expected_transcript)
+                self.assertEqual(result["duration"], 0.5)
+                self.assertIsNone(result["error"])
+                self.assertEqual(mock_recognize_google.call_count, 1)
+                self.assertEqual(
+                    mock_recognize_google.call_args.kwargs,
+                    {"language": "es-ES", "show_all": True},
+                )
+
+    def test_transcribe_file_error(self):
+        result = transcribe_file(file_name="not-existing.wav")
+        self.assertIsNotNone(result["error"])
+        self.assertEqual(result["transcript"], "")
+
+
+class BatchTranscriberTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(
+            os.environ,
+            {"KATIA_LANGUAGE": "test-language", "RECOGNIZER_BATCH_WORKERS": "3"},
+        ):
+            transcriber = BatchTranscriber()
+            self.assertEqual(transcriber.language, "test-language")
+            self.assertEqual(transcriber.workers, 3)
+            transcriber = BatchTranscriber(language="es-ES", workers=2)
+            self.assertEqual(transcriber.language, "es-ES")
+            self.assertEqual(transcriber.workers, 2)
+
+    def test_transcribe(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            "katia.recognizer.batch.ProcessPoolExecutor", ThreadPoolExecutor
+        ), mock.patch(
+            "speech_recognition.Recognizer.recognize_google"
+        ) as mock_recognize_google:
+            mock_recognize_google.return_value = {
+                "alternative": [{"transcript": "test-transcript"}]
+            }
+            for file_name in ["a.wav", "b.wav"]:
+                write_wav(os.path.join(directory, file_name), seconds=1)
+            report = BatchTranscriber(language="en-US", workers=2).transcribe(directory)
+            self.assertEqual(report["files"], 2)
+            self.assertEqual(report["errors"], 0)
+            self.assertEqual(report["workers"], 2)
+            self.assertEqual(
+                [result["file"] for result in report["results"]],
+                [os.path.join(directory, "a.wav"), os.path.join(directory, "b.wav")],
+            )
+            self.assertGreater(report["audio_seconds_per_second"], 0)
+            self.assertEqual(mock_recognize_google.call_count, 2)
+
+    def test_percentile(self):
+        test_data_list = [
+            ([], 50, 0.0),
+            ([1, 2, 3, 4], 50, 2),
+            ([1, 2, 3, 4], 95, 4),
+            ([1], 95, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                values, percent, expected = test_data
+                self.assertEqual(BatchTranscriber.percentile(values, percent), expected)
+
+    def test_report_without_failed_latencies(self):
+        results = [
+            {"file": "a.wav", "duration": 1.0, "latency": 0.4, "error": None},
+            {"file": "b.wav", "duration": 0.0, "latency": 0.0, "error": "test-error"},
+            {"file": "c.wav", "duration": 1.0, "latency": 0.6, "error": None},
+        ]
+        report = BatchTranscriber(language="en-US", workers=1).report(
+            results=results, elapsed=1.0
+        )
+        self.assertEqual(report["errors"], 1)
+        self.assertEqual(report["latency_mean"], 0.5)
+        self.assertEqual(report["latency_p50"], 0.4)
+        self.assertEqual(report["latency_p95"], 0.6)
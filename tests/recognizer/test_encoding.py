@@ -0,0 +1,150 @@
+import io
+import os
+import struct
+import wave
+from unittest import TestCase, mock
+
+import speech_recognition as sr
+
+from katia.recognizer.encoding import AudioEncoder, UploadAudioData
+
+
+def samples(amplitude: int, count: int):
+    return struct.pack(f"<{count}h", *([amplitude] * count))
+
+
+class UploadAudioDataTestCase(TestCase):
+    def test_get_flac_data(self):
+        with mock.patch("katia.recognizer.encoding.subprocess.run") as mock_run:
+            mock_run().returncode = 0
+            mock_run().stdout = b"test-flac"
+            audio = UploadAudioData(
+                frame_data=samples(100, 10),
+                sample_rate=16000,
+                sample_width=2,
+                compression_level=3,
+            )
+            self.assertEqual(audio.get_flac_data(convert_width=2), b"test-flac")
+            self.assertEqual(
+                mock_run.call_args,
+                mock.call(
+                    [
+                        sr.get_flac_converter(),
+                        "--stdout",
+                        "--totally-silent",
+                        "-3",
+                        "-",
+                    ],
+                    input=audio.get_wav_data(None, 2),
+                    stdout=mock.ANY,
+                    stderr=mock.ANY,
+                    check=False,
+                ),
+            )
+
+    def test_get_flac_data_error(self):
+        with mock.patch(
+            "katia.recognizer.encoding.subprocess.run"
+        ) as mock_run, mock.patch.object(
+            sr.AudioData, "get_flac_data", return_value=b"test-default-flac"
+        ) as mock_get_flac_data, mock.patch(
+            "katia.recognizer.encoding.logger"
+        ) as mock_logger:
+            mock_run().returncode = 1
+            mock_run().stderr = b"test-error"
+            audio = UploadAudioData(
+                frame_data=samples(100, 10),
+                sample_rate=16000,
+                sample_width=2,
+                compression_level=3,
+            )
+            self.assertEqual(audio.get_flac_data(convert_width=2), b"test-default-flac")
+            self.assertEqual(mock_get_flac_data.call_args, mock.call(None, 2))
+            self.assertEqual(mock_logger.warning.call_count, 1)
+            self.assertEqual(
+                mock_logger.warning.call_args.kwargs["extra"],
+                {"returncode": 1, "error": "test-error"},
+            )
+
+    def test_get_flac_data_compression(self):
+        frame_data = b"".join(
+            struct.pack("<h", (index * 37) % 2000 - 1000) for index in range(16000)
+        )
+        sizes = [
+            len(
+                UploadAudioData(
+                    frame_data=frame_data,
+                    sample_rate=16000,
+                    sample_width=2,
+                    compression_level=compression_level,
+                ).get_flac_data()
+            )
+            for compression_level in [0, 8]
+        ]
+        self.assertTrue(all(sizes))
+        self.assertLessEqual(sizes[1], sizes[0])
+
+
+class AudioEncoderTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "RECOGNIZER_UPLOAD_SAMPLE_RATE": "8000",
+                "RECOGNIZER_FLAC_COMPRESSION_LEVEL": "8",
+                "RECOGNIZER_TRIM_PADDING_IN_SECONDS": "0.2",
+            },
+        ):
+            encoder = AudioEncoder()
+            self.assertEqual(encoder.sample_rate, 8000)
+            self.assertEqual(encoder.compression_level, 8)
+            self.assertEqual(encoder.trim_padding_in_seconds, 0.2)
+
+    def test_prepare(self):
+        test_data_list = [
+            (44100, 4, 16000),
+            (8000, 2, 8000),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.dict(
+                os.environ, {"RECOGNIZER_UPLOAD_SAMPLE_RATE": "16000"}
+            ):
+                sample_rate, sample_width, expected_sample_rate = test_data
+                audio = sr.AudioData(
+                    frame_data=b"\x00" * sample_rate * sample_width,
+                    sample_rate=sample_rate,
+                    sample_width=sample_width,
+                )
+                prepared = AudioEncoder().prepare(audio=audio, energy_threshold=100)
+                self.assertIsInstance(prepared, UploadAudioData)
+                self.assertEqual(prepared.sample_rate, expected_sample_rate)
+                self.assertEqual(prepared.sample_width, 2)
+                self.assertAlmostEqual(
+                    len(prepared.frame_data), expected_sample_rate * 2, delta=4
+                )
+                wav_data = prepared.get_wav_data()
+                with wave.open(io.BytesIO(wav_data), "rb") as wav_file:
+                    self.assertEqual(wav_file.getnchannels(), 1)
+                    self.assertEqual(wav_file.getframerate(), expected_sample_rate)
+
+    def test_trim(self):
+        silence = samples(0, 1600)
+        voice = samples(1000, 1600)
+        test_data_list = [
+            (silence + voice + silence, 0, voice),
+            (silence + voice + silence, 0.01, samples(0, 160) + voice + samples(0, 160)),
+            (voice, 0.1, voice),
+            (silence, 0.1, silence),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data[1:2]), mock.patch.dict(
+                os.environ,
+                {"RECOGNIZER_TRIM_PADDING_IN_SECONDS": str(test_data[1])},
+            ):
+                frame_data, _, expected = test_data
+                self.assertEqual(
+                    AudioEncoder().trim(
+                        frame_data=frame_data, sample_rate=16000, energy_threshold=100
+                    ),
+                    expected,
+                )
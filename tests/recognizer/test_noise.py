@@ -0,0 +1,97 @@
+import os
+import struct
+from collections import deque
+from unittest import TestCase, mock
+
+from katia.recognizer.noise import CalibrationStream, NoiseCalibrator
+
+
+def frame(amplitude: int, samples: int = 10):
+    return struct.pack(f"<{samples}h", *([amplitude] * samples))
+
+
+class CalibrationStreamTestCase(TestCase):
+    def test_read(self):
+        test_data_list = [
+            (b"test-frame", [b"test-frame"]),
+            (b"", []),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                buffer, expected_frames = test_data
+                stream = mock.MagicMock()
+                stream.read.return_value = buffer
+                frames = deque()
+                calibration_stream = CalibrationStream(stream=stream, frames=frames)
+                self.assertEqual(calibration_stream.read(10), buffer)
+                self.assertEqual(list(frames), expected_frames)
+
+    def test_getattr(self):
+        stream = mock.MagicMock()
+        CalibrationStream(stream=stream, frames=deque()).close()
+        self.assertEqual(stream.close.call_count, 1)
+
+
+class NoiseCalibratorTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "RECOGNIZER_NOISE_WINDOW_IN_SECONDS": "2",
+                "RECOGNIZER_NOISE_CALIBRATION_INTERVAL_IN_SECONDS": "0.1",
+                "RECOGNIZER_NOISE_PERCENTILE": "10",
+                "RECOGNIZER_NOISE_THRESHOLD_RATIO": "2",
+            },
+        ):
+            recognizer = mock.MagicMock()
+            recognizer.energy_threshold = 50
+            calibrator = NoiseCalibrator(recognizer=recognizer)
+            self.assertEqual(calibrator.window_in_seconds, 2)
+            self.assertEqual(calibrator.interval_in_seconds, 0.1)
+            self.assertEqual(calibrator.percentile, 10)
+            self.assertEqual(calibrator.ratio, 2)
+            self.assertEqual(calibrator.minimum_threshold, 50)
+            self.assertTrue(calibrator.daemon)
+
+    def test_attach(self):
+        with mock.patch.dict(os.environ, {"RECOGNIZER_NOISE_WINDOW_IN_SECONDS": "2"}):
+            source = mock.MagicMock()
+            source.SAMPLE_RATE = 16000
+            source.CHUNK = 1000
+            source.SAMPLE_WIDTH = 2
+            stream = source.stream
+            calibrator = NoiseCalibrator(recognizer=mock.MagicMock())
+            calibrator.attach(source)
+            self.assertEqual(calibrator.frames.maxlen, 32)
+            self.assertIsInstance(source.stream, CalibrationStream)
+            self.assertEqual(source.stream.stream, stream)
+            self.assertIs(source.stream.frames, calibrator.frames)
+
+    def test_calibrate(self):
+        test_data_list = [
+            ([], 1, None),
+            ([frame(100)] * 8 + [frame(3000)] * 2, 1, 150),
+            ([frame(0)] * 10, 1, 1),
+            ([frame(100)] * 10, 500, 500),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                frames, minimum_threshold, expected_threshold = test_data
+                recognizer = mock.MagicMock()
+                recognizer.energy_threshold = minimum_threshold
+                calibrator = NoiseCalibrator(recognizer=recognizer)
+                calibrator.frames.extend(frames)
+                self.assertEqual(calibrator.calibrate(), expected_threshold)
+                self.assertEqual(
+                    recognizer.energy_threshold, expected_threshold or minimum_threshold
+                )
+
+    def test_run(self):
+        with mock.patch.object(NoiseCalibrator, "calibrate") as mock_calibrate:
+            calibrator = NoiseCalibrator(recognizer=mock.MagicMock())
+            calibrator.interval_in_seconds = 0.001
+            mock_calibrate.side_effect = lambda: calibrator.deactivate()
+            calibrator.start()
+            calibrator.join(timeout=1)
+            self.assertFalse(calibrator.is_alive())
+            self.assertEqual(mock_calibrate.call_count, 1)
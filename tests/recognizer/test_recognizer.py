@@ -1,10 +1,15 @@
 import os
+import tempfile
+import time
 from logging import Logger
 from unittest import TestCase, mock
 
-from speech_recognition import UnknownValueError
+from speech_recognition import UnknownValueError, WaitTimeoutError
 
 from katia.recognizer import KatiaRecognizer
+from katia.recognizer.audio_source import ReplayAudioFile
+from katia.state import SpeakingState
+from tests.recognizer.test_audio_source import write_wav
 
 
 class KatiaRecognizerTestCase(TestCase):
@@ -34,6 +39,7 @@ class KatiaRecognizerTestCase(TestCase):
             )
             self.assertEqual(recognizer.language, "en-US")
             self.assertEqual(recognizer.valid_names, ["test-name", "name-test"])
+            self.assertIsNone(recognizer.noise_calibrator)
             self.assertEqual(mock_recognizer.call_count, 1)
             self.assertEqual(mock_configure_recognizer.call_count, 1)
             self.assertEqual(mock_producer.call_count, 2)
@@ -51,12 +57,19 @@ class KatiaRecognizerTestCase(TestCase):
     def test_run(self):
         with mock.patch("katia.recognizer.recognizer.KatiaProducer"), mock.patch.object(
             KatiaRecognizer, "listen"
-        ) as mock_listen:
+        ) as mock_listen, mock.patch(
+            "katia.recognizer.recognizer.KatiaSubscriber"
+        ) as mock_subscriber:
             recognizer = KatiaRecognizer(
                 valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
             )
             recognizer.start()
+            recognizer.join()
         self.assertEqual(mock_listen.call_count, 1)
+        self.assertEqual(mock_subscriber().start.call_count, 1)
+        self.assertEqual(mock_subscriber().deactivate.call_count, 1)
+        # The producer and the stopper producer are the same mock
+        self.assertEqual(recognizer.producer.close.call_count, 2)
 
     def test_listen(self):
         test_data_list = [
@@ -72,10 +85,16 @@ class KatiaRecognizerTestCase(TestCase):
                 KatiaRecognizer, "called_me"
             ) as mock_called_me, mock.patch.object(
                 KatiaRecognizer, "produce_messages"
-            ) as mock_produce_messages:
+            ) as mock_produce_messages, mock.patch(
+                "katia.recognizer.recognizer.NoiseCalibrator"
+            ) as mock_noise_calibrator, mock.patch(
+                "katia.recognizer.recognizer.AudioEncoder"
+            ) as mock_audio_encoder, mock.patch.dict(
+                os.environ, {"RECOGNIZER_NOISE_CALIBRATION": "True"}
+            ):
                 called_me, mock_produce_messages_call_count = test_data
                 mock_recognizer().listen.side_effect = (
-                    lambda source: self.deactivate_recognizer(
+                    lambda source, timeout: self.deactivate_recognizer(
                         recognizer_to_deactivate=recognizer,
                         data_to_return="test-audio",
                     )
@@ -90,9 +109,46 @@ class KatiaRecognizerTestCase(TestCase):
                     mock_produce_messages.call_count, mock_produce_messages_call_count
                 )
                 self.assertEqual(mock_microphone.call_count, 1)
-                self.assertEqual(mock_recognizer().adjust_for_ambient_noise.call_count, 1)
+                self.assertEqual(mock_recognizer().adjust_for_ambient_noise.call_count, 0)
+                self.assertEqual(mock_noise_calibrator().start.call_count, 1)
+                self.assertEqual(mock_noise_calibrator().attach.call_count, 1)
                 self.assertEqual(mock_recognizer().listen.call_count, 1)
                 self.assertEqual(mock_recognizer().recognize_google.call_count, 1)
+                self.assertEqual(
+                    mock_recognizer().recognize_google.call_args.args,
+                    (mock_audio_encoder().prepare(),),
+                )
+
+    def test_listen_recorded(self):
+        test_data_list = [(True, 1), (False, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.recognizer.recognizer.KatiaProducer"
+            ), mock.patch("speech_recognition.Microphone"), mock.patch(
+                "speech_recognition.Recognizer"
+            ) as mock_recognizer, mock.patch(
+                "katia.recognizer.recognizer.NoiseCalibrator"
+            ), mock.patch(
+                "katia.recognizer.recognizer.AudioEncoder"
+            ), mock.patch(
+                "katia.recognizer.recognizer.SessionRecorder.active"
+            ) as mock_recorder:
+                audio, mock_record_audio_call_count = test_data
+                mock_recorder.audio = audio
+                mock_recognizer().listen.side_effect = (
+                    lambda source, timeout: self.deactivate_recognizer(
+                        recognizer_to_deactivate=recognizer,
+                        data_to_return="test-audio",
+                    )
+                )
+                mock_recognizer().recognize_google.return_value = {}
+                recognizer = KatiaRecognizer(
+                    valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
+                )
+                recognizer.listen()
+                self.assertEqual(
+                    mock_recorder.record_audio.call_count, mock_record_audio_call_count
+                )
 
     def test_listen_error(self):
         test_data_list = [
@@ -106,10 +162,16 @@ class KatiaRecognizerTestCase(TestCase):
                 "speech_recognition.Recognizer"
             ) as mock_recognizer, mock.patch.object(
                 Logger, "error"
-            ) as mock_logger_error:
+            ) as mock_logger_error, mock.patch(
+                "katia.recognizer.recognizer.NoiseCalibrator"
+            ) as mock_noise_calibrator, mock.patch(
+                "katia.recognizer.recognizer.AudioEncoder"
+            ) as mock_audio_encoder, mock.patch.dict(
+                os.environ, {"RECOGNIZER_NOISE_CALIBRATION": "True"}
+            ):
                 exception_raised, mock_logger_error_call_count = test_data
                 mock_recognizer().listen.side_effect = (
-                    lambda source: self.deactivate_recognizer(
+                    lambda source, timeout: self.deactivate_recognizer(
                         recognizer_to_deactivate=recognizer,
                         data_to_return="test-audio",
                     )
@@ -120,9 +182,15 @@ class KatiaRecognizerTestCase(TestCase):
                 )
                 recognizer.listen()
                 self.assertEqual(mock_microphone.call_count, 1)
-                self.assertEqual(mock_recognizer().adjust_for_ambient_noise.call_count, 1)
+                self.assertEqual(mock_recognizer().adjust_for_ambient_noise.call_count, 0)
+                self.assertEqual(mock_noise_calibrator().start.call_count, 1)
+                self.assertEqual(mock_noise_calibrator().attach.call_count, 1)
                 self.assertEqual(mock_recognizer().listen.call_count, 1)
                 self.assertEqual(mock_recognizer().recognize_google.call_count, 1)
+                self.assertEqual(
+                    mock_recognizer().recognize_google.call_args.args,
+                    (mock_audio_encoder().prepare(),),
+                )
                 self.assertEqual(
                     mock_logger_error.call_count, mock_logger_error_call_count
                 )
@@ -135,7 +203,11 @@ class KatiaRecognizerTestCase(TestCase):
                 1,
                 [
                     mock.call(
-                        message_data={"source": "recognizer", "message": "Stop speaking"}
+                        message_data={
+                            "source": "recognizer",
+                            "message": "Stop speaking",
+                            "requested_at": 1.5,
+                        }
                     )
                 ],
             ),
@@ -159,24 +231,28 @@ class KatiaRecognizerTestCase(TestCase):
         ]
         for test_data in test_data_list:
             with self.subTest(test_data=test_data), mock.patch(
-                "katia.recognizer.recognizer.mixer"
-            ) as mock_mixer, mock.patch(
                 "katia.recognizer.recognizer.KatiaProducer"
             ) as mock_producer, mock.patch.object(
                 KatiaRecognizer, "should_assistant_stop_talking"
-            ) as mock_should_assistant_stop_talking:
+            ) as mock_should_assistant_stop_talking, mock.patch(
+                "katia.recognizer.recognizer.time.time"
+            ) as mock_time:
+                mock_time.return_value = 1.5
                 (
-                    mixer_busy,
+                    speaking,
                     should_assistant_stop_talking,
                     mock_producer_send_message_call_count,
                     mock_producer_send_message_call_args_list,
                 ) = test_data
-                mock_mixer.music.get_busy.return_value = mixer_busy
                 mock_should_assistant_stop_talking.return_value = (
                     should_assistant_stop_talking
                 )
+                speaking_state = SpeakingState()
+                speaking_state.set_speaking(speaking=speaking)
                 recognizer = KatiaRecognizer(
-                    valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
+                    valid_names=["test-name", "name-test"],
+                    owner_uuid="test-uuid",
+                    speaking_state=speaking_state,
                 )
                 recognizer.produce_messages(recognized="test-message")
                 self.assertEqual(
@@ -238,3 +314,199 @@ class KatiaRecognizerTestCase(TestCase):
                     valid_names=valid_names, owner_uuid="test-uuid"
                 )
                 self.assertEqual(recognizer.called_me(recognized=recognized), expected)
+
+    def test_listen_without_noise_calibration(self):
+        with mock.patch("katia.recognizer.recognizer.KatiaProducer"), mock.patch(
+            "speech_recognition.Microphone"
+        ), mock.patch("speech_recognition.Recognizer") as mock_recognizer, mock.patch(
+            "katia.recognizer.recognizer.NoiseCalibrator"
+        ) as mock_noise_calibrator, mock.patch(
+            "katia.recognizer.recognizer.AudioEncoder"
+        ), mock.patch.dict(
+            os.environ,
+            {
+                "RECOGNIZER_NOISE_CALIBRATION": "False",
+            },
+        ):
+            mock_recognizer().listen.side_effect = (
+                lambda source, timeout: self.deactivate_recognizer(
+                    recognizer_to_deactivate=recognizer,
+                    data_to_return="test-audio",
+                )
+            )
+            mock_recognizer().recognize_google.return_value = {}
+            recognizer = KatiaRecognizer(
+                valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
+            )
+            self.assertIsNone(recognizer.noise_calibrator)
+            recognizer.listen()
+            self.assertEqual(mock_noise_calibrator.call_count, 0)
+            self.assertEqual(mock_recognizer().adjust_for_ambient_noise.call_count, 1)
+
+    def test_listen_timeout(self):
+        with mock.patch("katia.recognizer.recognizer.KatiaProducer"), mock.patch(
+            "speech_recognition.Microphone"
+        ), mock.patch("speech_recognition.Recognizer") as mock_recognizer, mock.patch(
+            "katia.recognizer.recognizer.NoiseCalibrator"
+        ), mock.patch.dict(
+            os.environ, {"RECOGNIZER_LISTEN_TIMEOUT_IN_SECONDS": "0.5"}
+        ):
+            recognizer = KatiaRecognizer(
+                valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
+            )
+
+            def listen(source, timeout):
+                self.assertEqual(timeout, 0.5)
+                recognizer.deactivate()
+                raise WaitTimeoutError()
+
+            mock_recognizer().listen.side_effect = listen
+            recognizer.listen()
+            self.assertEqual(mock_recognizer().listen.call_count, 1)
+            self.assertEqual(mock_recognizer().recognize_google.call_count, 0)
+
+    def test_listen_replay(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch(
+            "katia.recognizer.recognizer.KatiaProducer"
+        ), mock.patch.dict(
+            os.environ,
+            {
+                "RECOGNIZER_AUDIO_SOURCE": directory,
+                "RECOGNIZER_AUDIO_SOURCE_SPEED": "0",
+            },
+        ), mock.patch(
+            "speech_recognition.Recognizer.adjust_for_ambient_noise"
+        ) as mock_adjust_for_ambient_noise, mock.patch(
+            "speech_recognition.Recognizer.recognize_google"
+        ) as mock_recognize_google:
+            write_wav(os.path.join(directory, "a.wav"))
+            write_wav(os.path.join(directory, "b.wav"))
+            recognizer = KatiaRecognizer(
+                valid_names=["test-name", "name-test"], owner_uuid="test-uuid"
+            )
+            self.assertEqual(recognizer.audio_source, directory)
+            self.assertEqual(recognizer.audio_source_speed, 0)
+            recognizer.listen()
+            self.assertEqual(mock_adjust_for_ambient_noise.call_count, 0)
+            self.assertEqual(mock_recognize_google.call_count, 0)
+
+    def test_is_exhausted(self):
+        source = mock.MagicMock()
+        self.assertFalse(KatiaRecognizer.is_exhausted(source))
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "a.wav")
+            write_wav(file_name)
+            with ReplayAudioFile(filename=file_name, speed=0) as replay_source:
+                self.assertFalse(KatiaRecognizer.is_exhausted(replay_source))
+                replay_source.stream.read()
+                replay_source.stream.read()
+                self.assertTrue(KatiaRecognizer.is_exhausted(replay_source))
+
+    def test_called_me_continue_conversation(self):
+        test_data_list = [
+            (10, True),
+            (1, False),
+            (40, False),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.recognizer.recognizer.KatiaProducer"
+            ), mock.patch.dict(
+                os.environ,
+                {
+                    "RECOGNIZER_CONTINUE_CONVERSATION_DELAY_IN_SECONDS": "30",
+                    "RECOGNIZER_GAP_CONTINUE_CONVERSATION_IN_SECONDS": "3",
+                },
+            ):
+                seconds_since_last_speaking, expected = test_data
+                recognizer = KatiaRecognizer(
+                    valid_names=["test-name"], owner_uuid="test-uuid"
+                )
+                recognizer.speaking_state.last_speaking.value = (
+                    time.time() - seconds_since_last_speaking
+                )
+                self.assertEqual(
+                    recognizer.called_me(
+                        recognized={"alternative": [{"transcript": "hello"}]}
+                    ),
+                    expected,
+                )
+
+    def test_init_speaking_state(self):
+        test_data_list = [
+            (SpeakingState(), 0),
+            (None, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.recognizer.recognizer.KatiaProducer"
+            ), mock.patch(
+                "katia.recognizer.recognizer.KatiaConsumer"
+            ) as mock_consumer, mock.patch(
+                "katia.recognizer.recognizer.KatiaSubscriber"
+            ) as mock_subscriber:
+                speaking_state, mock_subscriber_call_count = test_data
+                recognizer = KatiaRecognizer(
+                    valid_names=["test-name"],
+                    owner_uuid="test-uuid",
+                    speaking_state=speaking_state,
+                )
+                self.assertEqual(mock_subscriber.call_count, mock_subscriber_call_count)
+                self.assertEqual(mock_consumer.call_count, mock_subscriber_call_count)
+                if speaking_state:
+                    self.assertEqual(recognizer.speaking_state, speaking_state)
+                    self.assertIsNone(recognizer.subscriber_last_speaking)
+                else:
+                    self.assertEqual(
+                        mock_consumer.call_args,
+                        mock.call(
+                            topic="user-test-uuid-recognizer-last-speaking",
+                            group_id="test-uuid",
+                        ),
+                    )
+                    self.assertEqual(
+                        mock_subscriber.call_args,
+                        mock.call(
+                            consumer=mock_consumer(),
+                            callback=recognizer.speaking_state.update,
+                        ),
+                    )
+
+    def test_deactivate(self):
+        with mock.patch("katia.recognizer.recognizer.KatiaProducer"), mock.patch(
+            "katia.recognizer.recognizer.KatiaSubscriber"
+        ) as mock_subscriber:
+            recognizer = KatiaRecognizer(
+                valid_names=["test-name"], owner_uuid="test-uuid"
+            )
+            recognizer.deactivate()
+            self.assertFalse(recognizer.active)
+            self.assertEqual(mock_subscriber().deactivate.call_count, 1)
+
+    def test_drain(self):
+        with mock.patch("katia.recognizer.recognizer.KatiaProducer"), mock.patch(
+            "katia.recognizer.recognizer.KatiaSubscriber"
+        ) as mock_subscriber:
+            recognizer = KatiaRecognizer(
+                valid_names=["test-name"], owner_uuid="test-uuid"
+            )
+            recognizer.drain()
+            self.assertFalse(recognizer.active)
+            self.assertEqual(mock_subscriber().deactivate.call_count, 1)
+
+    def test_close(self):
+        test_data_list = [(True, 1), (False, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.recognizer.recognizer.KatiaProducer"
+            ) as mock_producer, mock.patch(
+                "katia.recognizer.recognizer.KatiaSubscriber"
+            ) as mock_subscriber:
+                is_alive, mock_join_call_count = test_data
+                mock_subscriber().is_alive.return_value = is_alive
+                recognizer = KatiaRecognizer(
+                    valid_names=["test-name"], owner_uuid="test-uuid"
+                )
+                recognizer.close()
+                self.assertEqual(mock_subscriber().join.call_count, mock_join_call_count)
+                self.assertEqual(mock_producer().close.call_count, 2)
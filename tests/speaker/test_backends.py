@@ -0,0 +1,219 @@
+import io
+import os
+import subprocess
+import wave
+from unittest import TestCase, mock
+
+from katia.speaker.backends import (FakeBackend, LocalBackend, MeasuredStream,
+                                    PollyBackend, TTSBackend, TTSError,
+                                    get_backend)
+
+
+def wav_bytes(frames: bytes, channels: int = 1, sample_width: int = 2, rate: int = 8000):
+    output = io.BytesIO()
+    with wave.open(output, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(frames)
+    return output.getvalue()
+
+
+class MeasuredStreamTestCase(TestCase):
+    def test_read_and_close(self):
+        on_close = mock.MagicMock()
+        stream = MeasuredStream(stream=io.BytesIO(b"test-audio"), on_close=on_close)
+        self.assertEqual(stream.read(5), b"test-")
+        self.assertEqual(stream.read(), b"audio")
+        stream.close()
+        stream.close()
+        self.assertEqual(on_close.call_count, 1)
+        self.assertEqual(on_close.call_args, mock.call(10))
+
+
+class StreamBackend(TTSBackend):
+    def synthesize_stream(self, text: str, output_format: str, sample_rate: int):
+        return None
+
+
+class TTSBackendTestCase(TestCase):
+    def test_synthesize(self):
+        test_data_list = [
+            (io.BytesIO(b"test-audio"), 1, 10),
+            (None, 0, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                StreamBackend, "synthesize_stream"
+            ) as mock_synthesize_stream:
+                stream, requests, size = test_data
+                mock_synthesize_stream.return_value = stream
+                backend = StreamBackend(voice="test-voice", engine="test-engine")
+                result = backend.synthesize(
+                    text="test-text", output_format="pcm", sample_rate=16000
+                )
+                if result is not None:
+                    result.read()
+                    result.close()
+                self.assertEqual(backend.requests, requests)
+                self.assertEqual(backend.bytes, size)
+                self.assertGreaterEqual(backend.seconds, 0)
+                self.assertEqual(
+                    mock_synthesize_stream.call_args,
+                    mock.call(text="test-text", output_format="pcm", sample_rate=16000),
+                )
+
+    def test_abstract_backend(self):
+        with self.assertRaises(TypeError):
+            TTSBackend(voice="test-voice", engine="test-engine")
+
+
+class PollyBackendTestCase(TestCase):
+    def test_synthesize_stream(self):
+        test_data_list = [
+            ("mp3", {"AudioStream": "test-stream"}, "test-stream", {}),
+            (
+                "pcm",
+                {"AudioStream": "test-stream"},
+                "test-stream",
+                {"SampleRate": "8000"},
+            ),
+            ("mp3", {"Not-AudioStream": None}, None, {}),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.backends.Session"
+            ) as mock_session:
+                output_format, response, expected, extra_parameters = test_data
+                mock_session().client().synthesize_speech.return_value = response
+                backend = PollyBackend(
+                    profile_name="test-profile", voice="test-voice", engine="neural"
+                )
+                self.assertEqual(
+                    backend.synthesize_stream(
+                        text="test-text", output_format=output_format, sample_rate=8000
+                    ),
+                    expected,
+                )
+                self.assertEqual(
+                    mock_session.call_args, mock.call(profile_name="test-profile")
+                )
+                config = mock_session().client.call_args.kwargs["config"]
+                self.assertEqual(config.max_pool_connections, 10)
+                self.assertTrue(config.tcp_keepalive)
+                self.assertEqual(
+                    mock_session().client().synthesize_speech.call_args,
+                    mock.call(
+                        Text="test-text",
+                        OutputFormat=output_format,
+                        VoiceId="test-voice",
+                        Engine="neural",
+                        **extra_parameters,
+                    ),
+                )
+
+
+class LocalBackendTestCase(TestCase):
+    def test_init(self):
+        with mock.patch("katia.speaker.backends.shutil.which") as mock_which:
+            mock_which.side_effect = [None, "/usr/bin/espeak"]
+            backend = LocalBackend(language="es-ES")
+            self.assertEqual(backend.command, "/usr/bin/espeak")
+            self.assertEqual(backend.voice, "es")
+            mock_which.side_effect = None
+            mock_which.return_value = None
+            with self.assertRaises(TTSError):
+                LocalBackend(language="es-ES")
+
+    def test_synthesize_stream(self):
+        test_data_list = [
+            (wav_bytes(b"\x01\x00\x02\x00", rate=16000), b"\x01\x00\x02\x00"),
+            (wav_bytes(b"\x01\x00\x03\x00", channels=2, rate=16000), b"\x02\x00"),
+            (wav_bytes(b"\x80\x80", sample_width=1, rate=16000), b"\x00\x00\x00\x00"),
+            (wav_bytes(b"\x01\x00" * 8, rate=8000), 30),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.backends.shutil.which"
+            ) as mock_which, mock.patch(
+                "katia.speaker.backends.subprocess.run"
+            ) as mock_run:
+                wav, expected = test_data
+                mock_which.return_value = "/usr/bin/espeak-ng"
+                mock_run.return_value.stdout = wav
+                backend = LocalBackend(language="en-US")
+                stream = backend.synthesize_stream(
+                    text="test-text", output_format="pcm", sample_rate=16000
+                )
+                audio = stream.read()
+                if isinstance(expected, int):
+                    self.assertEqual(len(audio), expected)
+                else:
+                    self.assertEqual(audio, expected)
+                self.assertEqual(
+                    mock_run.call_args.args[0],
+                    ["/usr/bin/espeak-ng", "--stdout", "-v", "en", "test-text"],
+                )
+
+    def test_synthesize_stream_error(self):
+        test_data_list = [
+            subprocess.CalledProcessError(1, "espeak-ng"),
+            OSError(),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.backends.shutil.which"
+            ) as mock_which, mock.patch(
+                "katia.speaker.backends.subprocess.run"
+            ) as mock_run:
+                mock_which.return_value = "/usr/bin/espeak-ng"
+                mock_run.side_effect = test_data
+                with self.assertRaises(TTSError):
+                    LocalBackend(language="en-US").synthesize_stream(
+                        text="test-text", output_format="pcm", sample_rate=16000
+                    )
+
+
+class FakeBackendTestCase(TestCase):
+    def test_synthesize_stream(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "SPEAKER_FAKE_LATENCY_IN_SECONDS": "0.5",
+                "SPEAKER_FAKE_SECONDS_PER_CHARACTER": "0.1",
+            },
+        ), mock.patch("katia.speaker.backends.time.sleep") as mock_sleep:
+            backend = FakeBackend()
+            audio = backend.synthesize_stream(
+                text="test-text", output_format="pcm", sample_rate=16000
+            ).read()
+            self.assertEqual(len(audio), 9 * 1600 * 2)
+            self.assertEqual(
+                audio,
+                backend.synthesize_stream(
+                    text="test-text", output_format="pcm", sample_rate=16000
+                ).read(),
+            )
+            self.assertEqual(mock_sleep.call_args, mock.call(0.5))
+
+
+class GetBackendTestCase(TestCase):
+    def test_get_backend(self):
+        parameters = {
+            "profile_name": "test-profile",
+            "voice": "test-voice",
+            "engine": "neural",
+            "language": "en-US",
+        }
+        with mock.patch("katia.speaker.backends.Session"):
+            self.assertIsInstance(
+                get_backend(name="polly", **parameters), PollyBackend
+            )
+        with mock.patch(
+            "katia.speaker.backends.shutil.which"
+        ) as mock_which:
+            mock_which.return_value = "/usr/bin/espeak-ng"
+            self.assertIsInstance(get_backend(name="local", **parameters), LocalBackend)
+        self.assertIsInstance(get_backend(name="fake", **parameters), FakeBackend)
+        with self.assertRaises(ValueError):
+            get_backend(name="not-backend", **parameters)
@@ -0,0 +1,126 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from katia.speaker.cache import TTSCache
+
+
+class TTSCacheTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(
+            os.environ,
+            {
+                "SPEAKER_CACHE_DIRECTORY": self.directory.name,
+                "SPEAKER_CACHE_MEMORY_ITEMS": "2",
+                "SPEAKER_CACHE_DISK_SIZE_IN_MB": "1",
+            },
+        )
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.directory.cleanup()
+
+    def test_init(self):
+        cache = TTSCache()
+        self.assertEqual(cache.directory, self.directory.name)
+        self.assertEqual(cache.memory_items, 2)
+        self.assertEqual(cache.disk_size, 2**20)
+
+    def test_key(self):
+        key = TTSCache.key(
+            text="test", voice="test-voice", engine="neural", output_format="mp3"
+        )
+        self.assertEqual(len(key), 64)
+        self.assertEqual(
+            key,
+            TTSCache.key(
+                text="test", voice="test-voice", engine="neural", output_format="mp3"
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            TTSCache.key(
+                text="test", voice="test-voice", engine="standard", output_format="mp3"
+            ),
+        )
+
+    def test_set_and_get(self):
+        cache = TTSCache()
+        self.assertIsNone(cache.get("test-key"))
+        cache.set(key="test-key", audio=b"test-audio")
+        self.assertEqual(cache.get("test-key"), b"test-audio")
+        with open(os.path.join(self.directory.name, "test-key"), "rb") as file:
+            self.assertEqual(file.read(), b"test-audio")
+
+        # A new cache only has the audio in disk
+        new_cache = TTSCache()
+        self.assertNotIn("test-key", new_cache.memory)
+        self.assertEqual(new_cache.get("test-key"), b"test-audio")
+        self.assertIn("test-key", new_cache.memory)
+
+    def test_set_memory(self):
+        cache = TTSCache()
+        cache.set_memory(key="key-1", audio=b"1")
+        cache.set_memory(key="key-2", audio=b"2")
+        cache.get("key-1")
+        cache.set_memory(key="key-3", audio=b"3")
+        self.assertEqual(list(cache.memory), ["key-1", "key-3"])
+
+    def test_set_error(self):
+        with mock.patch(
+            "katia.speaker.cache.os.makedirs", side_effect=OSError("test-error")
+        ), mock.patch("katia.speaker.cache.logger") as mock_logger:
+            cache = TTSCache()
+            cache.set(key="test-key", audio=b"test-audio")
+            self.assertEqual(cache.get("test-key"), b"test-audio")
+            self.assertEqual(mock_logger.error.call_count, 1)
+
+    def test_evict(self):
+        cache = TTSCache()
+        cache.disk_size = 10
+        for index, key in enumerate(["key-1", "key-2", "key-3"]):
+            cache.set(key=key, audio=b"12345")
+            os.utime(cache.path(key), (index, index))
+        self.assertEqual(cache.evict(), 10)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["key-2", "key-3"])
+
+    def test_disk_usage(self):
+        cache = TTSCache()
+        cache.disk_size = 10
+        with mock.patch.object(TTSCache, "evict", wraps=cache.evict) as mock_evict:
+            cache.set(key="key-1", audio=b"12345")
+            # The directory is scanned the first time
+            self.assertEqual(mock_evict.call_count, 1)
+            self.assertEqual(cache.disk_usage, 5)
+            cache.set(key="key-1", audio=b"123")
+            cache.set(key="key-2", audio=b"12345")
+            self.assertEqual(mock_evict.call_count, 1)
+            self.assertEqual(cache.disk_usage, 8)
+            os.utime(cache.path("key-1"), (0, 0))
+            cache.set(key="key-3", audio=b"12345")
+            # And again only when the cache is full
+            self.assertEqual(mock_evict.call_count, 2)
+            self.assertEqual(cache.disk_usage, 10)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["key-2", "key-3"])
+
+    def test_set_temporary_files(self):
+        cache = TTSCache()
+        with mock.patch(
+            "katia.speaker.cache.os.replace", side_effect=OSError("test-error")
+        ), mock.patch("katia.speaker.cache.logger") as mock_logger:
+            cache.set(key="test-key", audio=b"test-audio")
+            self.assertEqual(mock_logger.error.call_count, 1)
+        # The temporary file of a failed write is removed
+        self.assertEqual(os.listdir(self.directory.name), [])
+        with mock.patch(
+            "katia.speaker.cache.tempfile.NamedTemporaryFile",
+            wraps=tempfile.NamedTemporaryFile,
+        ) as mock_named_temporary_file:
+            cache.set(key="test-key", audio=b"1")
+            cache.set(key="test-key", audio=b"2")
+        for call in mock_named_temporary_file.call_args_list:
+            self.assertEqual(call.kwargs["dir"], self.directory.name)
+            self.assertFalse(call.kwargs["delete"])
+        self.assertEqual(os.listdir(self.directory.name), ["test-key"])
@@ -0,0 +1,90 @@
+import os
+from unittest import TestCase, mock
+
+from katia.speaker.playback_queue import PlaybackQueue
+
+
+class PlaybackQueueTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(os.environ, {"SPEAKER_STALE_MESSAGE_IN_SECONDS": "5"}):
+            self.assertEqual(PlaybackQueue().stale_in_seconds, 5)
+
+    def test_put_and_get(self):
+        test_data_list = [
+            (
+                [{"message": "answer-1"}, {"message": "answer-2"}],
+                ["answer-2"],
+                {"superseded": 1},
+            ),
+            (
+                [
+                    {"message": "answer", "priority": "answer"},
+                    {"message": "notice", "priority": "notice"},
+                ],
+                ["notice", "answer"],
+                {},
+            ),
+            (
+                [
+                    {"message": "notice", "priority": "notice"},
+                    {"message": "notice", "priority": "notice"},
+                    {"message": "other-notice", "priority": "notice"},
+                ],
+                ["notice", "other-notice"],
+                {"coalesced": 1},
+            ),
+            (
+                [
+                    {"message": "filler-1", "priority": "filler"},
+                    {"message": "filler-2", "priority": "filler"},
+                    {"message": "notice", "priority": "notice"},
+                ],
+                ["notice", "filler-1"],
+                {"coalesced": 1},
+            ),
+            (
+                [
+                    {"message": "filler", "priority": "filler"},
+                    {"message": "answer", "priority": "answer"},
+                ],
+                ["answer"],
+                {"superseded": 1},
+            ),
+            (
+                [
+                    {"message": "old", "priority": "notice", "created_at": 50},
+                    {"message": "answer", "priority": "not-priority"},
+                ],
+                ["answer"],
+                {"stale": 1},
+            ),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.playback_queue.time.time"
+            ) as mock_time:
+                messages, expected, dropped = test_data
+                mock_time.return_value = 100
+                playback_queue = PlaybackQueue()
+                for message in messages:
+                    playback_queue.put(message)
+                reproduced = []
+                while message := playback_queue.get(timeout=0):
+                    reproduced.append(message["message"])
+                self.assertEqual(reproduced, expected)
+                self.assertEqual(playback_queue.dropped, dropped)
+                self.assertEqual(len(playback_queue), 0)
+
+    def test_get_timeout(self):
+        self.assertIsNone(PlaybackQueue().get(timeout=0.01))
+
+    def test_drop(self):
+        playback_queue = PlaybackQueue()
+        playback_queue.put({"message": "notice", "priority": "notice"})
+        playback_queue.put({"message": "answer", "priority": "answer"})
+        playback_queue.drop(reason="interrupted", priority="answer")
+        self.assertEqual(playback_queue.dropped, {"interrupted": 1})
+        self.assertEqual(len(playback_queue), 1)
+        playback_queue.drop(reason="test-reason")
+        self.assertEqual(playback_queue.dropped, {"interrupted": 1, "test-reason": 1})
+        self.assertEqual(len(playback_queue), 0)
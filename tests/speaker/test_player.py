@@ -0,0 +1,224 @@
+import os
+from unittest import TestCase, mock
+
+from katia.speaker.player import (ChannelPool, GaplessPlayer, PCMPlayer,
+                                  audio_file)
+
+
+class GaplessPlayerTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(
+            os.environ, {"SPEAKER_PLAYBACK_POLL_INTERVAL_IN_SECONDS": "0.1"}
+        ):
+            player = GaplessPlayer(output_format="ogg_vorbis")
+            self.assertEqual(player.output_format, "ogg_vorbis")
+            self.assertEqual(player.poll_interval_in_seconds, 0.1)
+
+    def test_play(self):
+        test_data_list = [
+            ([False, False, False], [b"a", None, b"b"], 2, 0, 1),
+            ([False, True, True, True], [b"a", b"b"], 1, 1, 1),
+            ([], [None], 0, 0, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.player.mixer"
+            ) as mock_mixer:
+                (
+                    get_busy,
+                    audios,
+                    mock_load_call_count,
+                    mock_queue_call_count,
+                    on_start_call_count,
+                ) = test_data
+                mock_mixer.music.get_busy.side_effect = get_busy + [False] * 5
+                mock_mixer.music.get_pos.side_effect = [10, 20, 0, 5, 10]
+                on_start = mock.MagicMock()
+                stopped = mock.MagicMock()
+                stopped.is_set.return_value = False
+                stopped.wait.return_value = False
+                self.assertTrue(
+                    GaplessPlayer().play(
+                        audios=audios, stopped=stopped, on_start=on_start
+                    )
+                )
+                self.assertEqual(mock_mixer.music.load.call_count, mock_load_call_count)
+                self.assertEqual(mock_mixer.music.play.call_count, mock_load_call_count)
+                self.assertEqual(
+                    mock_mixer.music.queue.call_count, mock_queue_call_count
+                )
+                self.assertEqual(on_start.call_count, on_start_call_count)
+                if mock_queue_call_count:
+                    audio, namehint = mock_mixer.music.queue.call_args.args
+                    self.assertEqual(audio.getvalue(), b"b")
+                    self.assertEqual(namehint, "mp3")
+
+    def test_play_stopped(self):
+        test_data_list = [
+            ([False], [False, True], [], [b"a", b"b"], 0),
+            ([False, True], [False, False], [True], [b"a", b"b"], 1),
+            ([False, True], [False], [True], [b"a"], 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.player.mixer"
+            ) as mock_mixer:
+                (
+                    get_busy,
+                    is_set,
+                    wait,
+                    audios,
+                    mock_stop_call_count,
+                ) = test_data
+                mock_mixer.music.get_busy.side_effect = get_busy + [True] * 5
+                mock_mixer.music.get_pos.return_value = 10
+                stopped = mock.MagicMock()
+                stopped.is_set.side_effect = is_set
+                stopped.wait.side_effect = wait
+                self.assertFalse(GaplessPlayer().play(audios=audios, stopped=stopped))
+                self.assertEqual(mock_mixer.music.load.call_count, 1)
+                self.assertEqual(mock_mixer.music.stop.call_count, mock_stop_call_count)
+
+    def test_stop(self):
+        test_data_list = [(True, 1), (False, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.player.mixer"
+            ) as mock_mixer:
+                playing, mock_stop_call_count = test_data
+                player = GaplessPlayer()
+                other_player = GaplessPlayer()
+                GaplessPlayer.playing = player if playing else other_player
+                try:
+                    player.stop()
+                finally:
+                    GaplessPlayer.playing = None
+                # The reproduction of other speaker is not stopped
+                self.assertEqual(mock_mixer.music.stop.call_count, mock_stop_call_count)
+
+    def test_play_waits_for_other_player(self):
+        with mock.patch("katia.speaker.player.mixer") as mock_mixer:
+            mock_mixer.music.get_busy.return_value = False
+            player = GaplessPlayer()
+            player.poll_interval_in_seconds = 0.01
+            stopped = mock.MagicMock()
+            stopped.is_set.side_effect = [False, True]
+            with GaplessPlayer.music_lock:
+                self.assertFalse(player.play(audios=[b"a"], stopped=stopped))
+            self.assertEqual(mock_mixer.music.load.call_count, 0)
+            stopped = mock.MagicMock()
+            stopped.is_set.return_value = False
+            self.assertTrue(player.play(audios=[b"a"], stopped=stopped))
+            self.assertEqual(mock_mixer.music.load.call_count, 1)
+            self.assertIsNone(GaplessPlayer.playing)
+
+
+class PCMPlayerTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(os.environ, {"SPEAKER_PCM_CHUNK_IN_MS": "100"}):
+            player = PCMPlayer(sample_rate=8000)
+            self.assertEqual(player.sample_rate, 8000)
+            self.assertEqual(player.chunk_size, 1600)
+
+    def test_play(self):
+        test_data_list = [
+            ([False, False], [None, b"abcde"], [b"ab", b"cd"], 0, 1),
+            ([False, True, True, True, False], [b"abcd"], [b"ab"], 1, 1),
+            ([], [None], [], 0, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.player.mixer"
+            ) as mock_mixer:
+                (
+                    get_busy,
+                    audios,
+                    played,
+                    mock_queue_call_count,
+                    on_start_call_count,
+                ) = test_data
+                mock_mixer.get_num_channels.return_value = 8
+                mock_channel = mock_mixer.Channel()
+                mock_channel.get_busy.side_effect = get_busy + [False] * 5
+                mock_channel.get_queue.side_effect = [mock.MagicMock(), None]
+                mock_mixer.Sound.side_effect = lambda buffer: buffer
+                on_start = mock.MagicMock()
+                stopped = mock.MagicMock()
+                stopped.is_set.return_value = False
+                stopped.wait.return_value = False
+                player = PCMPlayer(sample_rate=10)
+                player.chunk_size = 2
+                self.assertTrue(
+                    player.play(audios=audios, stopped=stopped, on_start=on_start)
+                )
+                self.assertEqual(
+                    [call.args[0] for call in mock_channel.play.call_args_list], played
+                )
+                self.assertEqual(mock_channel.queue.call_count, mock_queue_call_count)
+                if mock_queue_call_count:
+                    self.assertEqual(mock_channel.queue.call_args, mock.call(b"cd"))
+                self.assertEqual(on_start.call_count, on_start_call_count)
+
+    def test_play_stopped(self):
+        test_data_list = [
+            ([False], [False, True], [], 0),
+            ([False, True, True], [False, False], [True], 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.player.mixer"
+            ) as mock_mixer:
+                get_busy, is_set, wait, mock_stop_call_count = test_data
+                mock_mixer.get_num_channels.return_value = 8
+                mock_channel = mock_mixer.Channel()
+                mock_channel.get_busy.side_effect = get_busy
+                mock_channel.get_queue.return_value = mock.MagicMock()
+                stopped = mock.MagicMock()
+                stopped.is_set.side_effect = is_set
+                stopped.wait.side_effect = wait
+                player = PCMPlayer(sample_rate=10)
+                player.chunk_size = 2
+                self.assertFalse(player.play(audios=[b"abcd"], stopped=stopped))
+                self.assertEqual(mock_channel.play.call_count, 1)
+                self.assertEqual(mock_channel.stop.call_count, mock_stop_call_count)
+
+    def test_stop_and_close(self):
+        with mock.patch("katia.speaker.player.mixer") as mock_mixer, mock.patch(
+            "katia.speaker.player.channel_pool"
+        ) as mock_channel_pool:
+            mock_channel_pool.acquire.return_value = 3
+            player = PCMPlayer(sample_rate=10)
+            player.stop()
+            self.assertEqual(mock_mixer.Channel().stop.call_count, 0)
+            stopped = mock.MagicMock()
+            stopped.is_set.return_value = True
+            player.play(audios=[b"ab"], stopped=stopped)
+            self.assertEqual(mock_mixer.Channel.call_args, mock.call(3))
+            player.stop()
+            # Only the channel of the player is stopped
+            self.assertEqual(mock_mixer.Channel().stop.call_count, 1)
+            self.assertEqual(mock_mixer.stop.call_count, 0)
+            player.close()
+            self.assertEqual(mock_channel_pool.release.call_args, mock.call(3))
+            self.assertIsNone(player.channel)
+
+
+class ChannelPoolTestCase(TestCase):
+    def test_acquire_and_release(self):
+        with mock.patch("katia.speaker.player.mixer") as mock_mixer:
+            mock_mixer.get_num_channels.return_value = 1
+            channel_pool = ChannelPool()
+            self.assertEqual(channel_pool.acquire(), 0)
+            self.assertEqual(channel_pool.acquire(), 1)
+            self.assertEqual(mock_mixer.set_num_channels.call_args, mock.call(2))
+            self.assertEqual(mock_mixer.set_reserved.call_args, mock.call(2))
+            channel_pool.release(0)
+            self.assertEqual(channel_pool.acquire(), 0)
+            self.assertEqual(mock_mixer.set_reserved.call_count, 2)
+
+
+class AudioFileTestCase(TestCase):
+    def test_audio_file(self):
+        self.assertEqual(audio_file(b"test-audio").read(), b"test-audio")
+        file = mock.MagicMock()
+        self.assertEqual(audio_file(file), file)
@@ -1,14 +1,24 @@
 import os
-from logging import Logger, getLogger
+from logging import Logger
 from unittest import TestCase, mock
 
 import freezegun
 from botocore.exceptions import BotoCoreError
 
 from katia.speaker import KatiaSpeaker
+from katia.speaker.backends import TTSError
+from katia.speaker.playback_queue import PlaybackQueue
+from katia.speaker.speaker import QUEUE_DEPTH
+from katia.speaker.stream import StreamingAudio
+from katia.speaker.synthesis import SynthesisService
+from katia.state import SpeakingState
 
 
 class KatiaSpeakerTestCase(TestCase):
+    def setUp(self):
+        # Each test must create its own backends with its mocks
+        SynthesisService.shared_service = None
+
     @staticmethod
     def deactivate_speaker(speaker_to_deactivate: KatiaSpeaker, data_to_return: dict):
         speaker_to_deactivate.deactivate()
@@ -21,24 +31,30 @@ class KatiaSpeakerTestCase(TestCase):
                 "AWS_PROFILE_NAME": "test-profile",
                 "AWS_VOICE_NAME": "test-voice-name",
             },
-        ), mock.patch("katia.speaker.speaker.Session") as mock_session, mock.patch(
+        ), mock.patch("katia.speaker.backends.Session") as mock_session, mock.patch(
             "katia.speaker.speaker.mixer"
         ) as mock_mixer, mock.patch(
             "katia.speaker.speaker.KatiaConsumer"
         ) as mock_consumer, mock.patch(
             "katia.speaker.speaker.KatiaProducer"
-        ) as mock_producer:
+        ) as mock_producer, mock.patch(
+            "katia.speaker.speaker.KatiaSubscriber"
+        ) as mock_subscriber:
             speaker = KatiaSpeaker(owner_uuid="test-uuid")
             self.assertEqual(speaker.profile_name, "test-profile")
             self.assertEqual(speaker.voice, "test-voice-name")
+            self.assertEqual(speaker.output_format, "ogg_vorbis")
+            self.assertTrue(speaker.streaming)
             self.assertEqual(mock_session.call_count, 1)
             self.assertEqual(
                 mock_session.call_args, mock.call(profile_name="test-profile")
             )
             self.assertEqual(mock_session().client.call_count, 1)
-            self.assertEqual(mock_session().client.call_args, mock.call("polly"))
+            self.assertEqual(mock_session().client.call_args.args, ("polly",))
+            self.assertEqual(speaker.synthesis_service, SynthesisService.shared())
             self.assertEqual(mock_mixer.init.call_count, 1)
-            self.assertEqual(mock_mixer.set_num_channels.call_count, 1)
+            # The music mixer is used, so no channel is reserved
+            self.assertEqual(mock_mixer.set_num_channels.call_count, 0)
             self.assertEqual(mock_consumer.call_count, 2)
             self.assertEqual(
                 mock_consumer.call_args_list,
@@ -49,6 +65,14 @@ class KatiaSpeakerTestCase(TestCase):
                     ),
                 ],
             )
+            self.assertEqual(mock_subscriber.call_count, 2)
+            self.assertEqual(
+                mock_subscriber.call_args_list,
+                [
+                    mock.call(consumer=mock_consumer(), callback=speaker.enqueue),
+                    mock.call(consumer=mock_consumer(), callback=speaker.stop),
+                ],
+            )
             self.assertEqual(mock_producer.call_count, 1)
             self.assertEqual(
                 mock_producer.call_args,
@@ -58,175 +82,724 @@ class KatiaSpeakerTestCase(TestCase):
                 ),
             )
 
+    def test_init_output_format(self):
+        test_data_list = [
+            ("mp3", "True", False, "GaplessPlayer", mock.call(buffer=512)),
+            ("ogg_vorbis", "False", False, "GaplessPlayer", mock.call(buffer=512)),
+            (
+                "pcm",
+                "True",
+                True,
+                "PCMPlayer",
+                mock.call(
+                    frequency=8000, size=-16, channels=1, buffer=512, allowedchanges=0
+                ),
+            ),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer") as mock_mixer, mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch(
+                "katia.speaker.speaker.KatiaProducer"
+            ), mock.patch.dict(
+                os.environ,
+                {
+                    "SPEAKER_OUTPUT_FORMAT": test_data[0],
+                    "SPEAKER_STREAMING": test_data[1],
+                    "SPEAKER_PCM_SAMPLE_RATE": "8000",
+                },
+            ):
+                _, _, streaming, player_class, mock_mixer_init_call_args = test_data
+                mock_mixer.get_init.return_value = (8000, -16, 1)
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                self.assertEqual(speaker.streaming, streaming)
+                self.assertEqual(type(speaker.player).__name__, player_class)
+                self.assertEqual(mock_mixer.init.call_args, mock_mixer_init_call_args)
+
+    def test_init_pcm_mixer_format(self):
+        with mock.patch("katia.speaker.speaker.mixer") as mock_mixer, mock.patch(
+            "katia.speaker.speaker.KatiaConsumer"
+        ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch.dict(
+            os.environ, {"SPEAKER_BACKEND": "fake"}
+        ):
+            # The mixer was initialized before with other format
+            mock_mixer.get_init.return_value = (44100, -16, 2)
+            with self.assertRaises(ValueError):
+                KatiaSpeaker(owner_uuid="test-uuid")
+
+    def test_init_backend(self):
+        with mock.patch("katia.speaker.speaker.mixer") as mock_mixer, mock.patch(
+            "katia.speaker.speaker.KatiaConsumer"
+        ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch.dict(
+            os.environ, {"SPEAKER_BACKEND": "fake", "SPEAKER_OUTPUT_FORMAT": "mp3"}
+        ):
+            mock_mixer.get_init.return_value = (16000, -16, 1)
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            self.assertEqual(speaker.backend.name, "fake")
+            self.assertEqual(speaker.output_format, "pcm")
+            self.assertEqual(mock_mixer.init.call_args.kwargs["frequency"], 16000)
+            speaker.cache = None
+            self.assertEqual(len(speaker.synthesize("test").getvalue()), 7680)
+            self.assertEqual(speaker.backend.requests, 1)
+
     def test_run(self):
+        test_data_list = [
+            ("True", 1),
+            ("False", 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch(
+                "katia.speaker.speaker.KatiaProducer"
+            ), mock.patch.object(
+                KatiaSpeaker, "speak"
+            ) as mock_speak, mock.patch("katia.speaker.backends.Session"), mock.patch(
+                "katia.speaker.speaker.mixer"
+            ), mock.patch.object(
+                KatiaSpeaker, "prewarm_cache"
+            ) as mock_prewarm_cache, mock.patch(
+                "katia.speaker.speaker.KatiaSubscriber"
+            ) as mock_subscriber, mock.patch.dict(
+                os.environ, {"SPEAKER_CACHE": test_data[0]}
+            ):
+                _, mock_prewarm_cache_call_count = test_data
+                speaker = KatiaSpeaker(
+                    owner_uuid="test-uuid",
+                )
+                speaker.start()
+                speaker.join()
+                self.assertEqual(mock_speak.call_count, 1)
+                self.assertEqual(mock_subscriber().start.call_count, 2)
+                self.assertEqual(speaker.producer_last_speaking.close.call_count, 1)
+                self.assertEqual(
+                    mock_prewarm_cache.call_count, mock_prewarm_cache_call_count
+                )
+
+    def test_synthesize(self):
+        test_data_list = [
+            (b"cached-audio", {"AudioStream": mock.MagicMock()}, b"cached-audio", 0, 0),
+            (None, {"AudioStream": mock.MagicMock()}, b"test-audio", 1, 1),
+            (None, {"Not-AudioStream": None}, None, 1, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ) as mock_session, mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.TTSCache"
+            ) as mock_cache, mock.patch.dict(
+                os.environ,
+                {"AWS_VOICE_NAME": "test-voice-name", "SPEAKER_OUTPUT_FORMAT": "mp3"},
+            ):
+                (
+                    cached,
+                    response,
+                    expected,
+                    mock_synthesize_speech_call_count,
+                    mock_cache_set_call_count,
+                ) = test_data
+                mock_cache().get.return_value = cached
+                mock_cache.key.return_value = "test-key"
+                if "AudioStream" in response:
+                    response["AudioStream"].read.return_value = b"test-audio"
+                mock_session().client().synthesize_speech.return_value = response
+                speaker = KatiaSpeaker(
+                    owner_uuid="test-uuid", synthesis_service=SynthesisService()
+                )
+                self.assertEqual(speaker.synthesize("test-message"), expected)
+                self.assertEqual(
+                    mock_cache.key.call_args,
+                    mock.call(
+                        text="test-message",
+                        voice="test-voice-name",
+                        engine="neural",
+                        output_format="mp3",
+                    ),
+                )
+                self.assertEqual(
+                    mock_session().client().synthesize_speech.call_count,
+                    mock_synthesize_speech_call_count,
+                )
+                self.assertEqual(mock_cache().set.call_count, mock_cache_set_call_count)
+                if mock_cache_set_call_count:
+                    self.assertEqual(
+                        mock_cache().set.call_args,
+                        mock.call(key="test-key", audio=b"test-audio"),
+                    )
+
+    def test_synthesize_pcm(self):
         with mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
             "katia.speaker.speaker.KatiaProducer"
-        ), mock.patch.object(
-            KatiaSpeaker, "speak"
-        ) as mock_speak, mock.patch("katia.speaker.speaker.Session"), mock.patch(
+        ), mock.patch("katia.speaker.backends.Session") as mock_session, mock.patch(
             "katia.speaker.speaker.mixer"
+        ) as mock_mixer, mock.patch(
+            "katia.speaker.speaker.TTSCache"
+        ) as mock_cache, mock.patch.dict(
+            os.environ,
+            {
+                "AWS_VOICE_NAME": "test-voice-name",
+                "SPEAKER_OUTPUT_FORMAT": "pcm",
+                "SPEAKER_STREAMING": "False",
+            },
         ):
-            speaker = KatiaSpeaker(
-                owner_uuid="test-uuid",
+            mock_mixer.get_init.return_value = (16000, -16, 1)
+            mock_cache().get.return_value = None
+            response = {"AudioStream": mock.MagicMock()}
+            response["AudioStream"].read.return_value = b"test-audio"
+            mock_session().client().synthesize_speech.return_value = response
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            self.assertEqual(speaker.synthesize("test-message"), b"test-audio")
+            self.assertEqual(
+                mock_cache.key.call_args.kwargs["output_format"], "pcm-16000"
+            )
+            self.assertEqual(
+                mock_session().client().synthesize_speech.call_args,
+                mock.call(
+                    Text="test-message",
+                    OutputFormat="pcm",
+                    VoiceId="test-voice-name",
+                    Engine="neural",
+                    SampleRate="16000",
+                ),
             )
-            speaker.start()
-        self.assertEqual(mock_speak.call_count, 1)
 
-    def test_speak_message(self):
-        def stop_waiting(mock_to_change):
-            mock_to_change.return_value = False
+    def test_start_speaking(self):
+        with mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
+            "katia.speaker.speaker.KatiaProducer"
+        ), mock.patch("katia.speaker.backends.Session"), mock.patch(
+            "katia.speaker.speaker.mixer"
+        ), mock.patch(
+            "katia.speaker.speaker.time.monotonic"
+        ) as mock_monotonic, mock.patch.object(
+            KatiaSpeaker, "send_speaking_state"
+        ) as mock_send_speaking_state:
+            mock_monotonic.return_value = 10.25
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            speaker.start_speaking(started_at=10)
+            self.assertEqual(speaker.time_to_first_sample, 0.25)
+            self.assertEqual(mock_send_speaking_state.call_args, mock.call(speaking=True))
 
+    def test_synthesize_streaming(self):
         test_data_list = [
-            ({"AudioStream": mock.MagicMock()}, 1, True, True, 1),
-            ({"AudioStream": mock.MagicMock()}, 1, False, True, 0),
-            ({"AudioStream": mock.MagicMock()}, 1, True, False, 0),
-            ({"AudioStream": mock.MagicMock()}, 1, False, False, 0),
-            ({"Not-AudioStream": None}, 0, True, True, 0),
+            ("True", 1),
+            ("False", 0),
         ]
         for test_data in test_data_list:
-            with mock.patch.dict(
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ) as mock_session, mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.TTSCache"
+            ) as mock_cache, mock.patch.dict(
+                os.environ, {"SPEAKER_CACHE": test_data[0]}
+            ):
+                _, mock_cache_set_call_count = test_data
+                mock_cache().get.return_value = None
+                mock_cache.key.return_value = "test-key"
+                stream = mock.MagicMock()
+                stream.read.side_effect = [b"test-", b"audio", b""]
+                mock_session().client().synthesize_speech.return_value = {
+                    "AudioStream": stream
+                }
+                speaker = KatiaSpeaker(
+                    owner_uuid="test-uuid", synthesis_service=SynthesisService()
+                )
+                audio = speaker.synthesize("test-message")
+                self.assertIsInstance(audio, StreamingAudio)
+                self.assertEqual(audio.getvalue(), b"test-audio")
+                self.assertEqual(
+                    mock_session().client().synthesize_speech.call_args.kwargs[
+                        "OutputFormat"
+                    ],
+                    "ogg_vorbis",
+                )
+                self.assertEqual(mock_cache().set.call_count, mock_cache_set_call_count)
+                if mock_cache_set_call_count:
+                    self.assertEqual(
+                        mock_cache().set.call_args,
+                        mock.call(key="test-key", audio=b"test-audio"),
+                    )
+
+    def test_prewarm_cache(self):
+        test_data_list = [
+            # The phrases are not translated to english
+            ("en-US", None, 0, 0, "True", 6),
+            ("es-ES", None, 5, 0, "True", 6),
+            ("en-US", BotoCoreError(), 0, 6, "True", 6),
+            ("en-US", None, 0, 0, "False", 3),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.Translator"
+            ) as mock_translator, mock.patch.object(
+                KatiaSpeaker, "synthesize"
+            ) as mock_synthesize, mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error, mock.patch.dict(
                 os.environ,
                 {
-                    "AWS_VOICE_NAME": "test-voice-name",
+                    "KATIA_LANGUAGE": test_data[0],
+                    "SPEAKER_CACHE_PREWARM_PHRASES": "['test-phrase']",
+                    "SPEAKER_FILLER": test_data[4],
                 },
-            ), mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
-                "katia.speaker.speaker.KatiaProducer"
+            ):
+                (
+                    _,
+                    synthesize_side_effect,
+                    mock_translate_call_count,
+                    mock_logger_error_call_count,
+                    _,
+                    mock_synthesize_call_count,
+                ) = test_data
+                mock_synthesize.side_effect = synthesize_side_effect
+                mock_translate = mock.MagicMock()
+                mock_translate.text = "test-translation"
+                mock_translator().translate.return_value = mock_translate
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.prewarm_cache()
+                self.assertEqual(
+                    mock_translator().translate.call_count, mock_translate_call_count
+                )
+                self.assertEqual(mock_synthesize.call_count, mock_synthesize_call_count)
+                self.assertEqual(mock_synthesize.call_args, mock.call("test-phrase"))
+                self.assertEqual(
+                    mock_logger_error.call_count, mock_logger_error_call_count
+                )
+
+    def test_prewarm_cache_translation_error(self):
+        translation = mock.MagicMock()
+        translation.text = "test-translation"
+        test_data_list = [
+            # Only the phrases that failed are not prewarmed
+            ([ValueError("test-error")] * 8, ["test-phrase"], 3),
+            (
+                [ValueError("test-error")] + [translation] * 7,
+                ["test-translation"] * 4 + ["test-phrase"],
+                1,
+            ),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
             ), mock.patch(
-                "katia.speaker.speaker.Session"
-            ) as mock_session, mock.patch(
                 "katia.speaker.speaker.mixer"
-            ) as mock_mixer, mock.patch.object(
-                KatiaSpeaker, "can_speak", new_callable=mock.PropertyMock
-            ) as mock_can_speak, mock.patch(
-                "katia.speaker.speaker.open"
             ), mock.patch(
-                "time.sleep"
-            ) as mock_sleep, mock.patch.object(
-                getLogger("KatiaSpeaker"), "debug"
-            ) as mock_logger_debug, mock.patch.object(
-                KatiaSpeaker,
-                'send_last_speak'
-            ) as mock_send_last_speak:
+                "katia.speaker.speaker.Translator"
+            ) as mock_translator, mock.patch.object(
+                KatiaSpeaker, "synthesize"
+            ) as mock_synthesize, mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error, mock.patch.dict(
+                os.environ,
+                {
+                    "KATIA_LANGUAGE": "es-ES",
+                    "SPEAKER_CACHE_PREWARM_PHRASES": "['test-phrase']",
+                },
+            ):
+                translate_side_effect, synthesized, mock_logger_error_call_count = (
+                    test_data
+                )
+                mock_translator().translate.side_effect = translate_side_effect
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.prewarm_cache()
+                self.assertEqual(
+                    mock_synthesize.call_args_list,
+                    [mock.call(phrase) for phrase in synthesized],
+                )
+                self.assertEqual(
+                    mock_logger_error.call_count, mock_logger_error_call_count
+                )
+
+    def test_speak_message(self):
+        played = []
+
+        def play(audios, stopped, on_start):
+            for audio in audios:
+                if not played:
+                    on_start()
+                played.append(audio)
+            return not stopped.is_set()
+
+        test_data_list = [
+            (
+                None,
+                "test-message-1. test-message-2",
+                2,
+                2,
+                [b"test-audio-1", b"test-audio-2"],
+            ),
+            (BotoCoreError(), "test-message-1. test-message-2", 1, 1, []),
+            (None, "", 0, 1, []),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.GaplessPlayer"
+            ) as mock_player, mock.patch.object(
+                KatiaSpeaker, "synthesize"
+            ) as mock_synthesize, mock.patch.object(
+                KatiaSpeaker, "send_speaking_state"
+            ) as mock_send_speaking_state:
                 (
-                    response,
-                    mock_mixer_music_load_and_play_call_count,
-                    get_busy,
-                    can_speak,
-                    mock_logger_debug_call_count,
+                    error,
+                    message,
+                    mock_synthesize_call_count,
+                    mock_send_speaking_state_call_count,
+                    expected_played,
                 ) = test_data
-                mock_session().client().synthesize_speech.return_value = response
-                mock_mixer.music.get_busy.return_value = get_busy
-                mock_can_speak.return_value = can_speak
-                mock_sleep.side_effect = lambda _: stop_waiting(mock_can_speak)
+                played.clear()
+                mock_player().poll_interval_in_seconds = 0.01
+                mock_synthesize.side_effect = error or (
+                    lambda sentence: sentence.replace("message", "audio")
+                    .rstrip(".")
+                    .encode()
+                )
+                mock_player().play.side_effect = play
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                if error:
+                    with self.assertRaises(BotoCoreError):
+                        speaker.speak_message(message)
+                else:
+                    speaker.speak_message(message)
+                self.assertLessEqual(mock_synthesize.call_count, 2)
+                self.assertEqual(
+                    mock_synthesize.call_args_list[:mock_synthesize_call_count],
+                    [
+                        mock.call("test-message-1."),
+                        mock.call("test-message-2"),
+                    ][:mock_synthesize_call_count],
+                )
+                self.assertEqual(played, expected_played)
+                self.assertEqual(
+                    mock_send_speaking_state.call_count,
+                    mock_send_speaking_state_call_count,
+                )
+                self.assertEqual(
+                    mock_send_speaking_state.call_args, mock.call(speaking=False)
+                )
+
+    def test_synthesized(self):
+        with mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
+            "katia.speaker.speaker.KatiaProducer"
+        ), mock.patch("katia.speaker.backends.Session"), mock.patch(
+            "katia.speaker.speaker.mixer"
+        ):
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            speaker.player.poll_interval_in_seconds = 0.01
+            done = mock.MagicMock()
+            done.result.return_value = b"test-audio"
+            not_done = mock.MagicMock()
+            not_done.done.return_value = False
+            self.assertEqual(list(speaker.synthesized([done, done])), [b"test-audio"] * 2)
+            speaker.stopped.set()
+            self.assertEqual(list(speaker.synthesized([done, not_done])), [b"test-audio"])
+            self.assertEqual(not_done.result.call_count, 0)
+
+    def test_stop(self):
+        test_data_list = [
+            ({"source": "recognizer"}, 1, None),
+            ({"source": "recognizer", "requested_at": 9.95}, 1, 0.05),
+            ({"source": "not-recognizer"}, 0, None),
+            ({"not-source": "recognizer"}, 0, None),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.backends.Session"), mock.patch(
+                "katia.speaker.speaker.mixer"
+            ), mock.patch(
+                "katia.speaker.speaker.GaplessPlayer"
+            ) as mock_player, mock.patch(
+                "katia.speaker.speaker.time.time"
+            ) as mock_time:
+                data, mock_player_stop_call_count, stop_latency = test_data
+                mock_time.return_value = 10
                 speaker = KatiaSpeaker(
                     owner_uuid="test-uuid",
                 )
-                speaker.speak_message("test-message")
-                self.assertEqual(mock_session().client().synthesize_speech.call_count, 1)
+                self.assertTrue(speaker.can_speak)
+                speaker.playback_queue.put({"message": "test-answer"})
+                speaker.stop(data)
+                self.assertEqual(speaker.can_speak, not mock_player_stop_call_count)
                 self.assertEqual(
-                    mock_session().client().synthesize_speech.call_args,
-                    mock.call(
-                        Text="test-message",
-                        OutputFormat="mp3",
-                        VoiceId="test-voice-name",
-                        Engine="neural",
-                    ),
+                    mock_player().stop.call_count, mock_player_stop_call_count
+                )
+                self.assertAlmostEqual(speaker.stop_latency, stop_latency)
+                self.assertEqual(
+                    speaker.playback_queue.dropped["interrupted"],
+                    mock_player_stop_call_count,
+                )
+
+    def test_enqueue(self):
+        test_data_list = [
+            ({"source": "interpreter", "message": "test-message"}, 1),
+            ({"source": "not-interpreter", "message": "test-message"}, 0),
+            ({"message": "test-message"}, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"):
+                data, queued = test_data
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.enqueue(data)
+                self.assertEqual(len(speaker.playback_queue), queued)
+
+    def test_enqueue_thinking(self):
+        test_data_list = [("True", 1), ("False", 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.Timer"
+            ) as mock_timer, mock.patch.dict(
+                os.environ,
+                {"SPEAKER_FILLER": test_data[0], "SPEAKER_FILLER_DELAY_IN_SECONDS": "2"},
+            ):
+                _, mock_timer_call_count = test_data
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.enqueue({"source": "interpreter", "state": "thinking"})
+                self.assertEqual(len(speaker.playback_queue), 0)
+                self.assertEqual(mock_timer.call_count, mock_timer_call_count)
+                if mock_timer_call_count:
+                    self.assertEqual(
+                        mock_timer.call_args,
+                        mock.call(2.0, speaker.enqueue_filler, args=(1,)),
+                    )
+                    self.assertEqual(mock_timer().start.call_count, 1)
+                    speaker.enqueue({"source": "interpreter", "message": "test-answer"})
+                    self.assertEqual(mock_timer().cancel.call_count, 1)
+                    self.assertIsNone(speaker.filler_timer)
+
+    def test_enqueue_cuts_filler(self):
+        test_data_list = [(PlaybackQueue.FILLER, 1), (PlaybackQueue.ANSWER, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.GaplessPlayer"
+            ) as mock_player:
+                playing_priority, mock_player_stop_call_count = test_data
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.playing_priority = playing_priority
+                speaker.enqueue({"source": "interpreter", "message": "test-answer"})
+                self.assertEqual(
+                    mock_player().stop.call_count, mock_player_stop_call_count
                 )
                 self.assertEqual(
-                    mock_mixer.music.load.call_count,
-                    mock_mixer_music_load_and_play_call_count,
+                    speaker.can_speak, not mock_player_stop_call_count
                 )
+                self.assertEqual(len(speaker.playback_queue), 1)
+
+    def test_enqueue_filler(self):
+        test_data_list = [
+            ("en-US", ["Let me think.", "One moment.", "Give me a second."], 0),
+            ("es-ES", ["test-translation"] * 3, 3),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.Translator"
+            ) as mock_translator, mock.patch.dict(
+                os.environ, {"KATIA_LANGUAGE": test_data[0]}
+            ):
+                _, expected_messages, mock_translate_call_count = test_data
+                mock_translate = mock.MagicMock()
+                mock_translate.text = "test-translation"
+                mock_translator().translate.return_value = mock_translate
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                messages = []
+                for _ in range(4):
+                    speaker.enqueue_filler(speaker.filler_generation)
+                    messages.append(speaker.playback_queue.get(timeout=0))
                 self.assertEqual(
-                    mock_mixer.music.play.call_count,
-                    mock_mixer_music_load_and_play_call_count,
+                    [message["message"] for message in messages],
+                    [*expected_messages, expected_messages[0]],
+                )
+                self.assertTrue(
+                    all(message["priority"] == "filler" for message in messages)
                 )
                 self.assertEqual(
-                    mock_logger_debug.call_count, mock_logger_debug_call_count
+                    mock_translator().translate.call_count, mock_translate_call_count
                 )
-                self.assertEqual(mock_send_last_speak.call_count, 1)
 
-    def test_can_speak(self):
+    def test_enqueue_filler_after_answer(self):
+        test_data_list = [(False, 1), (True, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.Timer"
+            ) as mock_timer:
+                answered, queued = test_data
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.enqueue({"source": "interpreter", "state": "thinking"})
+                if answered:
+                    # The answer arrives while the timer is already running its callback
+                    speaker.cancel_filler()
+                speaker.enqueue_filler(*mock_timer.call_args.kwargs["args"])
+                self.assertEqual(len(speaker.playback_queue), queued)
+
+    def test_speak_skips_filler(self):
         test_data_list = [
-            ({"source": "recognizer"}, 1),
-            ({"source": "not-recognizer"}, 0),
-            (None, 0),
-            ({"not-source": "recognizer"}, 0),
+            ([], 1),
+            ([{"source": "interpreter", "message": "test-answer"}], 0),
         ]
         for test_data in test_data_list:
             with self.subTest(test_data=test_data), mock.patch(
                 "katia.speaker.speaker.KatiaConsumer"
-            ) as mock_consumer, mock.patch("katia.speaker.speaker.Session"), mock.patch(
+            ), mock.patch("katia.speaker.speaker.KatiaProducer"), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch.object(
+                KatiaSpeaker, "wait_until_interpreter"
+            ), mock.patch.object(
+                KatiaSpeaker, "speak_message"
+            ) as mock_speak_message, mock.patch(
                 "katia.speaker.speaker.mixer"
-            ) as mock_mixer:
-                data, mock_mixer_music_stop_call_count = test_data
-                mock_consumer().get_data.return_value = data
-                speaker = KatiaSpeaker(
-                    owner_uuid="test-uuid",
+            ), mock.patch.object(
+                PlaybackQueue, "get"
+            ) as mock_get:
+                waiting, mock_speak_message_call_count = test_data
+                speaker = KatiaSpeaker(owner_uuid="test-uuid")
+                speaker.playback_queue.messages = list(waiting)
+                mock_get.side_effect = lambda timeout: self.deactivate_speaker(
+                    speaker_to_deactivate=speaker,
+                    data_to_return={"message": "test-filler", "priority": "filler"},
                 )
-                self.assertTrue(speaker.can_speak)
+                speaker.speak()
                 self.assertEqual(
-                    mock_mixer.music.stop.call_count, mock_mixer_music_stop_call_count
+                    mock_speak_message.call_count, mock_speak_message_call_count
                 )
+                self.assertIsNone(speaker.playing_priority)
 
     def test_speak(self):
         test_data_list = [
             ({"source": "interpreter", "message": "test-message"}, 1),
-            ({"source": "not-interpreter", "message": "test-message"}, 0),
             (None, 0),
         ]
         for test_data in test_data_list:
             with self.subTest(test_data=test_data), mock.patch(
                 "katia.speaker.speaker.KatiaConsumer"
-            ) as mock_consumer, mock.patch(
+            ), mock.patch(
                 "katia.speaker.speaker.KatiaProducer"
             ), mock.patch(
-                "katia.speaker.speaker.Session"
+                "katia.speaker.backends.Session"
             ), mock.patch.object(
                 KatiaSpeaker, "wait_until_interpreter"
             ) as mock_wait_until_interpreter, mock.patch.object(
                 KatiaSpeaker, "speak_message"
             ) as mock_speak_message, mock.patch(
                 "katia.speaker.speaker.mixer"
-            ):
+            ), mock.patch.object(
+                PlaybackQueue, "get"
+            ) as mock_get:
                 data, mock_speak_message_call_count = test_data
                 speaker = KatiaSpeaker(
                     owner_uuid="test-uuid",
                 )
-                mock_consumer().get_data.side_effect = lambda: self.deactivate_speaker(
+                mock_get.side_effect = lambda timeout: self.deactivate_speaker(
                     speaker_to_deactivate=speaker, data_to_return=data
                 )
                 speaker.speak()
+                self.assertEqual(mock_get.call_args, mock.call(timeout=0.5))
                 self.assertEqual(
                     mock_speak_message.call_count, mock_speak_message_call_count
                 )
                 self.assertEqual(mock_wait_until_interpreter.call_count, 1)
 
-    def test_speak_with_error(self):
-        with mock.patch(
-            "katia.speaker.speaker.KatiaConsumer"
-        ) as mock_consumer, mock.patch(
+    def test_speak_draining(self):
+        with mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
             "katia.speaker.speaker.KatiaProducer"
-        ), mock.patch(
-            "katia.speaker.speaker.Session"
-        ), mock.patch.object(
+        ), mock.patch("katia.speaker.backends.Session"), mock.patch.object(
             KatiaSpeaker, "wait_until_interpreter"
         ), mock.patch.object(
             KatiaSpeaker, "speak_message"
-        ) as mock_speak_message, mock.patch.object(
-            Logger, "error"
-        ) as mock_error, mock.patch(
+        ) as mock_speak_message, mock.patch(
             "katia.speaker.speaker.mixer"
-        ):
-            speaker = KatiaSpeaker(
-                owner_uuid="test-uuid",
-            )
-            mock_consumer().get_data.side_effect = lambda: self.deactivate_speaker(
-                speaker_to_deactivate=speaker,
-                data_to_return={"source": "interpreter", "message": "test-message"},
-            )
-            mock_speak_message.side_effect = BotoCoreError()
+        ), mock.patch(
+            "katia.speaker.speaker.KatiaSubscriber"
+        ) as mock_subscriber:
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            speaker.playback_queue.put({"source": "interpreter", "message": "test"})
+            speaker.drain()
+            self.assertEqual(mock_subscriber().deactivate.call_count, 1)
+            # The messages already received are reproduced before stopping
             speaker.speak()
-            self.assertEqual(mock_error.call_count, 1)
+            self.assertEqual(mock_speak_message.call_args.args[0], "test")
+            self.assertTrue(speaker.active)
+
+    def test_close(self):
+        with mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
+            "katia.speaker.speaker.KatiaProducer"
+        ) as mock_producer, mock.patch("katia.speaker.backends.Session"), mock.patch(
+            "katia.speaker.speaker.mixer"
+        ), mock.patch(
+            "katia.speaker.speaker.KatiaSubscriber"
+        ) as mock_subscriber:
+            mock_subscriber().is_alive.return_value = True
+            speaker = KatiaSpeaker(owner_uuid="test-uuid")
+            self.assertIn(("test-uuid",), QUEUE_DEPTH.values)
+            speaker.close()
+            self.assertNotIn(("test-uuid",), QUEUE_DEPTH.values)
+            self.assertEqual(mock_subscriber().deactivate.call_count, 2)
+            self.assertEqual(mock_subscriber().join.call_count, 2)
+            self.assertEqual(mock_producer().close.call_count, 1)
+
+    def test_speak_with_error(self):
+        test_data_list = [BotoCoreError(), TTSError()]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch(
+                "katia.speaker.speaker.KatiaProducer"
+            ), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch.object(
+                KatiaSpeaker, "wait_until_interpreter"
+            ), mock.patch.object(
+                KatiaSpeaker, "speak_message"
+            ) as mock_speak_message, mock.patch.object(
+                Logger, "error"
+            ) as mock_error, mock.patch(
+                "katia.speaker.speaker.mixer"
+            ), mock.patch.object(
+                PlaybackQueue, "get"
+            ) as mock_get:
+                speaker = KatiaSpeaker(
+                    owner_uuid="test-uuid",
+                )
+                mock_get.side_effect = lambda timeout: self.deactivate_speaker(
+                    speaker_to_deactivate=speaker,
+                    data_to_return={"source": "interpreter", "message": "test-message"},
+                )
+                mock_speak_message.side_effect = test_data
+                speaker.speak()
+                self.assertEqual(mock_error.call_count, 1)
 
     def test_wait_until_interpreter(self):
         test_data_list = [
@@ -237,7 +810,7 @@ class KatiaSpeakerTestCase(TestCase):
             ("es-ES", "test-translation"),
         ]
         for test_data in test_data_list:
-            with mock.patch("katia.speaker.speaker.Session"), self.subTest(
+            with mock.patch("katia.speaker.backends.Session"), self.subTest(
                 test_data=test_data
             ), mock.patch("katia.speaker.speaker.KatiaConsumer"), mock.patch(
                 "katia.speaker.speaker.KatiaProducer"
@@ -266,25 +839,34 @@ class KatiaSpeakerTestCase(TestCase):
                     mock_speak_message.call_args, mock.call(message=expected_value)
                 )
 
-    def test_send_last_speak(self):
-        with mock.patch("katia.speaker.speaker.Session"), mock.patch(
-            "katia.speaker.speaker.mixer"
-        ), mock.patch(
-            "katia.speaker.speaker.KatiaConsumer"
-        ), mock.patch(
-            "katia.speaker.speaker.KatiaProducer"
-        ) as mock_producer, freezegun.freeze_time("1994-08-08 14:30:00"):
-            speaker = KatiaSpeaker(
-                owner_uuid="test-uuid",
-            )
-            speaker.send_last_speak()
-            self.assertEqual(mock_producer().send_message.call_count, 1)
-            self.assertEqual(
-                mock_producer().send_message.call_args,
-                mock.call(
-                    message_data={
-                        "source": "speaker",
-                        "message": "1994-08-08T14:30:00"
-                    }
-                ),
-            )
+    def test_send_speaking_state(self):
+        test_data_list = [
+            (True, "started"),
+            (False, "stopped"),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.speaker.backends.Session"
+            ), mock.patch("katia.speaker.speaker.mixer"), mock.patch(
+                "katia.speaker.speaker.KatiaConsumer"
+            ), mock.patch(
+                "katia.speaker.speaker.KatiaProducer"
+            ) as mock_producer, freezegun.freeze_time("1994-08-08 14:30:00"):
+                speaking, expected_state = test_data
+                speaking_state = SpeakingState()
+                speaker = KatiaSpeaker(
+                    owner_uuid="test-uuid", speaking_state=speaking_state
+                )
+                speaker.send_speaking_state(speaking=speaking)
+                self.assertEqual(speaking_state.speaking, speaking)
+                self.assertEqual(mock_producer().send_message.call_count, 1)
+                self.assertEqual(
+                    mock_producer().send_message.call_args,
+                    mock.call(
+                        message_data={
+                            "source": "speaker",
+                            "state": expected_state,
+                            "message": "1994-08-08T14:30:00"
+                        }
+                    ),
+                )
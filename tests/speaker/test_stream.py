@@ -0,0 +1,52 @@
+import os
+from unittest import TestCase, mock
+
+from botocore.exceptions import BotoCoreError
+
+from katia.speaker.stream import StreamingAudio
+
+
+class StreamingAudioTestCase(TestCase):
+    def test_download(self):
+        test_data_list = [
+            ([b"test-", b"audio", b""], b"test-audio", 1),
+            ([b"test-", BotoCoreError()], b"test-", 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                chunks, expected, on_complete_call_count = test_data
+                stream = mock.MagicMock()
+                stream.read.side_effect = chunks
+                on_complete = mock.MagicMock()
+                audio = StreamingAudio(stream=stream, on_complete=on_complete)
+                self.assertEqual(audio.getvalue(), expected)
+                self.assertTrue(audio.complete)
+                self.assertEqual(stream.close.call_count, 1)
+                self.assertEqual(on_complete.call_count, on_complete_call_count)
+                if on_complete_call_count:
+                    self.assertEqual(on_complete.call_args, mock.call(expected))
+
+    def test_read_and_seek(self):
+        with mock.patch.dict(os.environ, {"SPEAKER_JITTER_BUFFER_IN_KB": "0"}):
+            stream = mock.MagicMock()
+            stream.read.side_effect = [b"0123", b"456789", b""]
+            audio = StreamingAudio(stream=stream)
+            self.assertEqual(audio.read(2), b"01")
+            self.assertEqual(audio.tell(), 2)
+            self.assertEqual(audio.seek(3, os.SEEK_CUR), 5)
+            self.assertEqual(audio.read(), b"56789")
+            self.assertEqual(audio.seek(-2, os.SEEK_END), 8)
+            self.assertEqual(audio.read(10), b"89")
+            self.assertEqual(audio.seek(1), 1)
+            self.assertEqual(audio.read(1), b"1")
+
+    def test_read_waiting(self):
+        stream = mock.MagicMock()
+        stream.read.return_value = b""
+        audio = StreamingAudio(stream=stream)
+        audio.downloader.join()
+        audio.complete = False
+        audio.buffer = bytearray(b"01")
+        self.assertEqual(audio.seek(0, os.SEEK_END), -1)
+        audio.jitter_buffer_size = 2
+        self.assertEqual(audio.read(1), b"0")
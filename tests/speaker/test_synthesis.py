@@ -0,0 +1,47 @@
+import os
+from unittest import TestCase, mock
+
+from katia.speaker.synthesis import SynthesisService
+
+
+class SynthesisServiceTestCase(TestCase):
+    def tearDown(self):
+        SynthesisService.shared_service = None
+
+    def test_init(self):
+        with mock.patch.dict(os.environ, {"SPEAKER_SYNTHESIS_WORKERS": "3"}):
+            self.assertEqual(SynthesisService().workers, 3)
+            self.assertEqual(SynthesisService(workers=2).workers, 2)
+
+    def test_shared(self):
+        SynthesisService.shared_service = None
+        service = SynthesisService.shared()
+        self.assertIs(SynthesisService.shared(), service)
+
+    def test_backend(self):
+        with mock.patch("katia.speaker.synthesis.get_backend") as mock_get_backend:
+            mock_get_backend.side_effect = lambda **kwargs: mock.MagicMock()
+            service = SynthesisService(workers=2)
+            parameters = {
+                "name": "polly",
+                "profile_name": "test-profile",
+                "voice": "test-voice",
+                "engine": "neural",
+                "language": "en-US",
+            }
+            backend = service.backend(**parameters)
+            self.assertIs(service.backend(**parameters), backend)
+            self.assertIsNot(service.backend(**{**parameters, "voice": "other"}), backend)
+            self.assertEqual(mock_get_backend.call_count, 2)
+            self.assertEqual(
+                mock_get_backend.call_args_list[0],
+                mock.call(**parameters, max_pool_connections=2),
+            )
+
+    def test_submit(self):
+        service = SynthesisService(workers=2)
+        futures = [service.submit(lambda value: value * 2, value) for value in range(5)]
+        self.assertEqual([future.result() for future in futures], [0, 2, 4, 6, 8])
+        service.shutdown()
+        with self.assertRaises(RuntimeError):
+            service.submit(lambda: None)
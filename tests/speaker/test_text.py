@@ -0,0 +1,31 @@
+from unittest import TestCase
+
+from katia.speaker.text import split_sentences, split_text
+
+
+class SplitSentencesTestCase(TestCase):
+    def test_split_sentences(self):
+        test_data_list = [
+            ("", []),
+            ("Hello", ["Hello"]),
+            ("Hello. How are you?", ["Hello.", "How are you?"]),
+            ("¡Hola! ¿Qué tal?  Bien…", ["¡Hola!", "¿Qué tal?", "Bien…"]),
+            ("It costs 3.5 euros.\nThanks", ["It costs 3.5 euros.", "Thanks"]),
+            ("First line\n\n  Second line ", ["First line", "Second line"]),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                text, expected = test_data
+                self.assertEqual(split_sentences(text), expected)
+
+    def test_split_text(self):
+        test_data_list = [
+            ("Hello. How are you?", 20, ["Hello.", "How are you?"]),
+            ("One, two, three. Four", 10, ["One, two,", "three.", "Four"]),
+            ("One two three four", 9, ["One two", "three", "four"]),
+            ("Onetwothree, four", 5, ["Onetw", "othre", "e,", "four"]),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                text, max_length, expected = test_data
+                self.assertEqual(split_text(text, max_length), expected)
@@ -0,0 +1,214 @@
+import os
+import signal
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia import cli
+
+
+class CliTestCase(TestCase):
+    def test_build_component(self):
+        test_data_list = [
+            ("recognizer", "KatiaRecognizer"),
+            ("interpreter", "KatiaInterpreter"),
+            ("speaker", "KatiaSpeaker"),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.dict(
+                os.environ,
+                {
+                    "KATIA_MAIN_NAME": "test-name",
+                    "KATIA_ADJECTIVES": "['test-adjective']",
+                    "KATIA_VALID_NAMES": "['test-name']",
+                },
+            ), mock.patch.object(cli, test_data[1]) as mock_component:
+                component, _ = test_data
+                self.assertEqual(
+                    cli.build_component(component=component, owner_uuids=["test-uuid"]),
+                    mock_component.return_value,
+                )
+                self.assertEqual(
+                    mock_component.call_args.kwargs["owner_uuid"], "test-uuid"
+                )
+
+    def test_build_host(self):
+        with mock.patch.object(cli, "KatiaHost") as mock_host, mock.patch.object(
+            cli.Owner, "create_kafka_topics"
+        ) as mock_create_kafka_topics:
+            cli.build_component(component="host", owner_uuids=["test-1", "test-2"])
+            owners = mock_host.call_args.kwargs["owners"]
+            self.assertEqual([owner.uuid for owner in owners], ["test-1", "test-2"])
+            self.assertFalse(mock_host.call_args.kwargs["start"])
+            self.assertEqual(mock_create_kafka_topics.call_count, 0)
+
+    def test_build_component_with_error(self):
+        test_data_list = [
+            ("speaker", ["test-1", "test-2"]),
+            ("not-component", ["test-uuid"]),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), self.assertRaises(ValueError):
+                component, owner_uuids = test_data
+                cli.build_component(component=component, owner_uuids=owner_uuids)
+
+    def test_set_cpu_affinity(self):
+        with mock.patch("katia.cli.os") as mock_os:
+            cli.set_cpu_affinity([1])
+            self.assertEqual(mock_os.sched_setaffinity.call_args, mock.call(0, [1]))
+        with mock.patch("katia.cli.os", spec=[]), mock.patch.object(
+            Logger, "warning"
+        ) as mock_logger_warning:
+            cli.set_cpu_affinity([1])
+            self.assertEqual(mock_logger_warning.call_count, 1)
+
+    def test_run_component(self):
+        test_data_list = [(True, 0), (False, 1)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.cli.signal.signal"
+            ) as mock_signal, mock.patch.object(Logger, "error"), mock.patch(
+                "katia.cli.shutdown"
+            ) as mock_shutdown:
+                stopped_by_signal, expected_code = test_data
+                mock_shutdown.return_value = []
+                component = mock.MagicMock()
+                component.is_alive.side_effect = [True, False]
+
+                def join(_timeout):
+                    if stopped_by_signal:
+                        handler = mock_signal.call_args.args[1]
+                        handler(signal.SIGTERM, None)
+
+                component.join.side_effect = join
+                self.assertEqual(cli.run_component(component), expected_code)
+                self.assertEqual(component.start.call_count, 1)
+                self.assertEqual(component.deactivate.call_count, 0)
+                self.assertEqual(mock_shutdown.call_count, int(stopped_by_signal))
+                if stopped_by_signal:
+                    self.assertEqual(
+                        mock_shutdown.call_args,
+                        mock.call(components={"component": component}, drain=True),
+                    )
+
+    def test_run_component_stuck(self):
+        with mock.patch("katia.cli.signal.signal") as mock_signal, mock.patch.object(
+            Logger, "error"
+        ), mock.patch("katia.cli.shutdown") as mock_shutdown, mock.patch(
+            "katia.cli.logging.shutdown"
+        ), mock.patch(
+            "katia.cli.os._exit"
+        ) as mock_exit:
+            mock_shutdown.return_value = ["component"]
+            component = mock.MagicMock()
+            component.is_alive.return_value = True
+
+            def join(_timeout):
+                handler = mock_signal.call_args.args[1]
+                handler(signal.SIGTERM, None)
+                # The second signal deactivates the component right away
+                handler(signal.SIGINT, None)
+
+            component.join.side_effect = join
+            cli.run_component(component)
+            self.assertEqual(component.deactivate.call_count, 1)
+            self.assertEqual(mock_exit.call_args, mock.call(1))
+
+    def test_parse_cpus(self):
+        self.assertEqual(cli.parse_cpus("0, 2,"), [0, 2])
+
+    def test_main(self):
+        with mock.patch("katia.cli.load_dotenv"), mock.patch(
+            "katia.cli.setup_logger"
+        ), mock.patch("katia.cli.set_cpu_affinity") as mock_set_cpu_affinity, mock.patch(
+            "katia.cli.build_component"
+        ) as mock_build_component, mock.patch(
+            "katia.cli.run_component"
+        ) as mock_run_component, mock.patch(
+            "katia.cli.start_metrics_server"
+        ) as mock_start_metrics_server, mock.patch(
+            "katia.cli.start_profiling"
+        ) as mock_start_profiling, mock.patch(
+            "katia.cli.start_recorder"
+        ) as mock_start_recorder:
+            mock_run_component.return_value = 0
+            code = cli.main(
+                [
+                    "host",
+                    "--owner-uuid",
+                    "test-1",
+                    "--owner-uuid",
+                    "test-2",
+                    "--cpus",
+                    "3",
+                    "--metrics-port",
+                    "9001",
+                ]
+            )
+            self.assertEqual(mock_start_metrics_server.call_args, mock.call(port=9001))
+            self.assertEqual(mock_start_profiling.call_count, 1)
+            self.assertEqual(mock_start_recorder.call_count, 1)
+            self.assertEqual(code, 0)
+            self.assertEqual(
+                mock_build_component.call_args,
+                mock.call(component="host", owner_uuids=["test-1", "test-2"]),
+            )
+            self.assertEqual(mock_set_cpu_affinity.call_args, mock.call([3]))
+            self.assertEqual(
+                mock_run_component.call_args,
+                mock.call(mock_build_component.return_value),
+            )
+
+    def test_main_replay(self):
+        test_data_list = [(2, 0), (0, 1)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.cli.load_dotenv"
+            ), mock.patch("katia.cli.setup_logger"), mock.patch.object(
+                cli, "SessionReplayer"
+            ) as mock_session_replayer:
+                replayed, expected_code = test_data
+                mock_session_replayer.return_value.replay.return_value = replayed
+                code = cli.main(
+                    ["replay", "recordings", "--speed", "2", "--source", "recognizer"]
+                )
+                self.assertEqual(code, expected_code)
+                self.assertEqual(
+                    mock_session_replayer.call_args,
+                    mock.call(
+                        path="recordings",
+                        speed=2.0,
+                        sources=("recognizer",),
+                        owner_uuid=None,
+                    ),
+                )
+
+    def test_main_supervisor(self):
+        test_data_list = [(None, 1), ("test-uuid", 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.cli.load_dotenv"
+            ), mock.patch("katia.cli.setup_logger"), mock.patch.object(
+                cli, "Supervisor"
+            ) as mock_supervisor, mock.patch.object(
+                cli.Owner, "create_kafka_topics"
+            ) as mock_create_kafka_topics, mock.patch(
+                "katia.cli.start_metrics_server"
+            ):
+                owner_uuid, mock_create_kafka_topics_call_count = test_data
+                mock_supervisor().run.return_value = 0
+                arguments = ["supervisor", "--components", "speaker", "interpreter"]
+                if owner_uuid:
+                    arguments += ["--owner-uuid", owner_uuid]
+                self.assertEqual(cli.main(arguments), 0)
+                self.assertEqual(
+                    mock_supervisor.call_args.kwargs["components"],
+                    ["speaker", "interpreter"],
+                )
+                self.assertEqual(
+                    mock_create_kafka_topics.call_count,
+                    mock_create_kafka_topics_call_count,
+                )
+                if owner_uuid:
+                    self.assertEqual(
+                        mock_supervisor.call_args.kwargs["owner_uuid"], owner_uuid
+                    )
@@ -0,0 +1,201 @@
+import os
+import tracemalloc
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia.host import HOSTED_OWNERS, PENDING_TASKS, HostedOwner, KatiaHost
+from katia.interpreter import KatiaInterpreter
+
+
+class KatiaHostTestCase(TestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch("katia.host.KatiaProducer"),
+            mock.patch("katia.host.KatiaConsumer"),
+            mock.patch("katia.interpreter.interpreter.KatiaProducer"),
+            mock.patch("katia.interpreter.interpreter.KatiaConsumer"),
+            mock.patch.dict(
+                os.environ,
+                {
+                    "OPENAI_KEY": "test-key",
+                    "KATIA_LANGUAGE": "en-US",
+                    "KATIA_MAIN_NAME": "test-name",
+                    "KATIA_HOST_WORKERS": "2",
+                },
+            ),
+        ]
+        self.mock_producer, self.mock_consumer, self.mock_interpreter_producer, (
+            self.mock_interpreter_consumer
+        ), _ = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def get_owner(uuid: str):
+        owner = mock.MagicMock()
+        owner.uuid = uuid
+        return owner
+
+    def test_init(self):
+        test_data_list = [(True, 1), (False, 0)]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                KatiaHost, "start"
+            ) as mock_start, mock.patch.object(KatiaHost, "register") as mock_register:
+                start, mock_start_call_count = test_data
+                owners = [self.get_owner("test-uuid-1"), self.get_owner("test-uuid-2")]
+                host = KatiaHost(owners=owners, start=start)
+                self.assertEqual(host.katia_name, "test-name")
+                self.assertEqual(host.workers, 2)
+                self.assertEqual(host.group_id, "katia-host")
+                self.assertEqual(
+                    self.mock_producer.call_args,
+                    mock.call(topic=None, group_id="katia-host"),
+                )
+                self.assertEqual(
+                    mock_register.call_args_list, [mock.call(owner) for owner in owners]
+                )
+                self.assertEqual(mock_start.call_count, mock_start_call_count)
+
+    def test_register(self):
+        with mock.patch.object(KatiaInterpreter, "ready_to_interpret"):
+            host = KatiaHost(start=False)
+            hosted_owner = host.register(self.get_owner("test-uuid-1"))
+            host.register(self.get_owner("test-uuid-2"))
+            host.executor.shutdown(wait=True)
+            self.assertEqual(
+                list(host.owners),
+                ["user-test-uuid-1-interpreter", "user-test-uuid-2-interpreter"],
+            )
+            self.assertEqual(self.mock_consumer.call_count, 1)
+            self.assertEqual(
+                self.mock_consumer.call_args,
+                mock.call(topic="user-test-uuid-1-interpreter", group_id="katia-host"),
+            )
+            self.assertEqual(
+                self.mock_consumer().subscribe_topics.call_args,
+                mock.call(
+                    ["user-test-uuid-1-interpreter", "user-test-uuid-2-interpreter"]
+                ),
+            )
+            # The hosted interpreters do not create their own kafka clients
+            self.assertEqual(self.mock_interpreter_producer.call_count, 0)
+            self.assertEqual(self.mock_interpreter_consumer.call_count, 0)
+            self.assertIsNone(hosted_owner.interpreter.consumer)
+            self.assertEqual(
+                hosted_owner.interpreter.producer.topic, "user-test-uuid-1-speaker"
+            )
+            self.assertEqual(hosted_owner.interpreter.ready_to_interpret.call_count, 2)
+            self.assertTrue(host.registered.is_set())
+
+    def test_unregister(self):
+        with mock.patch.object(KatiaHost, "schedule"):
+            host = KatiaHost(
+                owners=[self.get_owner("test-uuid-1"), self.get_owner("test-uuid-2")],
+                start=False,
+            )
+            host.unregister("test-uuid-1")
+            self.assertEqual(list(host.owners), ["user-test-uuid-2-interpreter"])
+            self.assertEqual(
+                self.mock_consumer().subscribe_topics.call_args,
+                mock.call(["user-test-uuid-2-interpreter"]),
+            )
+            host.unregister("test-uuid-2")
+            host.unregister("not-registered")
+            self.assertEqual(host.owners, {})
+            self.assertEqual(self.mock_consumer().unsubscribe.call_count, 1)
+
+    def test_dispatch(self):
+        test_data_list = [
+            ("user-test-uuid-interpreter", {"source": "recognizer", "message": "hi"}, 1),
+            ("user-test-uuid-interpreter", {"source": "speaker", "message": "hi"}, 0),
+            ("user-test-uuid-interpreter", {"source": "recognizer"}, 0),
+            ("user-other-interpreter", {"source": "recognizer", "message": "hi"}, 0),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                KatiaHost, "schedule"
+            ) as mock_schedule, mock.patch.object(Logger, "warning"):
+                topic, data, mock_schedule_call_count = test_data
+                host = KatiaHost(owners=[self.get_owner("test-uuid")], start=False)
+                mock_schedule.reset_mock()
+                host.dispatch(topic, data)
+                self.assertEqual(mock_schedule.call_count, mock_schedule_call_count)
+                if mock_schedule_call_count:
+                    task = mock_schedule.call_args.kwargs["task"]
+                    self.assertEqual(task.args, ("hi",))
+
+    def test_serve(self):
+        host = KatiaHost(start=False)
+
+        def get_topic_data():
+            host.deactivate()
+            return "test-topic", {"test": "test"}
+
+        with mock.patch.object(KatiaHost, "dispatch") as mock_dispatch:
+            host.consumer = mock.MagicMock()
+            host.consumer.get_topic_data.side_effect = get_topic_data
+            host.serve()
+            self.assertEqual(
+                mock_dispatch.call_args, mock.call("test-topic", {"test": "test"})
+            )
+
+    def test_drain(self):
+        host = KatiaHost(start=False)
+        host.register(self.get_owner("test-uuid"))
+        host.drain()
+        self.assertFalse(host.active)
+        host.start()
+        host.join(5)
+        self.assertFalse(host.is_alive())
+        # The tasks already scheduled are done before closing the kafka clients
+        self.assertEqual(self.mock_interpreter_producer().send_message.call_count, 0)
+        self.assertEqual(self.mock_producer().send_message.call_count, 1)
+        self.assertEqual(self.mock_consumer().close.call_count, 1)
+        self.assertEqual(self.mock_producer().close.call_count, 1)
+        # The closed host is not reported by the gauges anymore
+        self.assertNotIn((), HOSTED_OWNERS.values)
+        self.assertNotIn((), PENDING_TASKS.values)
+
+    def test_deactivate(self):
+        host = KatiaHost(start=False)
+        hosted_owner = HostedOwner(uuid="test-uuid", interpreter=mock.MagicMock())
+        host.owners["test-topic"] = hosted_owner
+        hosted_owner.pending.append(mock.MagicMock())
+        host.deactivate()
+        self.assertFalse(host.active)
+        self.assertEqual(len(hosted_owner.pending), 0)
+
+    def test_run_tasks_in_order(self):
+        done = []
+        host = KatiaHost(start=False)
+        hosted_owner = HostedOwner(uuid="test-uuid", interpreter=mock.MagicMock())
+        with mock.patch.object(host, "executor") as mock_executor, mock.patch.object(
+            Logger, "error"
+        ) as mock_logger_error:
+            host.schedule(hosted_owner=hosted_owner, task=lambda: done.append(1))
+            host.schedule(hosted_owner=hosted_owner, task=lambda: 1 / 0)
+            host.schedule(hosted_owner=hosted_owner, task=lambda: done.append(2))
+            # Only one worker runs the tasks of the owner
+            self.assertEqual(mock_executor.submit.call_count, 1)
+            host.run_tasks(hosted_owner)
+            self.assertEqual(done, [1, 2])
+            self.assertEqual(mock_logger_error.call_count, 1)
+            self.assertFalse(hosted_owner.scheduled)
+            host.schedule(hosted_owner=hosted_owner, task=lambda: done.append(3))
+            self.assertEqual(mock_executor.submit.call_count, 2)
+
+    def test_owner_overhead(self):
+        with mock.patch.object(KatiaHost, "schedule"):
+            host = KatiaHost(start=False)
+            owners = [self.get_owner(f"test-uuid-{index}") for index in range(100)]
+            tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                for owner in owners:
+                    host.register(owner)
+                after, _ = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            # Each owner must cost kilobytes, not threads and clients
+            self.assertLess((after - before) / len(owners), 16 * 1024)
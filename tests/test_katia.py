@@ -53,6 +53,9 @@ class KatiaTestCase(TestCase):
                             "test-valid-names",
                         ],
                         owner_uuid="test-uuid",
+                        speaking_state=katia.speaking_state,
+                        producer_factory=None,
+                        consumer_factory=None,
                     ),
                 )
                 self.assertEqual(mock_katia_interpreter.call_count, 1)
@@ -64,6 +67,8 @@ class KatiaTestCase(TestCase):
                             "test-adjectives",
                         ],
                         owner_uuid="test-uuid",
+                        producer_factory=None,
+                        consumer_factory=None,
                     ),
                 )
                 self.assertEqual(mock_katia_speaker.call_count, 1)
@@ -71,6 +76,9 @@ class KatiaTestCase(TestCase):
                     mock_katia_speaker.call_args,
                     mock.call(
                         owner_uuid="test-uuid",
+                        speaking_state=katia.speaking_state,
+                        producer_factory=None,
+                        consumer_factory=None,
                     ),
                 )
                 self.assertEqual(mock_start_katia.call_count, mock_start_katia_call_count)
@@ -89,3 +97,62 @@ class KatiaTestCase(TestCase):
             self.assertEqual(mock_katia_recognizer().start.call_count, 1)
             self.assertEqual(mock_katia_interpreter().start.call_count, 1)
             self.assertEqual(mock_katia_speaker().start.call_count, 1)
+
+    def test_stop(self):
+        with mock.patch(
+            "katia.katia.KatiaRecognizer"
+        ) as mock_katia_recognizer, mock.patch(
+            "katia.katia.KatiaInterpreter"
+        ) as mock_katia_interpreter, mock.patch(
+            "katia.katia.KatiaSpeaker"
+        ) as mock_katia_speaker, mock.patch(
+            "katia.katia.shutdown"
+        ) as mock_shutdown:
+            katia = Katia(owner=mock.MagicMock(), start=False)
+            self.assertEqual(katia.stop(timeout=2), mock_shutdown.return_value)
+            self.assertEqual(
+                mock_shutdown.call_args,
+                mock.call(
+                    components={
+                        "recognizer": mock_katia_recognizer(),
+                        "interpreter": mock_katia_interpreter(),
+                        "speaker": mock_katia_speaker(),
+                    },
+                    drain=True,
+                    timeout=2,
+                ),
+            )
+
+    def test_init_error(self):
+        with mock.patch(
+            "katia.katia.KatiaRecognizer"
+        ) as mock_katia_recognizer, mock.patch(
+            "katia.katia.KatiaInterpreter", side_effect=RuntimeError("test-error")
+        ), mock.patch(
+            "katia.katia.KatiaSpeaker"
+        ) as mock_katia_speaker, mock.patch.object(
+            Katia, "start_katia"
+        ) as mock_start_katia:
+            mock_katia_speaker.return_value.close.side_effect = RuntimeError(
+                "test-close-error"
+            )
+            with self.assertRaisesRegex(RuntimeError, "^test-error$"):
+                Katia(owner=mock.MagicMock())
+            self.assertEqual(mock_katia_recognizer().close.call_count, 1)
+            self.assertEqual(mock_katia_speaker().close.call_count, 1)
+            self.assertEqual(mock_start_katia.call_count, 0)
+
+    def test_initialize(self):
+        with mock.patch("katia.katia.startup_timeline") as mock_startup_timeline:
+            component_class = mock.MagicMock()
+            component = Katia.initialize(
+                "test-component", component_class, test_argument="test-value"
+            )
+            self.assertEqual(component, component_class.return_value)
+            self.assertEqual(
+                component_class.call_args, mock.call(test_argument="test-value")
+            )
+            self.assertEqual(
+                mock_startup_timeline.step.call_args,
+                mock.call("test-component initialization"),
+            )
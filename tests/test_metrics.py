@@ -0,0 +1,152 @@
+import os
+import urllib.error
+import urllib.request
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia.metrics import (Counter, Gauge, Histogram, MetricsRegistry,
+                           MetricsServer, format_value, start_metrics_server)
+
+
+class MetricsTestCase(TestCase):
+    def test_counter(self):
+        counter = Counter("test_total", "Test counter", labels=("kind",))
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        counter.inc(kind='b"')
+        self.assertEqual(
+            counter.render(),
+            "# HELP test_total Test counter\n"
+            "# TYPE test_total counter\n"
+            'test_total{kind="a"} 3\n'
+            'test_total{kind="b\\""} 1',
+        )
+        with self.assertRaises(ValueError):
+            counter.inc()
+
+    def test_gauge(self):
+        test_data_list = [
+            (lambda: 5, "test_gauge 5", 0),
+            (lambda: 1 / 0, "# TYPE test_gauge gauge", 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error:
+                function, last_line, mock_logger_error_call_count = test_data
+                gauge = Gauge("test_gauge", "Test gauge")
+                gauge.set(3)
+                self.assertEqual(gauge.render().splitlines()[-1], "test_gauge 3")
+                gauge.set_function(function)
+                self.assertEqual(gauge.render().splitlines()[-1], last_line)
+                self.assertEqual(
+                    mock_logger_error.call_count, mock_logger_error_call_count
+                )
+
+    def test_gauge_remove_function(self):
+        gauge = Gauge("test_gauge", "Test gauge", labels=("owner",))
+        function = mock.MagicMock(return_value=5)
+        other_function = mock.MagicMock(return_value=7)
+        gauge.set_function(function, owner="a")
+        gauge.set_function(other_function, owner="b")
+        gauge.remove_function(function, owner="b")
+        gauge.remove_function(function, owner="a")
+        gauge.remove_function(function, owner="c")
+        self.assertEqual(gauge.render().splitlines()[2:], ['test_gauge{owner="b"} 7'])
+
+    def test_format_value(self):
+        test_data_list = [
+            (3, "3"),
+            (1234567, "1234567"),
+            (1234567.125, "1234567.125"),
+            (0.1, "0.1"),
+            (float("inf"), "+Inf"),
+            (float("-inf"), "-Inf"),
+            (float("nan"), "NaN"),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                value, expected_result = test_data
+                self.assertEqual(format_value(value), expected_result)
+
+    def test_histogram(self):
+        histogram = Histogram("test_seconds", "Test histogram", buckets=(1, 0.1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+        with mock.patch("katia.metrics.time.perf_counter") as mock_perf_counter:
+            mock_perf_counter.side_effect = [10, 10.5]
+            with histogram.time():
+                pass
+        self.assertEqual(
+            histogram.render().splitlines()[2:],
+            [
+                'test_seconds_bucket{le="0.1"} 2',
+                'test_seconds_bucket{le="1"} 3',
+                'test_seconds_bucket{le="+Inf"} 4',
+                "test_seconds_sum 5.65",
+                "test_seconds_count 4",
+            ],
+        )
+
+    def test_registry(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_b_total", "Test counter")
+        self.assertIs(registry.counter("test_b_total", "Test counter"), counter)
+        histogram = registry.histogram("test_a_seconds", "Test histogram")
+        self.assertIsInstance(histogram, Histogram)
+        self.assertIsInstance(registry.gauge("test_c", "Test gauge"), Gauge)
+        with self.assertRaises(ValueError):
+            registry.gauge("test_b_total", "Test gauge")
+        counter.inc()
+        rendered = registry.render()
+        self.assertLess(rendered.index("test_a_seconds"), rendered.index("test_b_total"))
+        self.assertIn("test_b_total 1\n", rendered)
+
+    def test_server(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test counter").inc()
+        server = MetricsServer(host="127.0.0.1", port=0, registry=registry)
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                self.assertEqual(response.status, 200)
+                self.assertIn("text/plain", response.headers["Content-Type"])
+                self.assertEqual(response.read().decode("utf-8"), registry.render())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/not-metrics")
+        finally:
+            server.deactivate()
+
+    def test_start_metrics_server(self):
+        test_data_list = [
+            ({"KATIA_METRICS": "False"}, None, None, 0),
+            ({"KATIA_METRICS": "True", "KATIA_METRICS_PORT": "9000"}, None, 9000, 1),
+            ({"KATIA_METRICS": "False"}, 9001, 9001, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.metrics.MetricsServer"
+            ) as mock_metrics_server:
+                environ, port, expected_port, mock_start_call_count = test_data
+                with mock.patch.dict(os.environ, environ):
+                    server = start_metrics_server(port=port)
+                self.assertEqual(
+                    mock_metrics_server.return_value.start.call_count,
+                    mock_start_call_count,
+                )
+                if expected_port:
+                    self.assertEqual(server, mock_metrics_server.return_value)
+                    self.assertEqual(
+                        mock_metrics_server.call_args.kwargs["port"], expected_port
+                    )
+                else:
+                    self.assertIsNone(server)
+
+    def test_start_metrics_server_port_in_use(self):
+        with mock.patch(
+            "katia.metrics.MetricsServer", side_effect=OSError("in use")
+        ), mock.patch.object(Logger, "error") as mock_logger_error:
+            self.assertIsNone(start_metrics_server(port=9000))
+            self.assertEqual(mock_logger_error.call_count, 1)
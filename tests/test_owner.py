@@ -24,6 +24,10 @@ class OwnerTestCase(TestCase):
                 self.assertEqual(owner.name, "test-owner")
                 self.assertIsNotNone(owner.uuid)
 
+    def test_init_with_uuid(self):
+        owner = Owner(name="test-owner", create_topics=False, owner_uuid="test-uuid")
+        self.assertEqual(owner.uuid, "test-uuid")
+
     def test_create_kafka_topics(self):
         test_data_list = [(None, 1, 0), (Exception(), 1, 1)]
         for test_data in test_data_list:
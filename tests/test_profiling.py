@@ -0,0 +1,102 @@
+import os
+import tempfile
+import tracemalloc
+from threading import Event, Thread
+from unittest import TestCase, mock
+
+from katia.profiling import (NO_SPAN, SPAN_SECONDS, SPANS, Profiler, span,
+                             start_profiling)
+
+
+class SpanTestCase(TestCase):
+    def tearDown(self):
+        SPANS.clear()
+
+    def test_span(self):
+        self.assertIs(span("test.disabled"), NO_SPAN)
+        SPANS.set()
+        with span("test.enabled"):
+            pass
+        samples = {
+            (name, labels): value for name, _, labels, value in SPAN_SECONDS.samples()
+        }
+        self.assertEqual(samples[("katia_span_seconds_count", ("test.enabled",))], 1)
+        self.assertNotIn(("katia_span_seconds_count", ("test.disabled",)), samples)
+
+
+class ProfilerTestCase(TestCase):
+    def test_profiler(self):
+        waiting = Event()
+        thread = Thread(target=waiting.wait, name="TestThread", daemon=True)
+        thread.start()
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(
+                directory=directory,
+                spans=True,
+                sampling=True,
+                allocations=True,
+                interval_in_seconds=0.001,
+                snapshot_interval_in_seconds=0,
+                duration_in_seconds=0.05,
+            )
+            profiler.start()
+            profiler.join(5)
+            waiting.set()
+            self.assertFalse(profiler.is_alive())
+            self.assertFalse(SPANS.is_set())
+            self.assertFalse(tracemalloc.is_tracing())
+            files = os.listdir(directory)
+            self.assertIn(f"{os.getpid()}-TestThread.folded", files)
+            self.assertIn(f"{os.getpid()}-allocations-1.snapshot", files)
+            self.assertNotIn(f"{os.getpid()}-KatiaProfiler.folded", files)
+            with open(
+                os.path.join(directory, f"{os.getpid()}-TestThread.folded"),
+                encoding="utf-8",
+            ) as profile:
+                stack, count = profile.readline().rsplit(" ", maxsplit=1)
+            self.assertIn("wait (threading.py:", stack)
+            self.assertGreater(int(count), 0)
+
+    def test_stop(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(directory=directory, sampling=False)
+            profiler.start()
+            profiler.stop()
+            self.assertFalse(profiler.is_alive())
+            self.assertFalse(SPANS.is_set())
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_start_profiling(self):
+        test_data_list = [
+            ({}, 0),
+            ({"KATIA_PROFILING_SPANS": "True"}, 1),
+            ({"KATIA_PROFILING_SAMPLER": "True"}, 1),
+            ({"KATIA_PROFILING_ALLOCATIONS": "True"}, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.profiling.Profiler"
+            ) as mock_profiler, mock.patch("katia.profiling.atexit") as mock_atexit:
+                environ, mock_start_call_count = test_data
+                with mock.patch.dict(
+                    os.environ,
+                    {
+                        "KATIA_PROFILING_SPANS": "False",
+                        "KATIA_PROFILING_SAMPLER": "False",
+                        "KATIA_PROFILING_ALLOCATIONS": "False",
+                        "KATIA_PROFILING_SAMPLE_INTERVAL_IN_MS": "20",
+                    }
+                    | environ,
+                ):
+                    profiler = start_profiling()
+                self.assertEqual(
+                    mock_profiler.return_value.start.call_count, mock_start_call_count
+                )
+                self.assertEqual(mock_atexit.register.call_count, mock_start_call_count)
+                if mock_start_call_count:
+                    self.assertEqual(profiler, mock_profiler.return_value)
+                    self.assertEqual(
+                        mock_profiler.call_args.kwargs["interval_in_seconds"], 0.02
+                    )
+                else:
+                    self.assertIsNone(profiler)
@@ -0,0 +1,84 @@
+import os
+import time
+from logging import Logger
+from threading import Event, Thread
+from unittest import TestCase, mock
+
+from katia.shutdown import shutdown, wait
+
+
+class FakeComponent(Thread):
+    def __init__(self, drains: bool = True, deactivates: bool = True):
+        super().__init__(daemon=True)
+        self.drains = drains
+        self.deactivates = deactivates
+        self.stopped = Event()
+        self.drain_calls = 0
+        self.deactivate_calls = 0
+        self.start()
+
+    def run(self) -> None:
+        self.stopped.wait()
+
+    def drain(self):
+        self.drain_calls += 1
+        if self.drains:
+            self.stopped.set()
+
+    def deactivate(self):
+        self.deactivate_calls += 1
+        if self.deactivates:
+            self.stopped.set()
+
+
+class ShutdownTestCase(TestCase):
+    def tearDown(self):
+        for component in getattr(self, "components", {}).values():
+            component.stopped.set()
+
+    def test_shutdown(self):
+        test_data_list = [
+            (True, True, True, [], 1, 0),
+            (True, False, True, [], 1, 1),
+            (True, False, False, ["test"], 1, 1),
+            (False, False, True, [], 0, 1),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.dict(
+                os.environ, {"KATIA_SHUTDOWN_GRACE_IN_SECONDS": "0.1"}
+            ), mock.patch.object(Logger, "warning"), mock.patch.object(
+                Logger, "error"
+            ) as mock_logger_error:
+                (
+                    drain,
+                    drains,
+                    deactivates,
+                    expected_running,
+                    drain_calls,
+                    deactivate_calls,
+                ) = test_data
+                self.components = {
+                    "test": FakeComponent(drains=drains, deactivates=deactivates),
+                    "test-stopped": FakeComponent(),
+                }
+                started_at = time.monotonic()
+                running = shutdown(
+                    components=self.components, drain=drain, timeout=0.1
+                )
+                self.assertEqual(running, expected_running)
+                self.assertEqual(self.components["test"].drain_calls, drain_calls)
+                self.assertEqual(
+                    self.components["test"].deactivate_calls, deactivate_calls
+                )
+                self.assertEqual(mock_logger_error.call_count, len(expected_running))
+                # The deadline is shared, whatever the number of components
+                self.assertLess(time.monotonic() - started_at, 1)
+
+    def test_wait(self):
+        component = mock.MagicMock()
+        component.is_alive.return_value = False
+        self.assertEqual(wait(components={"test": component}, deadline=0), [])
+        self.assertEqual(component.join.call_count, 0)
+        component.is_alive.return_value = True
+        self.assertEqual(wait(components={"test": component}, deadline=0), ["test"])
+        self.assertEqual(component.join.call_args, mock.call(0.0))
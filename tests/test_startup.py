@@ -0,0 +1,64 @@
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia.startup import LazyImport, StartupTimeline
+
+
+class StartupTimelineTestCase(TestCase):
+    def test_step(self):
+        with mock.patch("katia.startup.time.monotonic") as mock_monotonic:
+            mock_monotonic.side_effect = [10, 10.5, 10.75]
+            timeline = StartupTimeline()
+            with timeline.step("test-step"):
+                pass
+            self.assertEqual(timeline.steps, [(0.5, 0.25, "test-step")])
+
+    def test_step_with_error(self):
+        timeline = StartupTimeline()
+        with self.assertRaises(ValueError), timeline.step("test-step"):
+            raise ValueError
+        self.assertEqual([name for _, _, name in timeline.steps], ["test-step"])
+
+    def test_report(self):
+        timeline = StartupTimeline()
+        timeline.started_at = 10
+        timeline.add(name="test-second", started_at=10.5, finished_at=11)
+        timeline.add(name="test-first", started_at=10, finished_at=10.25)
+        self.assertEqual(
+            timeline.report(),
+            "       0 ms  +    250 ms  test-first\n"
+            "     500 ms  +    500 ms  test-second",
+        )
+
+    def test_finish(self):
+        with mock.patch.object(Logger, "info") as mock_logger_info:
+            timeline = StartupTimeline()
+            timeline.finish("test-ready")
+            timeline.finish("test-ready")
+            self.assertEqual(len(timeline.steps), 2)
+            self.assertEqual(mock_logger_info.call_count, 1)
+
+
+class LazyImportTestCase(TestCase):
+    def test_module(self):
+        with mock.patch("katia.startup.startup_timeline") as mock_timeline:
+            lazy_module = LazyImport("json")
+            self.assertEqual(mock_timeline.step.call_count, 0)
+            self.assertEqual(lazy_module.dumps({"test": 1}), '{"test": 1}')
+            self.assertEqual(lazy_module.dumps({"test": 2}), '{"test": 2}')
+            self.assertEqual(mock_timeline.step.call_count, 1)
+            self.assertEqual(mock_timeline.step.call_args, mock.call("Import json"))
+
+    def test_attribute(self):
+        lazy_class = LazyImport("collections", "Counter")
+        self.assertEqual(lazy_class("aab"), {"a": 2, "b": 1})
+        self.assertEqual(repr(lazy_class), "<LazyImport collections.Counter>")
+
+    def test_setattr(self):
+        target = mock.MagicMock()
+        with mock.patch("katia.startup.importlib.import_module") as mock_import_module:
+            mock_import_module.return_value = target
+            lazy_module = LazyImport("test-module")
+            lazy_module.api_key = "test-key"
+            self.assertEqual(target.api_key, "test-key")
+            self.assertEqual(mock_import_module.call_args, mock.call("test-module"))
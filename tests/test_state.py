@@ -0,0 +1,84 @@
+import datetime
+from unittest import TestCase, mock
+
+from katia.state import SharedTimestamp, SpeakingState
+
+
+class SharedTimestampTestCase(TestCase):
+    def test_init(self):
+        with mock.patch("katia.state.time.time") as mock_time:
+            mock_time.return_value = 10
+            self.assertEqual(SharedTimestamp().value, 10)
+        self.assertEqual(SharedTimestamp(value=5).value, 5)
+
+    def test_set(self):
+        test_data_list = [
+            (20, 20),
+            (5, 10),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                value, expected = test_data
+                timestamp = SharedTimestamp(value=10)
+                timestamp.set(value)
+                self.assertEqual(timestamp.value, expected)
+
+    def test_set_datetime(self):
+        timestamp = SharedTimestamp(value=0)
+        now = datetime.datetime.now()
+        timestamp.set_datetime(now)
+        self.assertEqual(timestamp.value, now.timestamp())
+
+    def test_seconds_since(self):
+        with mock.patch("katia.state.time.time") as mock_time:
+            mock_time.return_value = 15
+            self.assertEqual(SharedTimestamp(value=10).seconds_since(), 5)
+
+
+class SpeakingStateTestCase(TestCase):
+    def test_init(self):
+        speaking_state = SpeakingState()
+        self.assertFalse(speaking_state.speaking)
+        self.assertIsInstance(speaking_state.last_speaking, SharedTimestamp)
+
+    def test_set_speaking(self):
+        test_data_list = [
+            (True, 20, True, 10),
+            (False, 20, False, 20),
+            (True, 5, False, 10),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data):
+                speaking, at, expected_speaking, expected_last_speaking = test_data
+                speaking_state = SpeakingState()
+                speaking_state.last_speaking.value = 0
+                speaking_state.set_speaking(speaking=False, at=10)
+                speaking_state.set_speaking(speaking=speaking, at=at)
+                self.assertEqual(speaking_state.speaking, expected_speaking)
+                self.assertEqual(
+                    speaking_state.last_speaking.value, expected_last_speaking
+                )
+
+    def test_update(self):
+        at = datetime.datetime(1994, 8, 8, 14, 30)
+        message = at.isoformat()
+        test_data_list = [
+            ({"source": "speaker", "state": "started", "message": message}, True),
+            ({"source": "speaker", "state": "stopped", "message": message}, False),
+            ({"source": "speaker", "message": message}, False),
+            ({"source": "not-speaker", "state": "started", "message": message}, None),
+            ({"source": "speaker", "state": "started"}, None),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch.object(
+                SpeakingState, "set_speaking"
+            ) as mock_set_speaking:
+                data, expected_speaking = test_data
+                SpeakingState().update(data)
+                if expected_speaking is None:
+                    self.assertEqual(mock_set_speaking.call_count, 0)
+                else:
+                    self.assertEqual(
+                        mock_set_speaking.call_args,
+                        mock.call(speaking=expected_speaking, at=at.timestamp()),
+                    )
@@ -0,0 +1,191 @@
+import os
+import subprocess
+import sys
+from logging import Logger
+from unittest import TestCase, mock
+
+from katia.supervisor import SupervisedProcess, Supervisor
+
+
+class SupervisorTestCase(TestCase):
+    def test_init(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "KATIA_SUPERVISOR_RESTART_DELAY_IN_SECONDS": "2",
+                "KATIA_SUPERVISOR_CPUS": "{'recognizer': [0, 1]}",
+            },
+        ):
+            supervisor = Supervisor(
+                components=["recognizer", "speaker"], owner_uuid="test-uuid"
+            )
+            self.assertEqual(supervisor.restart_delay_in_seconds, 2)
+            self.assertEqual(
+                [process.command for process in supervisor.processes],
+                [
+                    [
+                        sys.executable,
+                        "-m",
+                        "katia.cli",
+                        "recognizer",
+                        "--owner-uuid",
+                        "test-uuid",
+                        "--cpus",
+                        "0,1",
+                    ],
+                    [
+                        sys.executable,
+                        "-m",
+                        "katia.cli",
+                        "speaker",
+                        "--owner-uuid",
+                        "test-uuid",
+                    ],
+                ],
+            )
+
+    def test_init_metrics_ports(self):
+        with mock.patch.dict(
+            os.environ, {"KATIA_METRICS": "True", "KATIA_METRICS_PORT": "9000"}
+        ):
+            supervisor = Supervisor(
+                components=["recognizer", "speaker"], owner_uuid="test-uuid"
+            )
+            self.assertEqual(
+                [process.command[-2:] for process in supervisor.processes],
+                [["--metrics-port", "9001"], ["--metrics-port", "9002"]],
+            )
+
+    def test_run(self):
+        with mock.patch("katia.supervisor.signal"), mock.patch.object(
+            Supervisor, "start"
+        ) as mock_start, mock.patch.object(
+            Supervisor, "check"
+        ) as mock_check, mock.patch.object(
+            Supervisor, "terminate"
+        ) as mock_terminate:
+            supervisor = Supervisor(
+                components=["recognizer", "speaker"], owner_uuid="test-uuid"
+            )
+            supervisor.poll_interval_in_seconds = 0
+            mock_check.side_effect = supervisor.stop
+            self.assertEqual(supervisor.run(), 0)
+            self.assertEqual(mock_start.call_count, 2)
+            self.assertEqual(mock_check.call_count, 1)
+            self.assertEqual(mock_terminate.call_count, 1)
+
+    def test_run_restarting(self):
+        with mock.patch("katia.supervisor.signal"), mock.patch.object(
+            Supervisor, "start"
+        ), mock.patch.object(Supervisor, "check") as mock_check, mock.patch.object(
+            Supervisor, "terminate"
+        ), mock.patch.object(
+            Supervisor, "rolling_restart"
+        ) as mock_rolling_restart:
+            supervisor = Supervisor(components=["speaker"], owner_uuid="test-uuid")
+            supervisor.poll_interval_in_seconds = 0
+            def check():
+                if mock_check.call_count == 1:
+                    supervisor.restart()
+                else:
+                    supervisor.stop()
+
+            mock_check.side_effect = check
+            supervisor.run()
+            self.assertEqual(mock_rolling_restart.call_count, 1)
+            self.assertFalse(supervisor.restarting.is_set())
+
+    def test_rolling_restart(self):
+        with mock.patch.object(Supervisor, "start") as mock_start, mock.patch.object(
+            Supervisor, "stop_processes"
+        ) as mock_stop_processes:
+            supervisor = Supervisor(
+                components=["recognizer", "speaker"], owner_uuid="test-uuid"
+            )
+            process = mock.MagicMock()
+            supervisor.processes[0].process = process
+            supervisor.processes[0].restarts = 3
+            supervisor.rolling_restart()
+            self.assertEqual(mock_stop_processes.call_args_list, [mock.call([process])])
+            self.assertIsNone(supervisor.processes[0].process)
+            self.assertEqual(
+                mock_start.call_args_list,
+                [
+                    mock.call(supervised_process)
+                    for supervised_process in supervisor.processes
+                ],
+            )
+            self.assertEqual(supervisor.processes[0].restarts, 0)
+
+    def test_start(self):
+        with mock.patch("katia.supervisor.subprocess.Popen") as mock_popen:
+            supervised_process = SupervisedProcess(
+                component="speaker", command=["test-command"]
+            )
+            Supervisor(components=[], owner_uuid="test-uuid").start(supervised_process)
+            self.assertEqual(mock_popen.call_args, mock.call(["test-command"]))
+            self.assertEqual(supervised_process.process, mock_popen())
+
+    def test_check(self):
+        test_data_list = [
+            # Running processes are left alone
+            (None, 0, 0, 0, None),
+            # Failing shortly after starting doubles the delay
+            (1, 50, 2, 3, 104),
+            # Failing after being stable resets the delay
+            (1, 0, 2, 1, 101),
+        ]
+        for test_data in test_data_list:
+            with self.subTest(test_data=test_data), mock.patch(
+                "katia.supervisor.time.monotonic"
+            ) as mock_monotonic, mock.patch.object(Logger, "error"), mock.patch.object(
+                Supervisor, "start"
+            ) as mock_start:
+                (
+                    return_code,
+                    started_at,
+                    restarts,
+                    expected_restarts,
+                    expected_restart_at,
+                ) = test_data
+                mock_monotonic.return_value = 100
+                supervisor = Supervisor(components=["speaker"], owner_uuid="test-uuid")
+                supervised_process = supervisor.processes[0]
+                supervised_process.process = mock.MagicMock()
+                supervised_process.process.poll.return_value = return_code
+                supervised_process.started_at = started_at
+                supervised_process.restarts = restarts
+                supervisor.check()
+                self.assertEqual(supervised_process.restarts, expected_restarts)
+                self.assertEqual(mock_start.call_count, 0)
+                if expected_restart_at is not None:
+                    self.assertIsNone(supervised_process.process)
+                    self.assertEqual(supervised_process.restart_at, expected_restart_at)
+                    mock_monotonic.return_value = expected_restart_at
+                    supervisor.check()
+                    self.assertEqual(
+                        mock_start.call_args, mock.call(supervised_process)
+                    )
+
+    def test_terminate(self):
+        with mock.patch.object(Logger, "warning") as mock_logger_warning:
+            supervisor = Supervisor(
+                components=["recognizer", "speaker", "interpreter"],
+                owner_uuid="test-uuid",
+            )
+            stopped_process = mock.MagicMock()
+            stuck_process = mock.MagicMock()
+            stuck_process.wait.side_effect = [
+                subprocess.TimeoutExpired(cmd="test", timeout=0),
+                None,
+            ]
+            supervisor.processes[0].process = stopped_process
+            supervisor.processes[1].process = stuck_process
+            supervisor.terminate()
+            self.assertEqual(stopped_process.terminate.call_count, 1)
+            self.assertEqual(stopped_process.kill.call_count, 0)
+            self.assertEqual(stuck_process.terminate.call_count, 1)
+            self.assertEqual(stuck_process.kill.call_count, 1)
+            self.assertEqual(stuck_process.wait.call_count, 2)
+            self.assertEqual(stuck_process.wait.call_args, mock.call())
+            self.assertEqual(mock_logger_warning.call_count, 1)